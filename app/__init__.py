@@ -1,12 +1,35 @@
+import logging
+
 from flask import Flask
 
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def warm_timeseries_store() -> None:
+    """Load recent measurements into this worker's ring buffers so the first dashboard reads skip Postgres."""
+    from core.journey.timeseries import get_timeseries_store
+    from database.session import get_db
+
+    try:
+        with get_db(readonly=True) as db:
+            get_timeseries_store().warm(db)
+    except Exception as e:
+        logger.warning(f"Could not warm the time series store, it will load on first use: {str(e)}")
+
 
 def create_app() -> Flask:
     app = Flask(__name__)
 
-    # Import and register the blueprint
+    # Import and register the blueprints
+    from .api import api
     from .routes import main
 
     app.register_blueprint(main)
+    app.register_blueprint(api)
+
+    if settings.TIMESERIES_WARM_ON_START:
+        warm_timeseries_store()
 
     return app
@@ -0,0 +1,345 @@
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Iterator, Optional
+
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+from sqlalchemy.orm import Session
+
+from core.cache.response_cache import CacheEntry, get_response_cache, latest_revision_id, make_cache_key
+from core.journey.anomaly import recent_anomalies
+from core.journey.exporter import EXPORT_FORMATS, MeasurementExporter
+from core.journey.forecast import get_forecaster
+from core.journey.heatmap import HEATMAP_METRICS, HeatmapBuilder, heatmap_payload
+from core.journey.queries import (
+    DEFAULT_PAGE_SIZE,
+    JourneyQueries,
+    MeasurementCursor,
+    MeasurementFilter,
+    ensure_utc,
+)
+from core.journey.segments import SegmentProfiler
+from core.journey.timeseries import get_timeseries_store
+from database.session import get_db
+
+api = Blueprint("api", __name__, url_prefix="/api")
+
+
+class BadRequest(ValueError):
+    pass
+
+
+@api.errorhandler(BadRequest)
+def handle_bad_request(error: BadRequest) -> Response:
+    response = jsonify({"error": str(error)})
+    response.status_code = 400
+    return response
+
+
+def parse_datetime_arg(name: str) -> Optional[datetime]:
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        return ensure_utc(datetime.fromisoformat(value))
+    except ValueError:
+        raise BadRequest(f"Invalid ISO-8601 datetime for '{name}': {value}")
+
+
+def build_filter(queries: JourneyQueries, journey_id: Optional[int]) -> MeasurementFilter:
+    mode = request.args.get("mode")
+    try:
+        mode = queries.resolve_mode(mode) if mode else None
+    except ValueError as e:
+        raise BadRequest(str(e))
+    return MeasurementFilter(
+        journey_id=journey_id,
+        mode=mode,
+        start=parse_datetime_arg("start"),
+        end=parse_datetime_arg("end"),
+    )
+
+
+def conditional_response(
+    db: Session, compute_etag: Callable[[], str], build_payload: Callable[[], Any], cached: bool = True
+) -> Response:
+    """
+    Answer with 304 when the client already holds the current ETag, otherwise send the payload.
+
+    ETags and payloads are cached per query under the current measurement watermark, so between
+    slots repeat requests are served from memory and neither the ETag probe nor the query runs.
+    Responses that don't derive from measurements pass `cached=False` and compute their ETag every time.
+    """
+    if not cached:
+        return etag_response(compute_etag(), build_payload)
+
+    cache = get_response_cache()
+    watermark = cache.current_watermark(db)
+    cache_key = make_cache_key(request.path, sorted(request.args.items(multi=True)))
+
+    entry = cache.get(cache_key, watermark)
+    if entry is None:
+        entry = CacheEntry(watermark=watermark, etag=compute_etag())
+        cache.set(cache_key, entry)
+
+    if request.if_none_match.contains_weak(entry.etag):
+        response = Response(status=304)
+    else:
+        if entry.payload is None:
+            entry.payload = build_payload()
+            cache.set(cache_key, entry)
+        response = jsonify(entry.payload)
+    response.set_etag(entry.etag, weak=True)
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
+def etag_response(etag: str, build_payload: Callable[[], Any]) -> Response:
+    response = Response(status=304) if request.if_none_match.contains_weak(etag) else jsonify(build_payload())
+    response.set_etag(etag, weak=True)
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
+def measurement_etag(queries: JourneyQueries, filters: MeasurementFilter, scope: str) -> str:
+    measurement_id = queries.measurement_watermark(filters)
+    if measurement_id is None:
+        return f"{scope}-empty"
+    # Backfills rewrite measurements in place, so the ids alone don't change with them
+    return f"{scope}-m{measurement_id}-r{latest_revision_id(queries.db)}"
+
+
+@api.route("/journeys")
+def list_journeys() -> Response:
+    with get_db(readonly=True) as db:
+        queries = JourneyQueries(db)
+
+        def journeys_etag() -> str:
+            count, updated_at = queries.journeys_watermark()
+            return f"journeys-{count}-{updated_at.timestamp() if updated_at else 0:.6f}"
+
+        # Setup, bootstrap and quarantine change journeys without moving the measurement watermark
+        return conditional_response(db, journeys_etag, lambda: {"journeys": queries.list_journeys()}, cached=False)
+
+
+@api.route("/measurements")
+@api.route("/journeys/<int:journey_id>/measurements")
+def list_measurements(journey_id: Optional[int] = None) -> Response:
+    cursor_token = request.args.get("cursor")
+    try:
+        cursor = MeasurementCursor.decode(cursor_token) if cursor_token else None
+        limit = int(request.args.get("limit", DEFAULT_PAGE_SIZE))
+    except ValueError as e:
+        raise BadRequest(str(e))
+
+    with get_db(readonly=True) as db:
+        queries = JourneyQueries(db)
+        filters = build_filter(queries, journey_id)
+
+        def build_payload() -> Any:
+            items, next_cursor = queries.list_measurements(filters, cursor=cursor, limit=limit)
+            return {
+                "measurements": items,
+                "next_cursor": next_cursor.encode() if next_cursor else None,
+            }
+
+        return conditional_response(db, lambda: measurement_etag(queries, filters, "measurements"), build_payload)
+
+
+@api.route("/journeys/<int:journey_id>/profile")
+def slot_profile(journey_id: int) -> Response:
+    with get_db(readonly=True) as db:
+        queries = JourneyQueries(db)
+        filters = build_filter(queries, journey_id)
+        return conditional_response(
+            db,
+            lambda: measurement_etag(queries, filters, "profile"),
+            lambda: {"journey_id": journey_id, "slots": queries.slot_profile(filters)},
+        )
+
+
+@api.route("/journeys/<int:journey_id>/heatmap")
+def heatmap(journey_id: int) -> Response:
+    """
+    Precomputed 7×96 day-of-week × time-slot matrix for one mode and metric.
+
+    `format=binary` returns the stored blob as-is (header, uint32 counts, float32 means).
+    """
+    mode = request.args.get("mode", "driving")
+    metric = request.args.get("metric", "duration_seconds")
+    if metric not in HEATMAP_METRICS:
+        raise BadRequest(f"Unsupported heatmap metric '{metric}' (expected one of {HEATMAP_METRICS})")
+
+    with get_db(readonly=True) as db:
+        try:
+            JourneyQueries(db).get_transit_mode_id(mode)  # Rejects unknown modes with a 400 rather than a 404
+        except ValueError as e:
+            raise BadRequest(str(e))
+        stored = HeatmapBuilder(db).get(journey_id, mode.lower(), metric)
+        if stored is None:
+            response = jsonify({"error": f"No heatmap for journey {journey_id}, mode '{mode}', metric '{metric}'"})
+            response.status_code = 404
+            return response
+
+        etag = f"heatmap-{stored.journey_id}-{stored.mode}-{stored.metric}-{stored.watermark}-r{latest_revision_id(db)}"
+        if request.args.get("format") == "binary":
+            if request.if_none_match.contains_weak(etag):
+                response = Response(status=304)
+            else:
+                response = Response(bytes(stored.payload), mimetype="application/octet-stream")
+            response.set_etag(etag, weak=True)
+            response.headers["Cache-Control"] = "no-cache"
+            return response
+        return conditional_response(db, lambda: etag, lambda: heatmap_payload(stored))
+
+
+@api.route("/journeys/<int:journey_id>/forecast")
+def forecast(journey_id: int) -> Response:
+    """
+    Expected travel time for a departure `at` (ISO-8601, default now; without an offset it is local time in
+    the journey's timezone), answered from per-worker cached models refit after every scheduler run.
+    """
+    mode = request.args.get("mode", "driving")
+    at_arg = request.args.get("at")
+    try:
+        at = datetime.fromisoformat(at_arg) if at_arg else None
+    except ValueError:
+        raise BadRequest(f"Invalid ISO-8601 datetime for 'at': {at_arg}")
+
+    with get_db(readonly=True) as db:
+        try:
+            prediction = get_forecaster().forecast(db, journey_id, mode, at)
+        except ValueError as e:
+            raise BadRequest(str(e))
+
+    if prediction is None:
+        response = jsonify({"error": f"No forecast for journey {journey_id}, mode '{mode}'"})
+        response.status_code = 404
+        return response
+    response = jsonify(prediction)
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
+@api.route("/journeys/<int:journey_id>/recent")
+def recent_measurements(journey_id: int) -> Response:
+    """
+    The last `hours` (default 24) of measurements for one mode, served from the in-memory ring buffers.
+
+    Each sample is `[timestamp, duration_seconds, distance_meters, speed_kph]`.
+    """
+    mode = request.args.get("mode", "driving")
+    try:
+        window = timedelta(hours=float(request.args.get("hours", 24)))
+    except ValueError as e:
+        raise BadRequest(str(e))
+
+    store = get_timeseries_store()
+    if not store.covers(window):
+        raise BadRequest(
+            f"Recent windows are limited to {store.span.total_seconds() / 3600:.0f} hours, "
+            f"use /api/journeys/{journey_id}/measurements for longer ranges"
+        )
+
+    with get_db(readonly=True) as db:
+        queries = JourneyQueries(db)
+        try:
+            transit_mode_id = queries.get_transit_mode_id(mode)
+        except ValueError as e:
+            raise BadRequest(str(e))
+        # Only queries Postgres when the scheduler has committed measurements the store hasn't seen
+        store.catch_up(db, get_response_cache().current_watermark(db))
+
+    samples = store.recent(journey_id, mode.lower(), window)
+    response = jsonify(
+        {
+            "journey_id": journey_id,
+            "transit_mode_id": transit_mode_id,
+            "mode": mode.lower(),
+            "hours": window.total_seconds() / 3600,
+            "samples": [
+                [datetime.fromtimestamp(timestamp, timezone.utc).isoformat(), duration, distance, speed]
+                for timestamp, duration, distance, speed in samples
+            ],
+        }
+    )
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
+@api.route("/journeys/<int:journey_id>/segments")
+def segment_profile(journey_id: int) -> Response:
+    """Mean speed of each step of the journey's usual route per time slot, with step polylines."""
+    mode = request.args.get("mode", "driving")
+    with get_db(readonly=True) as db:
+        queries = JourneyQueries(db)
+        try:
+            transit_mode_id = queries.get_transit_mode_id(mode)
+        except ValueError as e:
+            raise BadRequest(str(e))
+        filters = MeasurementFilter(journey_id=journey_id, transit_mode_id=transit_mode_id)
+        profiler = SegmentProfiler(db)
+
+        def build_payload() -> Any:
+            payload = profiler.profile(journey_id, transit_mode_id)
+            if payload:
+                return payload
+            return {"journey_id": journey_id, "transit_mode_id": transit_mode_id, "segments": [], "slots": []}
+
+        return conditional_response(db, lambda: measurement_etag(queries, filters, "segments"), build_payload)
+
+
+@api.route("/anomalies")
+@api.route("/journeys/<int:journey_id>/anomalies")
+def list_anomalies(journey_id: Optional[int] = None) -> Response:
+    """Most recent slowdowns flagged by the scheduler, newest first."""
+    try:
+        limit = min(int(request.args.get("limit", 100)), 1000)
+    except ValueError as e:
+        raise BadRequest(str(e))
+
+    with get_db(readonly=True) as db:
+
+        def build_payload() -> Any:
+            return {
+                "anomalies": [
+                    {
+                        "journey_id": anomaly.journey_id,
+                        "transit_mode_id": anomaly.transit_mode_id,
+                        "mode": anomaly.mode,
+                        "journey_measurement_id": anomaly.journey_measurement_id,
+                        "timestamp": anomaly.timestamp.isoformat(),
+                        "day_of_week_id": anomaly.day_of_week_id,
+                        "time_slot_id": anomaly.time_slot_id,
+                        "duration_seconds": anomaly.duration_seconds,
+                        "expected_seconds": round(anomaly.expected_seconds, 1),
+                        "z_score": round(anomaly.z_score, 2),
+                    }
+                    for anomaly in recent_anomalies(db, journey_id=journey_id, limit=limit)
+                ]
+            }
+
+        def etag() -> str:
+            return f"anomalies-{get_response_cache().current_watermark(db)}"
+
+        return conditional_response(db, etag, build_payload)
+
+
+@api.route("/export/measurements.<export_format>")
+def export_measurements(export_format: str) -> Response:
+    if export_format not in EXPORT_FORMATS:
+        raise BadRequest(f"Unsupported export format '{export_format}'")
+    compress = request.args.get("gzip", "").lower() in ("1", "true", "yes")
+    journey_id = request.args.get("journey_id", type=int)
+
+    with get_db(readonly=True) as db:
+        filters = build_filter(JourneyQueries(db), journey_id)
+
+    def generate() -> Iterator[bytes]:
+        # The session lives as long as the response body so the server-side cursor stays open while streaming
+        with get_db(readonly=True) as db:
+            yield from MeasurementExporter(db).iter_export(export_format, filters, compress=compress)
+
+    filename = f"journey_measurements.{export_format}" + (".gz" if compress else "")
+    mimetype = "application/gzip" if compress else ("text/csv" if export_format == "csv" else "application/x-ndjson")
+    response = Response(stream_with_context(generate()), mimetype=mimetype)
+    response.headers["Content-Disposition"] = f"attachment; filename={filename}"
+    return response
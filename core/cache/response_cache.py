@@ -0,0 +1,271 @@
+import abc
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from sqlalchemy import func
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from database.models.api_cache_entry import ApiCacheEntry
+from database.models.journey_measurement import JourneyMeasurement
+from database.models.measurement_revision import MeasurementRevision
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CacheEntry:
+    watermark: int
+    etag: str
+    payload: Optional[Any] = None
+
+
+def make_cache_key(*parts: Any) -> str:
+    """Build a fixed-length key from the parts of a query (path, sorted args, ...)."""
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def latest_revision_id(db: Session) -> int:
+    """The newest measurement_revisions primary key: bumped by bulk rewrites such as backfills."""
+    return int(db.query(func.max(MeasurementRevision.id)).scalar() or 0)
+
+
+def data_watermark(db: Session) -> int:
+    """
+    The global watermark: newest measurement id plus newest revision id, so both new slots and backfills
+    move it. Two PK index probes. It goes back when the newest measurements are deleted, as removing load
+    test journeys does, and can then repeat a value last seen before those rows were added.
+    """
+    newest_revision = db.query(func.max(MeasurementRevision.id)).scalar_subquery()
+    row = db.query(func.max(JourneyMeasurement.id), newest_revision).one()
+    return int(row[0] or 0) + int(row[1] or 0)
+
+
+class SharedCacheBackend(abc.ABC):
+    """Second-level cache shared between gunicorn workers."""
+
+    @abc.abstractmethod
+    def get(self, key: str) -> Optional[CacheEntry]: ...
+
+    @abc.abstractmethod
+    def set(self, key: str, entry: CacheEntry) -> None: ...
+
+    def read_watermark(self) -> Optional[int]:
+        return None
+
+    def publish_watermark(self, watermark: int) -> None:
+        pass
+
+
+class FileCacheBackend(SharedCacheBackend):
+    """JSON files under CACHE_DATA_DIR, plus a watermark file the scheduler rewrites after each slot."""
+
+    def __init__(self, cache_dir: Optional[Path] = None):
+        self.cache_dir = cache_dir or settings.CACHE_DATA_DIR
+        self.entries_dir = self.cache_dir / "entries"
+        self.watermark_path = self.cache_dir / "watermark"
+        self.entries_dir.mkdir(parents=True, exist_ok=True)
+        self._watermark_mtime = 0.0
+        self._watermark: Optional[int] = None
+
+    def _write_atomic(self, path: Path, content: str) -> None:
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        tmp_path.write_text(content, encoding="utf-8")
+        os.replace(tmp_path, path)
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        try:
+            data = json.loads((self.entries_dir / f"{key}.json").read_text(encoding="utf-8"))
+            return CacheEntry(watermark=data["watermark"], etag=data["etag"], payload=data.get("payload"))
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def set(self, key: str, entry: CacheEntry) -> None:
+        content = json.dumps({"watermark": entry.watermark, "etag": entry.etag, "payload": entry.payload})
+        self._write_atomic(self.entries_dir / f"{key}.json", content)
+
+    def read_watermark(self) -> Optional[int]:
+        # A stat() per request is far cheaper than a query; only re-read the file when it changed
+        try:
+            mtime = self.watermark_path.stat().st_mtime
+        except OSError:
+            return None
+        if mtime != self._watermark_mtime:
+            try:
+                self._watermark = int(self.watermark_path.read_text(encoding="utf-8").strip())
+                self._watermark_mtime = mtime
+            except (OSError, ValueError):
+                return None
+        return self._watermark
+
+    def publish_watermark(self, watermark: int) -> None:
+        self._write_atomic(self.watermark_path, str(watermark))
+        for entry_path in self.entries_dir.glob("*.json"):
+            entry = self.get(entry_path.stem)
+            if entry is None or entry.watermark < watermark:
+                entry_path.unlink(missing_ok=True)
+
+
+class PostgresCacheBackend(SharedCacheBackend):
+    """
+    Rows in api_cache_entries, for workers that do not share a filesystem with the scheduler.
+
+    Lookups go to the read engine: a lagging replica only returns an older watermark, which the caller
+    treats as a miss. Both lookups and writes are best-effort, so a cache failure never fails a request.
+    """
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        from database.session import get_db
+
+        try:
+            with get_db(readonly=True) as db:
+                row = db.get(ApiCacheEntry, key)
+                if row is None:
+                    return None
+                return CacheEntry(watermark=row.watermark, etag=row.etag, payload=row.payload)
+        except SQLAlchemyError as e:
+            logger.warning(f"Could not read shared cache entry: {str(e)}")
+            return None
+
+    def set(self, key: str, entry: CacheEntry) -> None:
+        from database.session import get_db
+
+        try:
+            with get_db() as db:
+                db.merge(
+                    ApiCacheEntry(
+                        cache_key=key,
+                        watermark=entry.watermark,
+                        etag=entry.etag,
+                        payload=entry.payload,
+                        created_at=datetime.now(timezone.utc),
+                    )
+                )
+        except SQLAlchemyError as e:
+            # e.g. another worker inserted the same key first
+            logger.warning(f"Could not write shared cache entry: {str(e)}")
+
+    def publish_watermark(self, watermark: int) -> None:
+        from database.session import get_db
+
+        with get_db() as db:
+            db.query(ApiCacheEntry).filter(ApiCacheEntry.watermark < watermark).delete(synchronize_session=False)
+
+
+class ResponseCache:
+    """
+    Per-process LRU of API responses, each entry tagged with the measurement watermark it was built at.
+
+    An entry is only served while its watermark equals the current one, so committing a new slot
+    invalidates everything without any explicit purge. The current watermark comes from the shared
+    backend when it publishes one, otherwise from a PK probe re-run at most every `watermark_ttl` seconds.
+    """
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        backend: Optional[SharedCacheBackend] = None,
+        watermark_ttl: Optional[float] = None,
+    ):
+        self.max_entries = max_entries if max_entries is not None else settings.CACHE_MAX_ENTRIES
+        self.watermark_ttl = watermark_ttl if watermark_ttl is not None else settings.CACHE_WATERMARK_TTL
+        self.backend = backend
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._watermark: Optional[int] = None
+        self._watermark_checked_at = 0.0
+        self.stats: Dict[str, int] = {"hits": 0, "shared_hits": 0, "misses": 0}
+
+    def current_watermark(self, db: Session) -> int:
+        now = time.monotonic()
+        if self._watermark is None or now - self._watermark_checked_at >= self.watermark_ttl:
+            self._watermark = data_watermark(db)
+            self._watermark_checked_at = now
+
+        if self.backend is not None:
+            published = self.backend.read_watermark()
+            if published is not None and published > self._watermark:
+                self._watermark = published
+        return self._watermark
+
+    def get(self, key: str, watermark: int) -> Optional[CacheEntry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.watermark == watermark:
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+                return entry
+
+        if self.backend is not None:
+            entry = self.backend.get(key)
+            if entry is not None and entry.watermark == watermark:
+                self._store_local(key, entry)
+                self.stats["shared_hits"] += 1
+                return entry
+
+        self.stats["misses"] += 1
+        return None
+
+    def set(self, key: str, entry: CacheEntry) -> None:
+        self._store_local(key, entry)
+        if self.backend is not None and entry.payload is not None:
+            try:
+                self.backend.set(key, entry)
+            except Exception as e:
+                logger.warning(f"Could not write shared cache entry: {str(e)}")
+
+    def _store_local(self, key: str, entry: CacheEntry) -> None:
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def publish_watermark(self, watermark: int) -> None:
+        """Called by the scheduler after committing a slot: adopt the new watermark and drop stale entries."""
+        with self._lock:
+            self._entries.clear()
+        self._watermark = watermark
+        self._watermark_checked_at = time.monotonic()
+        if self.backend is not None:
+            self.backend.publish_watermark(watermark)
+        logger.info(f"Published response cache watermark {watermark}")
+
+
+def create_backend(name: str) -> Optional[SharedCacheBackend]:
+    if name == "memory":
+        return None
+    if name == "file":
+        return FileCacheBackend()
+    if name == "postgres":
+        return PostgresCacheBackend()
+    raise ValueError(f"Unknown CACHE_BACKEND '{name}' (expected memory, file or postgres)")
+
+
+_cache: Optional[ResponseCache] = None
+_cache_pid: Optional[int] = None
+
+
+def get_response_cache() -> ResponseCache:
+    """Return this process's cache, creating it lazily so each forked gunicorn worker gets its own LRU."""
+    global _cache, _cache_pid
+    if _cache is None or _cache_pid != os.getpid():
+        _cache = ResponseCache(backend=create_backend(settings.CACHE_BACKEND))
+        _cache_pid = os.getpid()
+    return _cache
+
+
+def publish_watermark(db: Session) -> int:
+    watermark = data_watermark(db)
+    get_response_cache().publish_watermark(watermark)
+    return watermark
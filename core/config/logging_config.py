@@ -0,0 +1,143 @@
+"""
+Logging for the CLI entry points.
+
+Records are handed to a QueueListener thread that does the formatting and the (possibly slow) writes to
+stdout and log files, so the thread that logs only builds a LogRecord and enqueues it. Messages use lazy
+%-style arguments and may carry structured key-value fields:
+
+    logger.debug("Measurement timestamps", extra=log_fields(journey_id=7, utc=timestamp))
+
+which render as `... - Measurement timestamps journey_id=7 utc=2025-01-01T08:00:00+00:00`. DEBUG records are
+rate limited per call site (LOG_DEBUG_PER_MINUTE) before they reach the queue, so debug logging can stay on in
+production without flooding the output or slowing down the measurement hot path.
+"""
+
+import atexit
+import logging
+import os
+import queue
+import sys
+import threading
+from datetime import date, datetime
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, List, Optional, Tuple
+
+from core.config import settings
+
+LOG_DIR = os.path.join("/tmp", "logs")
+
+# Arguments of these types can't change between the logging call and the listener thread formatting them
+IMMUTABLE_ARG_TYPES = (str, int, float, bool, bytes, type(None), date, datetime)
+
+
+def log_fields(**fields: Any) -> Dict[str, Dict[str, Any]]:
+    """`extra=` for a structured record; values are only converted to text when the record is written."""
+    return {"fields": fields}
+
+
+def format_value(value: Any) -> str:
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, float):
+        return f"{value:.6g}"
+    text = str(value)
+    return repr(text) if not text or any(c.isspace() or c == "=" for c in text) else text
+
+
+class KeyValueFormatter(logging.Formatter):
+    """The usual LOG_FORMAT line followed by the record's structured fields as `key=value` pairs."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = getattr(record, "fields", None)
+        if not fields:
+            return line
+        pairs = " ".join(f"{key}={format_value(value)}" for key, value in fields.items())
+        head, newline, trace = line.partition("\n")  # Keep tracebacks after the fields
+        return f"{head} {pairs}{newline}{trace}"
+
+
+class DebugRateLimiter(logging.Filter):
+    """
+    Let through at most `per_minute` DEBUG records per call site (file and line) every minute.
+
+    The first record after a quiet period reports how many were dropped as a `suppressed` field. Records
+    above DEBUG always pass; `per_minute=0` disables the limit.
+    """
+
+    def __init__(self, per_minute: int, window_seconds: float = 60.0):
+        super().__init__()
+        self.per_minute = per_minute
+        self.window_seconds = window_seconds
+        self._sites: Dict[Tuple[str, int], List[float]] = {}  # site -> [window start, passed, suppressed]
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or self.per_minute <= 0:
+            return True
+        site = (record.pathname, record.lineno)
+        with self._lock:
+            state = self._sites.get(site)
+            if state is None or record.created - state[0] >= self.window_seconds:
+                suppressed = int(state[2]) if state is not None else 0
+                self._sites[site] = [record.created, 1, 0]
+            elif state[1] < self.per_minute:
+                state[1] += 1
+                return True
+            else:
+                state[2] += 1
+                return False
+        if suppressed:
+            record.fields = {**(getattr(record, "fields", None) or {}), "suppressed": suppressed}
+        return True
+
+
+class DeferredFormatQueueHandler(QueueHandler):
+    """
+    A QueueHandler that leaves message formatting to the listener thread.
+
+    The stock handler merges `msg % args` in the calling thread. That is only needed when an argument is
+    mutable and could change before the listener gets to it, so it is done for those records alone.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> Any:
+        args = record.args
+        if isinstance(args, tuple) and all(isinstance(arg, IMMUTABLE_ARG_TYPES) for arg in args):
+            return record
+        return super().prepare(record)
+
+
+_listener: Optional[QueueListener] = None
+
+
+def configure_logging(log_file: Optional[str] = None, level: Optional[str] = None) -> QueueListener:
+    """
+    Route the root logger through a background QueueListener writing to stdout and, off Heroku, to
+    /tmp/logs/<log_file>. Replaces any handlers already on the root logger; the listener is flushed at exit.
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+
+    handlers: List[logging.Handler] = [logging.StreamHandler(sys.stdout)]
+    if log_file and not settings.IS_HEROKU:
+        os.makedirs(LOG_DIR, exist_ok=True)
+        handlers.append(logging.FileHandler(os.path.join(LOG_DIR, log_file)))
+    formatter = KeyValueFormatter(settings.LOG_FORMAT, settings.LOG_DATE_FORMAT)
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    queue_handler = DeferredFormatQueueHandler(log_queue)
+    queue_handler.addFilter(DebugRateLimiter(settings.LOG_DEBUG_PER_MINUTE))
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(getattr(logging, (level or settings.LOG_LEVEL).upper(), logging.INFO))
+
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+    return _listener
@@ -1,19 +1,18 @@
+"""
+Application settings.
+
+Paths are plain constants. Everything read from the environment is resolved once, on first access, through
+the module-level __getattr__ (PEP 562): that is when the .env file is loaded. Importing this module therefore
+stays cheap for CLIs, Makefile one-liners and web workers.
+"""
+
 import os
+import threading
 from datetime import datetime
 from pathlib import Path
-from typing import Tuple
+from typing import Any, Dict, Optional, Tuple
 from urllib.parse import urlparse
 
-from dotenv import load_dotenv
-
-# Determine environment and load appropriate .env file
-ENVIRONMENT = os.getenv("ENVIRONMENT", "development")
-env_file = Path(__file__).resolve().parent.parent.parent / f".env.{ENVIRONMENT}"
-if env_file.exists():
-    load_dotenv(env_file)
-else:
-    load_dotenv()  # Fallback to default .env
-
 # Base paths
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
 DATA_DIR = BASE_DIR / "data"
@@ -27,9 +26,74 @@ METRICS_DATA_DIR = DATA_DIR / "metrics"
 RAW_JOURNEYS_PATH = RAW_DATA_DIR / "journeys.json"
 PROCESSED_JOURNEYS_PATH = PROCESSED_DATA_DIR / "journeys_enriched.json"
 
-# Application settings
-MAX_WORKERS = int(os.getenv("MAX_WORKERS", "4"))  # Thread pool size
-DEBUG = os.getenv("DEBUG", "false").lower() == "true"
+# Response cache files (CACHE_BACKEND=file) and backfill checkpoints
+CACHE_DATA_DIR = METRICS_DATA_DIR / "cache"
+BACKFILL_DATA_DIR = METRICS_DATA_DIR / "backfill"
+PROFILE_DATA_DIR = METRICS_DATA_DIR / "profiles"  # --profile output of the CLI entry points
+
+# Logging settings
+LOG_FORMAT = "%(asctime)s.%(msecs)03d - %(name)s - %(levelname)s - %(message)s"
+LOG_DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Environment settings, populated on first access by __getattr__ below
+ENVIRONMENT: str
+MAX_WORKERS: int
+DEBUG: bool
+SQL_ECHO: bool
+DB_USER: str
+DB_PASSWORD: str
+DB_HOST: str
+DB_PORT: str
+DB_NAME: str
+DATABASE_URL: str
+DATABASE_READ_URL: Optional[str]
+DB_POOL_SIZE: int
+DB_MAX_OVERFLOW: int
+DB_READ_POOL_SIZE: int
+DB_READ_MAX_OVERFLOW: int
+DB_POOL_TIMEOUT: float
+DB_POOL_RECYCLE: int
+DB_POOL_PRE_PING: bool
+DB_PGBOUNCER: bool
+CACHE_BACKEND: str
+CACHE_MAX_ENTRIES: int
+CACHE_WATERMARK_TTL: float
+TIMESERIES_RETENTION_HOURS: int
+TIMESERIES_CAPACITY: int
+TIMESERIES_WARM_ON_START: bool
+ARCHIVE_DATA_DIR: Path
+SPOOL_DATA_DIR: Path
+SPOOL_ENABLED: bool
+SPOOL_FSYNC: bool
+GEOCODE_CACHE_TTL_DAYS: int
+ANOMALY_Z_THRESHOLD: float
+ANOMALY_MIN_SAMPLES: int
+QUARANTINE_AFTER_FAILURES: int
+QUARANTINE_BACKOFF_MINUTES: float
+QUARANTINE_MAX_BACKOFF_HOURS: float
+API_DAILY_BUDGET_USD: float
+API_BUDGET_MODE: str
+API_LOW_PRIORITY_MODES: str
+MAX_RUNTIME_SECONDS: float
+HEROKU_TIMEOUT_MARGIN: float
+IS_HEROKU: bool
+LOG_LEVEL: str
+LOG_DEBUG_PER_MINUTE: int
+PROFILE_INTERVAL_MS: float
+
+_loaded = False
+_load_lock = threading.Lock()
+
+
+def load_environment() -> None:
+    """Load `.env.<ENVIRONMENT>` (or `.env`) into os.environ without overriding variables already set."""
+    from dotenv import load_dotenv
+
+    env_file = BASE_DIR / f".env.{os.getenv('ENVIRONMENT', 'development')}"
+    if env_file.exists():
+        load_dotenv(env_file)
+    else:
+        load_dotenv()  # Fallback to default .env
 
 
 # Database settings
@@ -62,27 +126,111 @@ def build_database_url(user: str, password: str, host: str, port: str, dbname: s
     return f"postgresql://{user}{password_section}@{host}:{port}/{dbname}"
 
 
-# Get database credentials
-DB_USER, DB_PASSWORD, DB_HOST, DB_PORT, DB_NAME = parse_database_url()
-DATABASE_URL = build_database_url(DB_USER, DB_PASSWORD, DB_HOST, DB_PORT, DB_NAME)
+def normalize_database_url(database_url: Optional[str]) -> Optional[str]:
+    """SQLAlchemy only accepts the postgresql:// scheme; Heroku hands out postgres:// URLs."""
+    if database_url and database_url.startswith("postgres://"):
+        return "postgresql://" + database_url[len("postgres://") :]
+    return database_url or None
 
-# Debugging: Print database connection details (excluding password)
-# (This now only runs when the module is executed directly.)
-if __name__ == "__main__":
-    print(f"🔍 DEBUG: DB_PORT (raw) = {os.getenv('DB_PORT')}")
-    print(f"🔹 Connecting to: {DATABASE_URL}")
 
-# Runtime settings
-MAX_RUNTIME_SECONDS = float(os.getenv("MAX_RUNTIME_SECONDS", "60"))  # Target runtime limit
-HEROKU_TIMEOUT_MARGIN = float(os.getenv("HEROKU_TIMEOUT_MARGIN", "25"))  # Safety margin for Heroku's 30s timeout
+def environment_settings() -> Dict[str, Any]:
+    """Read every environment-dependent setting. Called once, the first time one of them is accessed."""
+    load_environment()
+
+    ENVIRONMENT = os.getenv("ENVIRONMENT", "development")
+
+    # Application settings
+    MAX_WORKERS = int(os.getenv("MAX_WORKERS", "4"))  # Thread pool size
+    DEBUG = os.getenv("DEBUG", "false").lower() == "true"
+    SQL_ECHO = os.getenv("SQL_ECHO", "false").lower() == "true"  # Log every SQL statement (opt-in)
+
+    # Get database credentials
+    DB_USER, DB_PASSWORD, DB_HOST, DB_PORT, DB_NAME = parse_database_url()
+    DATABASE_URL = build_database_url(DB_USER, DB_PASSWORD, DB_HOST, DB_PORT, DB_NAME)
+    DATABASE_READ_URL = normalize_database_url(os.getenv("DATABASE_READ_URL"))  # Replica for read-only sessions
+
+    # Connection pools, per process and per engine (primary and read-only)
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "5"))
+    DB_READ_POOL_SIZE = int(os.getenv("DB_READ_POOL_SIZE", "5"))
+    DB_READ_MAX_OVERFLOW = int(os.getenv("DB_READ_MAX_OVERFLOW", "10"))
+    DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))  # Seconds to wait for a free connection
+    DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # Replace connections older than this
+    DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"  # Check connections on checkout
+    DB_PGBOUNCER = os.getenv("DB_PGBOUNCER", "false").lower() == "true"  # Behind PgBouncer in transaction mode
 
-# Ensure required directories exist
-for directory in [RAW_DATA_DIR, PROCESSED_DATA_DIR, METRICS_DATA_DIR]:
-    directory.mkdir(parents=True, exist_ok=True)
+    # Response cache settings (read API)
+    CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory").lower()  # memory, file or postgres
+    CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "512"))  # In-process LRU size per worker
+    CACHE_WATERMARK_TTL = float(os.getenv("CACHE_WATERMARK_TTL", "5"))  # Seconds between watermark re-checks
+
+    # In-memory ring buffers of recent measurements per (journey, mode), served by /api/journeys/<id>/recent
+    TIMESERIES_RETENTION_HOURS = int(os.getenv("TIMESERIES_RETENTION_HOURS", "168"))  # Longest in-memory window
+    # Samples per series; defaults to the retention plus a day of 15-minute slots
+    TIMESERIES_CAPACITY = int(os.getenv("TIMESERIES_CAPACITY", str((TIMESERIES_RETENTION_HOURS + 24) * 4)))
+    TIMESERIES_WARM_ON_START = os.getenv("TIMESERIES_WARM_ON_START", "true").lower() == "true"
+
+    # Columnar (Arrow/Parquet) archive of measurements for offline analysis
+    ARCHIVE_DATA_DIR = Path(os.getenv("ARCHIVE_DATA_DIR", str(METRICS_DATA_DIR / "archive")))
+
+    # Write-ahead spool of the scheduler's results, replayed into the database after an outage
+    SPOOL_DATA_DIR = Path(os.getenv("SPOOL_DATA_DIR", str(METRICS_DATA_DIR / "spool")))
+    SPOOL_ENABLED = os.getenv("SPOOL_ENABLED", "true").lower() == "true"
+    SPOOL_FSYNC = os.getenv("SPOOL_FSYNC", "true").lower() == "true"  # fsync each record before inserting it
+
+    # Geocoding cache settings (journeys setup)
+    GEOCODE_CACHE_TTL_DAYS = int(os.getenv("GEOCODE_CACHE_TTL_DAYS", "180"))  # Plus codes and timezones rarely change
+
+    # Online slowdown detection (scheduler)
+    ANOMALY_Z_THRESHOLD = float(os.getenv("ANOMALY_Z_THRESHOLD", "3.0"))  # Standard deviations above the slot mean
+    ANOMALY_MIN_SAMPLES = int(os.getenv("ANOMALY_MIN_SAMPLES", "8"))  # Samples a slot needs before it is scored
+
+    # Failure quarantine (scheduler): back off from journeys and modes that keep failing
+    QUARANTINE_AFTER_FAILURES = int(os.getenv("QUARANTINE_AFTER_FAILURES", "3"))  # Failures in a row to back off
+    QUARANTINE_BACKOFF_MINUTES = float(os.getenv("QUARANTINE_BACKOFF_MINUTES", "30"))  # First delay, then doubled
+    QUARANTINE_MAX_BACKOFF_HOURS = float(os.getenv("QUARANTINE_MAX_BACKOFF_HOURS", "24"))
+
+    # Google Maps spend (scheduler): per-day budget in USD, 0 disables it
+    API_DAILY_BUDGET_USD = float(os.getenv("API_DAILY_BUDGET_USD", "0"))
+    API_BUDGET_MODE = os.getenv("API_BUDGET_MODE", "soft").lower()  # soft: defer low-priority modes; hard: also stop
+    API_LOW_PRIORITY_MODES = os.getenv("API_LOW_PRIORITY_MODES", "bicycling,walking,driving_routed")
+
+    # Runtime settings
+    MAX_RUNTIME_SECONDS = float(os.getenv("MAX_RUNTIME_SECONDS", "60"))  # Target runtime limit
+    HEROKU_TIMEOUT_MARGIN = float(os.getenv("HEROKU_TIMEOUT_MARGIN", "25"))  # Safety margin for Heroku's 30s timeout
+
+    # Environment-specific settings
+    IS_HEROKU = "DYNO" in os.environ
+    LOG_LEVEL = (os.getenv("LOG_LEVEL") or ("DEBUG" if DEBUG and not IS_HEROKU else "INFO")).upper()
+    LOG_DEBUG_PER_MINUTE = int(os.getenv("LOG_DEBUG_PER_MINUTE", "60"))  # Debug records per call site; 0 = no limit
+    PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "10"))  # Sampling interval of --profile runs
+
+    return {name: value for name, value in locals().items() if name.isupper()}
+
+
+def ensure_loaded() -> None:
+    global _loaded
+    if _loaded:
+        return
+    with _load_lock:
+        if not _loaded:
+            # setdefault keeps values a script already overrode, e.g. `settings.DEBUG = True`
+            for name, value in environment_settings().items():
+                globals().setdefault(name, value)
+            _loaded = True
+
+
+def __getattr__(name: str) -> Any:
+    if not _loaded:
+        ensure_loaded()
+        if name in globals():
+            return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def get_google_maps_api_key() -> str:
     """Get Google Maps API key from environment variables."""
+    ensure_loaded()
     api_key = os.getenv("GOOGLE_MAPS_API_KEY")
     if not api_key:
         raise ValueError("GOOGLE_MAPS_API_KEY environment variable is not set")
@@ -94,7 +242,7 @@ def get_metrics_path(journey_name: str) -> Path:
     # Create a directory for today's date
     today = datetime.now().strftime("%Y-%m-%d")
     metrics_dir = METRICS_DATA_DIR / today
-    metrics_dir.mkdir(exist_ok=True)
+    metrics_dir.mkdir(parents=True, exist_ok=True)
 
     # Create filename with timestamp
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -102,10 +250,9 @@ def get_metrics_path(journey_name: str) -> Path:
     return metrics_dir / filename
 
 
-# Environment-specific settings
-IS_HEROKU = "DYNO" in os.environ
-
-# Logging settings
-LOG_FORMAT = "%(asctime)s.%(msecs)03d - %(name)s - %(levelname)s - %(message)s"
-LOG_DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
-LOG_LEVEL = "DEBUG" if DEBUG and not IS_HEROKU else "INFO"
+# Debugging: Print database connection details (excluding password)
+# (This now only runs when the module is executed directly.)
+if __name__ == "__main__":
+    ensure_loaded()
+    print(f"🔍 DEBUG: DB_PORT (raw) = {os.getenv('DB_PORT')}")
+    print(f"🔹 Connecting to: {DATABASE_URL}")
@@ -0,0 +1,209 @@
+import logging
+import math
+import struct
+import sys
+from array import array
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from core.journey.heatmap import DAYS, SLOTS, HeatmapMatrix
+from database.models.journey_anomaly import JourneyAnomaly
+from database.models.journey_baseline import JourneyBaseline
+from database.models.journey_measurement import JourneyMeasurement
+
+logger = logging.getLogger(__name__)
+
+# magic, version, days, slots
+HEADER = struct.Struct("<4sBBH")
+MAGIC = b"TTBL"
+VERSION = 1
+
+# Floor on the standard deviation, relative to the mean, so near-constant slots don't flag trivial changes
+MIN_RELATIVE_STD = 0.05
+
+
+class BaselineMatrix:
+    """
+    Welford running mean and variance of duration for every day-of-week × time-slot cell.
+
+    Stored as an 8-byte header followed by uint32 counts, float64 means and float64 sums of squared
+    deviations (~13 KB), so each new measurement updates and scores its cell in constant time.
+    """
+
+    def __init__(
+        self,
+        counts: Optional[array] = None,
+        means: Optional[array] = None,
+        m2: Optional[array] = None,
+    ):
+        cells = DAYS * SLOTS
+        self.counts = counts if counts is not None else array("I", [0] * cells)
+        self.means = means if means is not None else array("d", [0.0] * cells)
+        self.m2 = m2 if m2 is not None else array("d", [0.0] * cells)
+
+    def add(self, day_of_week_id: int, time_slot_id: int, value: float) -> None:
+        index = HeatmapMatrix.cell(day_of_week_id, time_slot_id)
+        count = self.counts[index] + 1
+        delta = value - self.means[index]
+        self.counts[index] = count
+        self.means[index] += delta / count
+        self.m2[index] += delta * (value - self.means[index])
+
+    def stats(self, day_of_week_id: int, time_slot_id: int) -> Tuple[int, float, float]:
+        """(count, mean, standard deviation) for one cell."""
+        index = HeatmapMatrix.cell(day_of_week_id, time_slot_id)
+        count = self.counts[index]
+        std = math.sqrt(self.m2[index] / (count - 1)) if count > 1 else 0.0
+        return count, self.means[index], std
+
+    def score(
+        self, day_of_week_id: int, time_slot_id: int, value: float, min_samples: int
+    ) -> Optional[Tuple[float, float]]:
+        """(z-score, expected value) of `value` against the cell, or None until it has `min_samples`."""
+        count, mean, std = self.stats(day_of_week_id, time_slot_id)
+        if count < min_samples:
+            return None
+        std = max(std, abs(mean) * MIN_RELATIVE_STD, 1e-9)
+        return (value - mean) / std, mean
+
+    def to_bytes(self) -> bytes:
+        counts, means, m2 = array("I", self.counts), array("d", self.means), array("d", self.m2)
+        if sys.byteorder == "big":
+            for values in (counts, means, m2):
+                values.byteswap()
+        return HEADER.pack(MAGIC, VERSION, DAYS, SLOTS) + counts.tobytes() + means.tobytes() + m2.tobytes()
+
+    @classmethod
+    def from_bytes(cls, payload: bytes) -> "BaselineMatrix":
+        magic, version, days, slots = HEADER.unpack_from(payload)
+        if magic != MAGIC or version != VERSION or (days, slots) != (DAYS, SLOTS):
+            raise ValueError("Unrecognized baseline payload")
+        cells = DAYS * SLOTS
+        counts, means, m2 = array("I"), array("d"), array("d")
+        offset = HEADER.size
+        for values in (counts, means, m2):
+            end = offset + cells * values.itemsize
+            values.frombytes(payload[offset:end])
+            offset = end
+        if sys.byteorder == "big":
+            for values in (counts, means, m2):
+                values.byteswap()
+        return cls(counts=counts, means=means, m2=m2)
+
+
+@dataclass
+class Baseline:
+    transit_mode_id: int
+    row: Optional[JourneyBaseline]
+    matrix: BaselineMatrix
+    dirty: bool = False
+
+
+class AnomalyDetector:
+    """
+    Score new measurements against per-slot duration baselines as the scheduler saves them.
+
+    A (journey, calculator mode) baseline is loaded once per run (seeded from history the first time it is seen),
+    updated in memory with every observed measurement and written back by `flush()` in the caller's
+    transaction. Durations more than `z_threshold` standard deviations above the slot mean are
+    recorded in journey_anomalies.
+    """
+
+    def __init__(self, z_threshold: Optional[float] = None, min_samples: Optional[int] = None):
+        self.z_threshold = z_threshold if z_threshold is not None else settings.ANOMALY_Z_THRESHOLD
+        self.min_samples = min_samples if min_samples is not None else settings.ANOMALY_MIN_SAMPLES
+        self.baselines: Dict[Tuple[int, str], Baseline] = {}
+
+    def seed(self, db: Session, journey_id: int, mode: str) -> BaselineMatrix:
+        """Build a baseline from stored history; only happens the first time a (journey, mode) is observed."""
+        matrix = BaselineMatrix()
+        query = (
+            db.query(
+                JourneyMeasurement.day_of_week_id, JourneyMeasurement.time_slot_id, JourneyMeasurement.duration_seconds
+            )
+            .filter(JourneyMeasurement.journey_id == journey_id, JourneyMeasurement.mode == mode)
+            .order_by(JourneyMeasurement.id)
+        )
+        for day_of_week_id, time_slot_id, duration in query.execution_options(yield_per=5000):
+            matrix.add(day_of_week_id, time_slot_id, float(duration))
+        return matrix
+
+    def baseline(self, db: Session, journey_id: int, mode: str, transit_mode_id: int) -> Baseline:
+        key = (journey_id, mode)
+        if key not in self.baselines:
+            # Don't flush the measurement being observed, or seeding would count it twice
+            with db.no_autoflush:
+                row = db.query(JourneyBaseline).filter_by(journey_id=journey_id, mode=mode).first()
+                if row is not None:
+                    self.baselines[key] = Baseline(transit_mode_id, row, BaselineMatrix.from_bytes(row.payload))
+                else:
+                    matrix = self.seed(db, journey_id, mode)
+                    self.baselines[key] = Baseline(transit_mode_id, None, matrix, dirty=True)
+        return self.baselines[key]
+
+    def observe(self, db: Session, measurement: JourneyMeasurement) -> Optional[JourneyAnomaly]:
+        """Score a new (unflushed) measurement, fold it into its baseline and stage an anomaly if it is one."""
+        baseline = self.baseline(db, measurement.journey_id, measurement.mode, measurement.transit_mode_id)
+        duration = float(measurement.duration_seconds)
+        scored = baseline.matrix.score(measurement.day_of_week_id, measurement.time_slot_id, duration, self.min_samples)
+        baseline.matrix.add(measurement.day_of_week_id, measurement.time_slot_id, duration)
+        baseline.dirty = True
+
+        if scored is None:
+            return None
+        z_score, expected = scored
+        if z_score < self.z_threshold:
+            return None
+
+        anomaly = JourneyAnomaly(
+            measurement=measurement,
+            journey_id=measurement.journey_id,
+            transit_mode_id=measurement.transit_mode_id,
+            mode=measurement.mode,
+            day_of_week_id=measurement.day_of_week_id,
+            time_slot_id=measurement.time_slot_id,
+            timestamp=measurement.timestamp,
+            duration_seconds=int(duration),
+            expected_seconds=expected,
+            z_score=z_score,
+            created_at=datetime.now(timezone.utc),
+        )
+        db.add(anomaly)
+        logger.warning(
+            f"Slowdown on journey {measurement.journey_id} ({measurement.mode}): "
+            f"{int(duration)}s against {expected:.0f}s expected (z={z_score:.1f})"
+        )
+        return anomaly
+
+    def flush(self, db: Session) -> int:
+        """Stage updated baselines on `db`; they are committed with the caller's transaction."""
+        now = datetime.now(timezone.utc)
+        flushed = 0
+        for (journey_id, mode), baseline in self.baselines.items():
+            if not baseline.dirty:
+                continue
+            if baseline.row is None:
+                baseline.row = JourneyBaseline(
+                    journey_id=journey_id, transit_mode_id=baseline.transit_mode_id, mode=mode
+                )
+                db.add(baseline.row)
+            baseline.row.payload = baseline.matrix.to_bytes()
+            baseline.row.updated_at = now
+            baseline.dirty = False
+            flushed += 1
+        return flushed
+
+    def reset(self) -> None:
+        """Drop in-memory state, e.g. after a rollback, so baselines are reloaded from what was committed."""
+        self.baselines.clear()
+
+
+def recent_anomalies(db: Session, journey_id: Optional[int] = None, limit: int = 100) -> List[JourneyAnomaly]:
+    query = db.query(JourneyAnomaly)
+    if journey_id is not None:
+        query = query.filter(JourneyAnomaly.journey_id == journey_id)
+    return query.order_by(JourneyAnomaly.timestamp.desc()).limit(limit).all()
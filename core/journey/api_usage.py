@@ -0,0 +1,241 @@
+import calendar
+import logging
+import threading
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Tuple
+
+import googlemaps
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from database.models.api_usage import ApiUsage
+
+logger = logging.getLogger(__name__)
+
+# List prices in USD per 1000 requests for the client methods we call; adjust when Google's pricing changes
+PRICES_PER_1000: Dict[str, float] = {
+    "directions": 5.0,
+    "find_place": 17.0,
+    "place": 17.0,
+    "places": 32.0,
+    "places_nearby": 32.0,
+    "geocode": 5.0,
+    "reverse_geocode": 5.0,
+    "timezone": 5.0,
+}
+# Driving directions with a departure time include traffic and are billed as Directions Advanced
+DIRECTIONS_ADVANCED_PER_1000 = 10.0
+
+UsageKey = Tuple[str, str]  # (endpoint, mode); mode is "" for endpoints without one
+
+# Source of the load generator's calls to its fake client: nothing was billed, so budgets and reports skip them
+SIMULATED_SOURCE = "loadgen"
+
+
+def call_mode(endpoint: str, kwargs: Dict[str, Any]) -> str:
+    """Calculator mode key of a Directions call, e.g. "driving_routed"; "" for other endpoints."""
+    if endpoint != "directions":
+        return ""
+    mode = kwargs.get("mode") or "driving"
+    return f"{mode}_routed" if kwargs.get("waypoints") else mode
+
+
+def call_price(endpoint: str, kwargs: Dict[str, Any]) -> float:
+    if endpoint == "directions" and kwargs.get("departure_time") and (kwargs.get("mode") or "driving") == "driving":
+        return DIRECTIONS_ADVANCED_PER_1000 / 1000
+    return PRICES_PER_1000[endpoint] / 1000
+
+
+class CountingClient:
+    """
+    Wraps a googlemaps.Client and counts billable calls per endpoint and mode.
+
+    Everything else is delegated to the wrapped client, so it can be passed wherever a client is expected.
+    Counts accumulate in memory and are written to api_usage by `flush()`, one row per endpoint and mode
+    for the run.
+    """
+
+    def __init__(self, client: googlemaps.Client, source: str):
+        self.client = client
+        self.source = source
+        self.run_started_at = datetime.now(timezone.utc)
+        self.calls: Counter = Counter()
+        self.costs: Dict[UsageKey, float] = {}
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self.client, name)
+        if name not in PRICES_PER_1000 or not callable(attr):
+            return attr
+
+        def counted(*args: Any, **kwargs: Any) -> Any:
+            self.record(name, call_mode(name, kwargs), call_price(name, kwargs))
+            return attr(*args, **kwargs)
+
+        return counted
+
+    def record(self, endpoint: str, mode: str, price: float) -> None:
+        key = (endpoint, mode)
+        with self._lock:
+            self.calls[key] += 1
+            self.costs[key] = self.costs.get(key, 0.0) + price
+
+    def run_calls(self) -> int:
+        return sum(self.calls.values())
+
+    def run_cost(self) -> float:
+        return sum(self.costs.values())
+
+    def flush(self, db: Session) -> int:
+        """
+        Add this run's counts to api_usage and commit; counting starts over for the next flush. If the commit
+        fails, the counts are merged back (with any calls made meanwhile) so a later flush still records them.
+        """
+        with self._lock:
+            calls, costs = self.calls, self.costs
+            self.calls, self.costs = Counter(), {}
+        try:
+            for (endpoint, mode), count in calls.items():
+                db.add(
+                    ApiUsage(
+                        run_started_at=self.run_started_at,
+                        day=self.run_started_at.date(),
+                        source=self.source,
+                        endpoint=endpoint,
+                        mode=mode,
+                        calls=count,
+                        cost_usd=round(costs[(endpoint, mode)], 6),
+                    )
+                )
+            db.commit()
+        except Exception:
+            with self._lock:
+                self.calls.update(calls)
+                for key, cost in costs.items():
+                    self.costs[key] = self.costs.get(key, 0.0) + cost
+            raise
+        return sum(calls.values())
+
+
+def billable_usage(db: Session, *columns: Any) -> Any:
+    """Query `columns` over api_usage rows of real (not simulated) calls."""
+    return db.query(*columns).filter(ApiUsage.source != SIMULATED_SOURCE)
+
+
+def cost_since(db: Session, start: date, end: Optional[date] = None) -> float:
+    query = billable_usage(db, func.coalesce(func.sum(ApiUsage.cost_usd), 0.0)).filter(ApiUsage.day >= start)
+    if end is not None:
+        query = query.filter(ApiUsage.day < end)
+    return float(query.scalar() or 0.0)
+
+
+def day_fraction(now: datetime) -> float:
+    """Share of the UTC day that has passed, floored at one 15-minute slot so early projections stay finite."""
+    midnight = datetime.combine(now.date(), time.min, tzinfo=timezone.utc)
+    return max((now - midnight).total_seconds() / 86400, 1 / 96)
+
+
+def usage_report(db: Session, now: Optional[datetime] = None) -> Dict[str, Any]:
+    """Today's calls and cost per endpoint and mode, month to date and the projected month total (UTC days)."""
+    now = now or datetime.now(timezone.utc)
+    today = now.date()
+    month_start = today.replace(day=1)
+    days_in_month = calendar.monthrange(today.year, today.month)[1]
+
+    rows = (
+        billable_usage(db, ApiUsage.endpoint, ApiUsage.mode, func.sum(ApiUsage.calls), func.sum(ApiUsage.cost_usd))
+        .filter(ApiUsage.day == today)
+        .group_by(ApiUsage.endpoint, ApiUsage.mode)
+        .order_by(ApiUsage.endpoint, ApiUsage.mode)
+        .all()
+    )
+    today_cost = sum(float(cost) for _, _, _, cost in rows)
+    before_today = cost_since(db, month_start, today)
+
+    # Today is extrapolated from its own pace; the rest of the month from the last week's days with usage
+    today_projected = today_cost / day_fraction(now)
+    week_cost, week_days = (
+        billable_usage(db, func.coalesce(func.sum(ApiUsage.cost_usd), 0.0), func.count(func.distinct(ApiUsage.day)))
+        .filter(ApiUsage.day >= today - timedelta(days=7), ApiUsage.day < today)
+        .one()
+    )
+    daily_average = float(week_cost) / week_days if week_days else today_projected
+    projected_month = before_today + today_projected + daily_average * (days_in_month - today.day)
+
+    return {
+        "day": today.isoformat(),
+        "today": [
+            {"endpoint": endpoint, "mode": mode or None, "calls": int(calls), "cost_usd": round(float(cost), 4)}
+            for endpoint, mode, calls, cost in rows
+        ],
+        "today_cost_usd": round(today_cost, 2),
+        "month_to_date_usd": round(before_today + today_cost, 2),
+        "daily_average_usd": round(daily_average, 2),
+        "projected_month_usd": round(projected_month, 2),
+        "daily_budget_usd": settings.API_DAILY_BUDGET_USD or None,
+    }
+
+
+@dataclass
+class BudgetDecision:
+    spent_usd: float
+    projected_day_usd: float
+    deferred_modes: FrozenSet[str] = field(default_factory=frozenset)
+    stop: bool = False
+
+
+class ApiBudget:
+    """
+    Per-day (UTC) spending limit for the scheduler.
+
+    When today's pace projects past the budget, low-priority modes are deferred. In `hard` mode nothing more
+    is requested once the budget is spent; `soft` mode keeps measuring the high-priority modes regardless.
+    A budget of 0 disables the checks.
+    """
+
+    def __init__(
+        self,
+        daily_budget: Optional[float] = None,
+        mode: Optional[str] = None,
+        low_priority_modes: Optional[List[str]] = None,
+        clock: Callable[[], datetime] = lambda: datetime.now(timezone.utc),
+    ):
+        self.daily_budget = daily_budget if daily_budget is not None else settings.API_DAILY_BUDGET_USD
+        self.mode = (mode or settings.API_BUDGET_MODE).lower()
+        if low_priority_modes is None:
+            low_priority_modes = [m.strip() for m in settings.API_LOW_PRIORITY_MODES.split(",") if m.strip()]
+        self.low_priority_modes = frozenset(low_priority_modes)
+        self.clock = clock
+        self.spent_before_run = 0.0
+        self._warned = False
+
+    @property
+    def enabled(self) -> bool:
+        return self.daily_budget > 0
+
+    def start_run(self, db: Session) -> None:
+        """Read what today's earlier runs spent; call once per run before `check`."""
+        self._warned = False
+        if self.enabled:
+            self.spent_before_run = cost_since(db, self.clock().date())
+
+    def check(self, client: CountingClient) -> BudgetDecision:
+        if not self.enabled:
+            return BudgetDecision(spent_usd=client.run_cost(), projected_day_usd=0.0)
+
+        now = self.clock()
+        spent = self.spent_before_run + client.run_cost()
+        projected = spent / day_fraction(now)
+        stop = self.mode == "hard" and spent >= self.daily_budget
+        deferred = self.low_priority_modes if projected > self.daily_budget else frozenset()
+        if (stop or deferred) and not self._warned:
+            self._warned = True
+            action = "stopping" if stop else f"deferring {', '.join(sorted(deferred))}"
+            logger.warning(
+                f"API spend ${spent:.2f} today, on pace for ${projected:.2f} against a "
+                f"${self.daily_budget:.2f} budget: {action}"
+            )
+        return BudgetDecision(spent_usd=spent, projected_day_usd=projected, deferred_modes=deferred, stop=stop)
@@ -0,0 +1,271 @@
+import json
+import logging
+import os
+from datetime import date, datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from database.models.journey_leg import JourneyLeg
+from database.models.journey_measurement import JourneyMeasurement
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as pa_ipc
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - optional dependency
+    pa = None
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_FORMATS = ("arrow", "parquet")
+WATERMARK_FILENAME = "_watermark.json"
+
+
+def read_watermarks(archive_dir: Path) -> Dict[str, int]:
+    path = archive_dir / WATERMARK_FILENAME
+    if not path.exists():
+        return {}
+    return {k: int(v) for k, v in json.loads(path.read_text(encoding="utf-8")).items()}
+
+
+def write_watermark(archive_dir: Path, table_name: str, last_id: int) -> None:
+    watermarks = read_watermarks(archive_dir)
+    watermarks[table_name] = last_id
+    path = archive_dir / WATERMARK_FILENAME
+    tmp_path = path.with_suffix(".tmp")
+    tmp_path.write_text(json.dumps(watermarks, indent=2), encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
+def rewind_archive(table_name: str, after_id: int, archive_dir: Optional[Path] = None) -> int:
+    """
+    Make the next export rewrite rows with ids above `after_id`, e.g. after a backfill changed them: delete
+    the files holding any of them and move the table's watermark back to before the first row they held.
+    Returns the number of files deleted. Doesn't need pyarrow.
+    """
+    archive_dir = archive_dir or settings.ARCHIVE_DATA_DIR
+    watermark = read_watermarks(archive_dir).get(table_name, 0)
+    if after_id >= watermark:
+        return 0
+
+    files = []
+    for path in (archive_dir / table_name).glob("date=*/part-*"):
+        _, first_id, last_id = path.stem.split("-")
+        files.append((int(first_id), int(last_id), path))
+
+    # A batch is split into one file per day, so a file dropped for its newer rows can hold older ones too
+    removed = set()
+    while True:
+        stale = [(first_id, path) for first_id, last_id, path in files if last_id > after_id and path not in removed]
+        if not stale:
+            break
+        removed.update(path for _, path in stale)
+        after_id = min([after_id] + [first_id - 1 for first_id, _ in stale])
+
+    for path in removed:
+        path.unlink(missing_ok=True)
+    write_watermark(archive_dir, table_name, after_id)
+    logger.info(f"Rewound the {table_name} archive to id {after_id} ({len(removed)} files to rewrite)")
+    return len(removed)
+
+
+def require_pyarrow() -> None:
+    if pa is None:
+        raise ImportError("The measurement archive needs pyarrow: install it with `poetry install --extras archive`")
+
+
+def measurement_schema() -> "pa.Schema":
+    return pa.schema(
+        [
+            ("id", pa.int64()),
+            ("journey_id", pa.int32()),
+            ("transit_mode_id", pa.int16()),
+            ("timestamp", pa.timestamp("us", tz="UTC")),
+            ("local_timestamp", pa.timestamp("us", tz="UTC")),
+            ("day_of_week_id", pa.int8()),
+            ("time_slot_id", pa.int16()),
+            ("duration_seconds", pa.int32()),
+            ("distance_meters", pa.float64()),
+            ("speed_kph", pa.float64()),
+        ]
+    )
+
+
+def leg_schema() -> "pa.Schema":
+    return pa.schema(
+        [
+            ("id", pa.int64()),
+            ("journey_measurement_id", pa.int64()),
+            ("sequence_number", pa.int16()),
+            ("start_waypoint_id", pa.int32()),
+            ("end_waypoint_id", pa.int32()),
+            ("duration_seconds", pa.int32()),
+            ("distance_meters", pa.float64()),
+            ("speed_kph", pa.float64()),
+            ("created_at", pa.timestamp("us", tz="UTC")),
+        ]
+    )
+
+
+# table name -> (model, timestamp column used for date partitioning, schema factory)
+ARCHIVE_TABLES: Dict[str, Tuple[Any, str, Any]] = {
+    "journey_measurements": (JourneyMeasurement, "timestamp", measurement_schema),
+    "journey_legs": (JourneyLeg, "created_at", leg_schema),
+}
+
+
+def utc(dt: datetime) -> datetime:
+    return dt.replace(tzinfo=timezone.utc) if dt.tzinfo is None else dt.astimezone(timezone.utc)
+
+
+class MeasurementArchiver:
+    """
+    Incrementally copy journey_measurements and journey_legs into date-partitioned columnar files.
+
+    Files live at `<archive_dir>/<table>/date=YYYY-MM-DD/part-<first_id>-<last_id>.<ext>`. The highest
+    exported id per table is kept in `_watermark.json`, so each run only reads rows added since the last one.
+    """
+
+    def __init__(
+        self,
+        db: Session,
+        archive_dir: Optional[Path] = None,
+        archive_format: str = "arrow",
+        batch_size: int = 50000,
+    ):
+        require_pyarrow()
+        if archive_format not in ARCHIVE_FORMATS:
+            raise ValueError(f"Unsupported archive format '{archive_format}' (expected one of {ARCHIVE_FORMATS})")
+        self.db = db
+        self.archive_dir = archive_dir or settings.ARCHIVE_DATA_DIR
+        self.archive_format = archive_format
+        self.batch_size = batch_size
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+
+    @property
+    def watermark_path(self) -> Path:
+        return self.archive_dir / WATERMARK_FILENAME
+
+    def read_watermarks(self) -> Dict[str, int]:
+        return read_watermarks(self.archive_dir)
+
+    def write_watermark(self, table_name: str, last_id: int) -> None:
+        write_watermark(self.archive_dir, table_name, last_id)
+
+    def iter_batches(self, table_name: str, after_id: int) -> Iterator[List[Dict[str, Any]]]:
+        model, _, schema_factory = ARCHIVE_TABLES[table_name]
+        columns = [getattr(model, name) for name in schema_factory().names]
+        query = self.db.query(*columns).filter(model.id > after_id).order_by(model.id)
+
+        batch: List[Dict[str, Any]] = []
+        for row in query.execution_options(yield_per=self.batch_size):
+            batch.append(dict(row._mapping))
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def write_partition(self, table_name: str, partition: date, rows: List[Dict[str, Any]]) -> Path:
+        _, _, schema_factory = ARCHIVE_TABLES[table_name]
+        schema = schema_factory()
+        for row in rows:
+            for field in schema:
+                value = row[field.name]
+                if isinstance(value, datetime):
+                    row[field.name] = utc(value)
+                elif value is not None and pa.types.is_floating(field.type):
+                    row[field.name] = float(value)
+        table = pa.Table.from_pylist(rows, schema=schema)
+
+        partition_dir = self.archive_dir / table_name / f"date={partition.isoformat()}"
+        partition_dir.mkdir(parents=True, exist_ok=True)
+        extension = "parquet" if self.archive_format == "parquet" else "arrow"
+        path = partition_dir / f"part-{rows[0]['id']:012d}-{rows[-1]['id']:012d}.{extension}"
+        tmp_path = path.with_suffix(".tmp")
+
+        if self.archive_format == "parquet":
+            pq.write_table(table, tmp_path, compression="zstd")
+        else:
+            # Uncompressed IPC so readers can memory-map the buffers without copying
+            with pa.OSFile(str(tmp_path), "wb") as sink:
+                with pa_ipc.new_file(sink, schema) as writer:
+                    writer.write_table(table)
+        os.replace(tmp_path, path)
+        return path
+
+    def export_table(self, table_name: str) -> int:
+        _, partition_column, _ = ARCHIVE_TABLES[table_name]
+        after_id = self.read_watermarks().get(table_name, 0)
+        exported = 0
+
+        for batch in self.iter_batches(table_name, after_id):
+            partitions: Dict[date, List[Dict[str, Any]]] = {}
+            for row in batch:
+                partitions.setdefault(utc(row[partition_column]).date(), []).append(row)
+            for partition, rows in sorted(partitions.items()):
+                self.write_partition(table_name, partition, rows)
+
+            # Only advance the watermark once every partition of the batch is on disk
+            self.write_watermark(table_name, int(batch[-1]["id"]))
+            exported += len(batch)
+            logger.info(f"Archived {exported} {table_name} rows (through id {batch[-1]['id']})")
+
+        return exported
+
+    def export_all(self) -> Dict[str, int]:
+        return {table_name: self.export_table(table_name) for table_name in ARCHIVE_TABLES}
+
+
+class MeasurementArchiveReader:
+    """Scan the columnar archive without touching the database, memory-mapping files and projecting columns."""
+
+    def __init__(self, archive_dir: Optional[Path] = None, table_name: str = "journey_measurements"):
+        require_pyarrow()
+        if table_name not in ARCHIVE_TABLES:
+            raise ValueError(f"Unknown archive table '{table_name}'")
+        self.archive_dir = archive_dir or settings.ARCHIVE_DATA_DIR
+        self.table_name = table_name
+
+    def partition_files(self, start: Optional[date] = None, end: Optional[date] = None) -> List[Path]:
+        """Files for partitions in [start, end], pruned by directory name before anything is opened."""
+        files: List[Path] = []
+        for partition_dir in sorted((self.archive_dir / self.table_name).glob("date=*")):
+            partition = date.fromisoformat(partition_dir.name.split("=", 1)[1])
+            if (start and partition < start) or (end and partition > end):
+                continue
+            files.extend(sorted(partition_dir.glob("part-*.arrow")))
+            files.extend(sorted(partition_dir.glob("part-*.parquet")))
+        return files
+
+    def read_file(self, path: Path, columns: Optional[Sequence[str]] = None) -> "pa.Table":
+        if path.suffix == ".parquet":
+            return pq.read_table(path, columns=list(columns) if columns else None, memory_map=True)
+        source = pa.memory_map(str(path), "r")
+        table = pa_ipc.open_file(source).read_all()
+        return table.select(list(columns)) if columns else table
+
+    def read(
+        self,
+        columns: Optional[Sequence[str]] = None,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+    ) -> "pa.Table":
+        tables = [self.read_file(path, columns) for path in self.partition_files(start, end)]
+        if not tables:
+            schema = ARCHIVE_TABLES[self.table_name][2]()
+            return schema.empty_table().select(list(columns)) if columns else schema.empty_table()
+        return pa.concat_tables(tables)
+
+    def iter_tables(
+        self,
+        columns: Optional[Sequence[str]] = None,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+    ) -> Iterator["pa.Table"]:
+        """Yield one file at a time, for scans over more history than should be resident at once."""
+        for path in self.partition_files(start, end):
+            yield self.read_file(path, columns)
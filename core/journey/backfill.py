@@ -0,0 +1,342 @@
+import json
+import logging
+import math
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import insert, update
+from sqlalchemy.orm import Session
+
+from core.cache.response_cache import publish_watermark
+from core.config import settings
+from core.journey.calculator import JourneyMetricsCalculator
+from core.journey.forecast import ForecastBuilder
+from core.journey.heatmap import HeatmapBuilder
+from database.models.journey_baseline import JourneyBaseline
+from database.models.journey_forecast import JourneyForecast
+from database.models.journey_heatmap import JourneyHeatmap
+from database.models.journey_leg import JourneyLeg
+from database.models.journey_measurement import JourneyMeasurement
+from database.models.measurement_revision import MeasurementRevision
+from database.models.waypoint import Waypoint
+
+logger = logging.getLogger(__name__)
+
+METRIC_FIELDS = ("duration_seconds", "distance_meters", "speed_kph")
+
+
+def directions_legs(raw_response: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Rebuild Directions-style legs from a stored raw_response.
+
+    Measurements store the calculator's output (`metrics` and `leg_details`) rather than the Directions
+    payload, so the legs are reconstructed from leg_details unless raw `legs` were kept.
+    """
+    if raw_response.get("legs"):
+        return raw_response["legs"]
+    return [
+        {
+            "start_address": leg.get("start_address"),
+            "end_address": leg.get("end_address"),
+            "duration": {"value": leg.get("duration_seconds", 0)},
+            "distance": {"value": leg.get("distance_meters", 0)},
+        }
+        for leg in raw_response.get("leg_details") or []
+    ]
+
+
+def derive_chunk(rows: List[Tuple[int, Optional[Dict[str, Any]]]]) -> List[Dict[str, Any]]:
+    """Re-run calculate_route_metrics for (id, raw_response) pairs. Runs in a worker process."""
+    derived: List[Dict[str, Any]] = []
+    for measurement_id, raw_response in rows:
+        if not raw_response:
+            continue
+        legs = directions_legs(raw_response)
+        if not legs:
+            continue
+        result = JourneyMetricsCalculator.calculate_route_metrics({"legs": legs})
+        derived.append({"id": measurement_id, **result["metrics"], "raw_response": result})
+    return derived
+
+
+def metrics_changed(current: Tuple[Any, ...], derived: Dict[str, Any]) -> bool:
+    for field, value in zip(METRIC_FIELDS, current):
+        # Compare at the precision the Numeric(…, 2) columns store
+        if value is None or not math.isclose(float(value), round(float(derived[field]), 2), abs_tol=0.005):
+            return True
+    return False
+
+
+@dataclass
+class BackfillStats:
+    scanned: int = 0
+    updated: int = 0
+    legs: int = 0
+    last_id: int = 0
+    elapsed: float = 0.0
+    # Rows whose metrics changed, kept in the checkpoint until the data derived from them is rebuilt
+    first_updated_id: Optional[int] = None
+    journeys: Set[int] = field(default_factory=set)
+    invalidated: int = 0  # Journeys whose heatmaps, baselines and forecasts were rebuilt
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.scanned / self.elapsed if self.elapsed else 0.0
+
+
+class MeasurementBackfill:
+    """
+    Recompute stored metrics for journey_measurements from their raw_response.
+
+    Measurements are read in primary-key chunks; chunks are derived in a process pool while this process
+    writes finished chunks back in order with bulk updates. The last written id is checkpointed to a JSON
+    file after every chunk, so an interrupted run resumes where it stopped. `max_rows_per_second` throttles
+    the scan so a backfill can run alongside the live scheduler.
+    """
+
+    def __init__(
+        self,
+        db: Session,
+        name: str = "metrics",
+        chunk_size: int = 2000,
+        processes: Optional[int] = None,
+        max_rows_per_second: Optional[float] = None,
+        with_legs: bool = False,
+        dry_run: bool = False,
+        checkpoint_dir: Optional[Path] = None,
+    ):
+        self.db = db
+        self.name = name
+        self.chunk_size = chunk_size
+        self.processes = processes or os.cpu_count() or 1
+        self.max_rows_per_second = max_rows_per_second
+        self.with_legs = with_legs
+        self.dry_run = dry_run
+        self.checkpoint_dir = checkpoint_dir or settings.BACKFILL_DATA_DIR
+        self._waypoints: Dict[int, List[int]] = {}
+
+    @property
+    def checkpoint_path(self) -> Path:
+        return self.checkpoint_dir / f"{self.name}.json"
+
+    def read_checkpoint(self) -> BackfillStats:
+        if not self.checkpoint_path.exists():
+            return BackfillStats()
+        checkpoint = json.loads(self.checkpoint_path.read_text(encoding="utf-8"))
+        return BackfillStats(
+            last_id=int(checkpoint.get("last_id", 0)),
+            first_updated_id=checkpoint.get("first_updated_id"),
+            journeys=set(checkpoint.get("journeys", [])),
+        )
+
+    def write_checkpoint(self, stats: BackfillStats) -> None:
+        self.checkpoint_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.checkpoint_path.with_suffix(".tmp")
+        checkpoint = {
+            "last_id": stats.last_id,
+            "scanned": stats.scanned,
+            "updated": stats.updated,
+            "first_updated_id": stats.first_updated_id,
+            "journeys": sorted(stats.journeys),
+            "updated_at": datetime.now(timezone.utc).isoformat(),
+        }
+        tmp_path.write_text(json.dumps(checkpoint, indent=2), encoding="utf-8")
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def reset_checkpoint(self) -> None:
+        self.checkpoint_path.unlink(missing_ok=True)
+
+    def read_chunk(self, after_id: int, end_id: Optional[int]) -> List[Tuple[Any, ...]]:
+        query = self.db.query(
+            JourneyMeasurement.id,
+            JourneyMeasurement.journey_id,
+            JourneyMeasurement.duration_seconds,
+            JourneyMeasurement.distance_meters,
+            JourneyMeasurement.speed_kph,
+            JourneyMeasurement.raw_response,
+        ).filter(JourneyMeasurement.id > after_id)
+        if end_id is not None:
+            query = query.filter(JourneyMeasurement.id <= end_id)
+        return query.order_by(JourneyMeasurement.id).limit(self.chunk_size).all()
+
+    def journey_waypoint_ids(self, journey_id: int) -> List[int]:
+        if journey_id not in self._waypoints:
+            self._waypoints[journey_id] = [
+                waypoint_id
+                for (waypoint_id,) in self.db.query(Waypoint.id)
+                .filter(Waypoint.journey_id == journey_id)
+                .order_by(Waypoint.sequence_number)
+            ]
+        return self._waypoints[journey_id]
+
+    def leg_rows(self, rows: List[Tuple[Any, ...]], derived: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        JourneyLeg rows for measurements that have none yet.
+
+        A single leg spans the first to last waypoint (direct routes); otherwise legs must line up one-to-one
+        with consecutive waypoints (routed driving). Measurements matching neither are skipped.
+        """
+        ids = [result["id"] for result in derived]
+        with_legs = {
+            measurement_id
+            for (measurement_id,) in self.db.query(JourneyLeg.journey_measurement_id)
+            .filter(JourneyLeg.journey_measurement_id.in_(ids))
+            .distinct()
+        }
+        journey_ids = {row.id: row.journey_id for row in rows}
+        now = datetime.now(timezone.utc)
+
+        legs: List[Dict[str, Any]] = []
+        for result in derived:
+            if result["id"] in with_legs:
+                continue
+            leg_details = result["raw_response"]["leg_details"]
+            waypoint_ids = self.journey_waypoint_ids(journey_ids[result["id"]])
+            if len(waypoint_ids) < 2:
+                continue
+            if len(leg_details) == 1:
+                endpoints = [(waypoint_ids[0], waypoint_ids[-1])]
+            elif len(leg_details) == len(waypoint_ids) - 1:
+                endpoints = list(zip(waypoint_ids, waypoint_ids[1:]))
+            else:
+                continue
+            for sequence_number, (leg, (start_id, end_id)) in enumerate(zip(leg_details, endpoints), 1):
+                legs.append(
+                    {
+                        "journey_measurement_id": result["id"],
+                        "sequence_number": sequence_number,
+                        "start_waypoint_id": start_id,
+                        "end_waypoint_id": end_id,
+                        "duration_seconds": leg["duration_seconds"],
+                        "distance_meters": leg["distance_meters"],
+                        "speed_kph": round(leg["speed_kph"], 2),
+                        "created_at": now,
+                    }
+                )
+        return legs
+
+    def write_chunk(self, rows: List[Tuple[Any, ...]], derived: List[Dict[str, Any]], stats: BackfillStats) -> None:
+        current = {row.id: (row.duration_seconds, row.distance_meters, row.speed_kph) for row in rows}
+        updates = [
+            {
+                "id": result["id"],
+                "duration_seconds": result["duration_seconds"],
+                "distance_meters": round(result["distance_meters"], 2),
+                "speed_kph": round(result["speed_kph"], 2),
+            }
+            for result in derived
+            if metrics_changed(current[result["id"]], result)
+        ]
+        legs = self.leg_rows(rows, derived) if self.with_legs else []
+
+        if updates and not self.dry_run:
+            journey_ids = {row.id: row.journey_id for row in rows}
+            stats.journeys.update(journey_ids[result["id"]] for result in updates)
+            first_id = min(result["id"] for result in updates)
+            stats.first_updated_id = min(first_id, stats.first_updated_id or first_id)
+
+        if not self.dry_run:
+            try:
+                if updates:
+                    self.db.execute(update(JourneyMeasurement), updates)
+                if legs:
+                    self.db.execute(insert(JourneyLeg), legs)
+                self.db.commit()
+            except Exception as e:
+                self.db.rollback()
+                logger.error(f"Error writing backfill chunk ending at id {rows[-1].id}: {str(e)}")
+                raise
+
+        stats.scanned += len(rows)
+        stats.updated += len(updates)
+        stats.legs += len(legs)
+        stats.last_id = int(rows[-1].id)
+        if not self.dry_run:
+            self.write_checkpoint(stats)
+
+    def throttle(self, stats: BackfillStats, started: float) -> None:
+        if not self.max_rows_per_second:
+            return
+        ahead = stats.scanned / self.max_rows_per_second - (time.monotonic() - started)
+        if ahead > 0:
+            time.sleep(ahead)
+
+    def invalidate(self, stats: BackfillStats) -> None:
+        """
+        Bring what is derived from the rewritten measurements up to date: heatmaps and forecasts of the affected
+        journeys are refit from scratch, their anomaly baselines are dropped (the scheduler re-seeds them from
+        history), a measurement revision moves the response cache watermark and ETags, and the archive is
+        rewound so its next export rewrites the changed rows.
+        """
+        from core.journey.archive import rewind_archive  # Keeps pyarrow out of the worker processes
+
+        journey_ids = sorted(stats.journeys)
+        first_id = stats.first_updated_id or 1
+        for model in (JourneyHeatmap, JourneyBaseline, JourneyForecast):
+            self.db.query(model).filter(model.journey_id.in_(journey_ids)).delete(synchronize_session=False)
+        self.db.add(
+            MeasurementRevision(
+                reason=f"backfill:{self.name}",
+                first_measurement_id=first_id,
+                last_measurement_id=stats.last_id,
+                rows=stats.updated,
+                created_at=datetime.now(timezone.utc),
+            )
+        )
+        self.db.commit()
+
+        HeatmapBuilder(self.db).refresh(journey_ids)
+        ForecastBuilder(self.db).refresh(journey_ids)
+        publish_watermark(self.db)
+        rewind_archive("journey_measurements", first_id - 1)
+
+        stats.invalidated = len(journey_ids)
+        stats.first_updated_id = None
+        stats.journeys = set()
+        self.write_checkpoint(stats)
+
+    def run(self, end_id: Optional[int] = None) -> BackfillStats:
+        stats = self.read_checkpoint()
+        if stats.last_id:
+            logger.info(f"Resuming {self.name} backfill after measurement id {stats.last_id}")
+
+        started = time.monotonic()
+        after_id = stats.last_id
+        pending: Deque[Tuple[List[Tuple[Any, ...]], "Future[List[Dict[str, Any]]]"]] = deque()
+
+        # Spawned workers don't inherit this process's database connections
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=self.processes, mp_context=context) as pool:
+            while True:
+                # Keep a couple of chunks per worker in flight, reading ahead while earlier ones derive
+                while len(pending) < self.processes * 2:
+                    rows = self.read_chunk(after_id, end_id)
+                    if not rows:
+                        break
+                    after_id = int(rows[-1].id)
+                    pending.append((rows, pool.submit(derive_chunk, [(row.id, row.raw_response) for row in rows])))
+                if not pending:
+                    break
+
+                # Chunks are written in id order so the checkpoint never skips an unwritten chunk
+                rows, future = pending.popleft()
+                self.write_chunk(rows, future.result(), stats)
+                stats.elapsed = time.monotonic() - started
+                logger.info(
+                    f"Backfilled through id {stats.last_id}: {stats.scanned} scanned, {stats.updated} updated, "
+                    f"{stats.legs} legs ({stats.rows_per_second:.0f} rows/sec)"
+                )
+                self.throttle(stats, started)
+
+        # Also picks up journeys left by an earlier run that was interrupted before getting here
+        if stats.journeys and not self.dry_run:
+            self.invalidate(stats)
+        stats.elapsed = time.monotonic() - started
+        return stats
@@ -0,0 +1,174 @@
+import json
+import logging
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+import pytz
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session, selectinload
+
+from core.config import settings
+from core.journey.processor import journey_fingerprint
+from database.models.journey import Journey
+from database.models.waypoint import Waypoint
+
+logger = logging.getLogger(__name__)
+
+
+def parse_timestamp(value: Optional[str], default: datetime) -> datetime:
+    if not value:
+        return default
+    timestamp = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return timestamp if timestamp.tzinfo else pytz.UTC.localize(timestamp)
+
+
+class JourneyBootstrapper:
+    """
+    Seed journeys and waypoints from an enriched journeys file without any Google Maps calls, and dump
+    the database back to that format.
+
+    The file is the one at settings.PROCESSED_JOURNEYS_PATH: a `journeys` list where each journey carries
+    fully enriched `waypoints` (place_id, plus_code, formatted_address, latitude, longitude).
+    """
+
+    def __init__(self, db: Session, batch_size: int = 1000, debug: Optional[bool] = None):
+        self.db = db
+        self.batch_size = batch_size
+        self.debug = debug if debug is not None else settings.DEBUG
+        self.failed = 0  # Journeys in the file that could not be loaded, e.g. without a timezone
+
+    def journey_row(
+        self, journey_data: Dict[str, Any], now: datetime, default_timezone: Optional[str]
+    ) -> Dict[str, Any]:
+        timezone = journey_data.get("timezone") or default_timezone
+        if not timezone:
+            raise ValueError(f"Journey '{journey_data['route_name']}' has no timezone and no default was given")
+
+        maps_url = journey_data.get("original_url") or journey_data.get("route_url")
+        description = journey_data.get("route_description")
+        return {
+            "name": journey_data["route_name"],
+            "description": description,
+            "city": journey_data.get("city") or "",
+            "state": journey_data.get("state") or "",
+            "country": journey_data.get("country") or "",
+            "timezone": timezone,
+            "status_id": 1,
+            "maps_url": maps_url,
+            "raw_data": {"url": maps_url},
+            "fingerprint": journey_fingerprint(maps_url, description) if maps_url else None,
+            "created_at": parse_timestamp(journey_data.get("created_at"), now),
+            "updated_at": now,
+        }
+
+    def load_batch(self, batch: List[Dict[str, Any]], default_timezone: Optional[str]) -> int:
+        now = datetime.now(pytz.UTC)
+        existing = {
+            name for (name,) in self.db.query(Journey.name).filter(Journey.name.in_([j["route_name"] for j in batch]))
+        }
+
+        journey_rows: List[Dict[str, Any]] = []
+        waypoints_by_name: Dict[str, List[Dict[str, Any]]] = {}
+        for journey_data in batch:
+            name = journey_data["route_name"]
+            if name in existing or name in waypoints_by_name:
+                logger.info(f"Journey '{name}' already exists. Skipping.")
+                continue
+            try:
+                journey_rows.append(self.journey_row(journey_data, now, default_timezone))
+            except (KeyError, ValueError) as e:
+                logger.error(f"Error loading journey '{name}': {str(e)}")
+                self.failed += 1
+                continue
+            waypoints_by_name[name] = journey_data.get("waypoints", [])
+
+        if not journey_rows:
+            return 0
+
+        # One multi-row INSERT ... RETURNING for the journeys, then one for all of their waypoints
+        inserted = self.db.execute(insert(Journey).returning(Journey.id, Journey.name), journey_rows).all()
+        waypoint_rows = [
+            {
+                "journey_id": journey_id,
+                "sequence_number": idx,
+                "place_id": waypoint["place_id"],
+                "plus_code": waypoint["plus_code"],
+                "formatted_address": waypoint["formatted_address"],
+                "latitude": waypoint["latitude"],
+                "longitude": waypoint["longitude"],
+                "created_at": now,
+            }
+            for journey_id, name in inserted
+            for idx, waypoint in enumerate(waypoints_by_name[name], 1)
+        ]
+        if waypoint_rows:
+            self.db.execute(insert(Waypoint), waypoint_rows)
+        self.db.commit()
+        return len(inserted)
+
+    def load_enriched_file(self, path: Optional[Path] = None, default_timezone: Optional[str] = None) -> int:
+        """Insert every journey in the file that isn't in the database yet. Returns the number inserted."""
+        path = path or settings.PROCESSED_JOURNEYS_PATH
+        if not path.exists():
+            raise FileNotFoundError(f"Enriched journeys file not found: {path}")
+
+        with path.open("r", encoding="utf-8") as f:
+            journeys_data = json.load(f).get("journeys", [])
+
+        loaded = 0
+        for start in range(0, len(journeys_data), self.batch_size):
+            try:
+                loaded += self.load_batch(journeys_data[start : start + self.batch_size], default_timezone)
+            except Exception as e:
+                self.db.rollback()
+                logger.error(f"Database error loading journeys {start}-{start + self.batch_size}: {str(e)}")
+                raise
+            self.db.expunge_all()
+
+        logger.info(f"Loaded {loaded} of {len(journeys_data)} journeys from {path} ({self.failed} failed)")
+        return loaded
+
+    def iter_enriched_journeys(self) -> Iterator[Dict[str, Any]]:
+        statement = select(Journey).options(selectinload(Journey.waypoints)).order_by(Journey.id)
+        for journey in self.db.scalars(statement.execution_options(yield_per=self.batch_size)):
+            yield {
+                "route_name": journey.name,
+                "route_description": journey.description,
+                "created_at": journey.created_at.isoformat() if journey.created_at else None,
+                "original_url": journey.maps_url,
+                "city": journey.city,
+                "state": journey.state,
+                "country": journey.country,
+                "timezone": journey.timezone,
+                "waypoints": [
+                    {
+                        "plus_code": waypoint.plus_code,
+                        "place_id": waypoint.place_id,
+                        "formatted_address": waypoint.formatted_address,
+                        "latitude": float(waypoint.latitude),
+                        "longitude": float(waypoint.longitude),
+                    }
+                    for waypoint in sorted(journey.waypoints, key=lambda w: w.sequence_number)
+                ],
+            }
+
+    def dump_enriched_file(self, path: Optional[Path] = None) -> int:
+        """Write every journey and its waypoints to `path`, one journey at a time. Returns the number written."""
+        path = path or settings.PROCESSED_JOURNEYS_PATH
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".tmp")
+
+        count = 0
+        with tmp_path.open("w", encoding="utf-8") as f:
+            f.write('{\n  "journeys": [')
+            for journey_data in self.iter_enriched_journeys():
+                f.write(",\n    " if count else "\n    ")
+                f.write(json.dumps(journey_data, ensure_ascii=False))
+                count += 1
+            f.write("\n  ]\n}\n")
+        os.replace(tmp_path, path)
+
+        logger.info(f"Dumped {count} journeys to {path}")
+        return count
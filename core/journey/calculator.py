@@ -1,18 +1,51 @@
 import logging
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Collection, Dict, List, Optional, Tuple
 
 import googlemaps
 
 from core.config import settings
+from core.config.logging_config import log_fields
+from core.journey.segments import RouteSegments
 from database.models.journey import Journey
 from database.models.journey_leg import JourneyLeg
 from database.models.journey_measurement import JourneyMeasurement
 
 logger = logging.getLogger(__name__)
 
+SLOT_MINUTES = 15  # Identical requests departing in the same time slot share one Directions call
+
+DirectionsKey = Tuple[str, str, str, Tuple[str, ...], datetime]
+
+MODES = ["driving", "bicycling", "walking", "transit"]  # Direct modes; driving is also requested via the waypoints
+
+
+@dataclass(frozen=True)
+class JourneySnapshot:
+    """
+    What measuring a journey reads from it, copied before the run starts. A database outage rolls the
+    session back, which expires every loaded Journey; the calculator and the spool only use this copy.
+    """
+
+    id: int
+    name: str
+    description: Optional[str]
+    timezone: Optional[str]
+    place_ids: Tuple[str, ...]
+
+    @classmethod
+    def of(cls, journey: Journey) -> "JourneySnapshot":
+        return cls(
+            id=journey.id,
+            name=journey.name,
+            description=journey.description,
+            timezone=journey.timezone,
+            place_ids=tuple(wp.place_id for wp in journey.waypoints if wp.place_id),
+        )
+
 
 @dataclass
 class JourneyTask:
@@ -22,7 +55,75 @@ class JourneyTask:
     mode: str
     departure_time: datetime
     is_routed: bool
-    journey: Journey
+    journey: JourneySnapshot
+
+    @property
+    def mode_key(self) -> str:
+        """Key of the task's result in process_route's `modes`, e.g. "driving_routed"."""
+        return f"{self.mode}_routed" if self.is_routed else self.mode
+
+
+class DirectionsCoalescer:
+    """
+    Single-flight for Directions requests.
+
+    Requests with the same origin, destination, mode, waypoints and departure slot share one API call:
+    the first caller makes it, concurrent callers wait on its future, and later callers in the same slot
+    reuse the result (journeys are often processed one after another, so most sharing is not concurrent).
+    Failures are not kept, so the next caller retries. Results are shared and must be treated as read-only.
+    """
+
+    def __init__(self) -> None:
+        self._calls: Dict[DirectionsKey, Future] = {}
+        self._slot: Optional[datetime] = None
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.coalesced = 0
+
+    @staticmethod
+    def slot_start(departure_time: datetime) -> datetime:
+        return departure_time.replace(
+            minute=(departure_time.minute // SLOT_MINUTES) * SLOT_MINUTES, second=0, microsecond=0
+        )
+
+    @classmethod
+    def key(cls, task: "JourneyTask") -> DirectionsKey:
+        waypoints = tuple(task.waypoint_ids) if task.is_routed else ()
+        return (task.origin, task.destination, task.mode, waypoints, cls.slot_start(task.departure_time))
+
+    def do(self, key: DirectionsKey, call: Callable[[], Any]) -> Any:
+        with self._lock:
+            if key[-1] != self._slot:
+                self._calls.clear()  # Results from an earlier slot are stale
+                self._slot = key[-1]
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+                self.calls += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = call()
+        except BaseException as e:
+            with self._lock:
+                if self._calls.get(key) is future:
+                    del self._calls[key]
+            future.set_exception(e)
+            raise
+        future.set_result(result)
+        return result
+
+    def clear(self) -> None:
+        with self._lock:
+            self._calls.clear()
+            self._slot = None
+            self.calls = 0
+            self.coalesced = 0
 
 
 class JourneyMetricsCalculator:
@@ -36,6 +137,7 @@ class JourneyMetricsCalculator:
         self.max_workers = max_workers if max_workers is not None else settings.MAX_WORKERS
         self.debug = debug if debug is not None else settings.DEBUG
         self._executor: Optional[ThreadPoolExecutor] = None  # Add explicit type hint
+        self.coalescer = DirectionsCoalescer()
 
     @property
     def thread_pool(self) -> ThreadPoolExecutor:
@@ -55,6 +157,11 @@ class JourneyMetricsCalculator:
         if self._executor:
             self._executor.shutdown(wait=True)
             self._executor = None
+        if self.coalescer.coalesced:
+            logger.info(
+                f"Directions calls: {self.coalescer.calls} made, {self.coalescer.coalesced} shared between journeys"
+            )
+        self.coalescer.clear()
 
     @staticmethod
     def calculate_speed(distance_meters: float, duration_seconds: float) -> float:
@@ -62,10 +169,9 @@ class JourneyMetricsCalculator:
             return 0.0
         return (distance_meters / 1000) / (duration_seconds / 3600)
 
-    def create_route_tasks(self, journey: Journey) -> List[JourneyTask]:
+    def create_route_tasks(self, journey: JourneySnapshot) -> List[JourneyTask]:
         tasks: List[JourneyTask] = []
-        waypoints = journey.waypoints
-        place_ids = [wp.place_id for wp in waypoints if wp.place_id]
+        place_ids = journey.place_ids
 
         if not place_ids:
             return tasks
@@ -75,9 +181,7 @@ class JourneyMetricsCalculator:
         waypoint_ids = [f"place_id:{pid}" for pid in place_ids[1:-1]]
         departure_time = datetime.now()
 
-        modes = ["driving", "bicycling", "walking", "transit"]
-
-        for mode in modes:
+        for mode in MODES:
             tasks.append(
                 JourneyTask(
                     origin=origin,
@@ -108,9 +212,11 @@ class JourneyMetricsCalculator:
     def process_task(self, task: JourneyTask) -> Optional[Dict[str, Any]]:
         try:
             if self.debug:
-                logger.info(
-                    f"Processing {task.mode} {'(routed)' if task.is_routed else '(direct)'} "
-                    f"for journey: {task.journey.name}"
+                logger.debug(
+                    "Processing %s %s for journey: %s",
+                    task.mode,
+                    "(routed)" if task.is_routed else "(direct)",
+                    task.journey.name,
                 )
 
             directions_kwargs = {
@@ -124,7 +230,7 @@ class JourneyMetricsCalculator:
             if task.is_routed and task.waypoint_ids:
                 directions_kwargs["waypoints"] = task.waypoint_ids
 
-            result = self.gmaps.directions(**directions_kwargs)
+            result = self.coalescer.do(self.coalescer.key(task), lambda: self.gmaps.directions(**directions_kwargs))
 
             if not result:
                 if self.debug:
@@ -132,31 +238,40 @@ class JourneyMetricsCalculator:
                 return None
 
             journey_metrics = self.calculate_route_metrics(result[0])
+            # Kept out of raw_response: the scheduler stores these as packed arrays, not JSON
+            journey_metrics["segments"] = self.get_route_segments(result[0].get("legs", []))
             if self.debug:
-                logger.info(f"Calculated metrics for {task.mode}: {journey_metrics}")
+                logger.debug(
+                    "Calculated metrics for %s",
+                    task.mode,
+                    extra=log_fields(legs=len(journey_metrics["leg_details"]), **journey_metrics["metrics"]),
+                )
             return journey_metrics
 
         except Exception as e:
             logger.error(f"Error processing task: {str(e)}")
             return {"error": str(e)}
 
-    def calculate_route_metrics(self, journey: Dict[str, Any]) -> Dict[str, Any]:
+    @classmethod
+    def calculate_route_metrics(cls, journey: Dict[str, Any]) -> Dict[str, Any]:
+        """Totals and per-leg details of a Directions route; needs no client, so the backfill calls it too."""
         legs = journey.get("legs", [])
         total_duration = sum(leg.get("duration", {}).get("value", 0) for leg in legs)
         total_distance = sum(leg.get("distance", {}).get("value", 0) for leg in legs)
 
-        leg_details = self.get_route_leg_details(legs)
+        leg_details = cls.get_route_leg_details(legs)
 
         return {
             "metrics": {
                 "duration_seconds": total_duration,
                 "distance_meters": total_distance,
-                "speed_kph": self.calculate_speed(total_distance, total_duration),
+                "speed_kph": cls.calculate_speed(total_distance, total_duration),
             },
             "leg_details": leg_details,
         }
 
-    def get_route_leg_details(self, legs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    @classmethod
+    def get_route_leg_details(cls, legs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         details = []
         for leg in legs:
             duration = leg.get("duration", {}).get("value", 0)
@@ -168,15 +283,18 @@ class JourneyMetricsCalculator:
                     "end_address": leg.get("end_address"),
                     "duration_seconds": duration,
                     "distance_meters": distance,
-                    "speed_kph": self.calculate_speed(distance, duration),
+                    "speed_kph": cls.calculate_speed(distance, duration),
                 }
             )
         return details
 
-    def process_route(self, journey: Journey) -> Dict[str, Any]:
+    def get_route_segments(self, legs: List[Dict[str, Any]]) -> RouteSegments:
+        return RouteSegments.from_legs(legs)
+
+    def process_route(self, journey: JourneySnapshot, skip_modes: Collection[str] = ()) -> Dict[str, Any]:
         try:
             if self.debug:
-                logger.info(f"Processing journey: {journey.name}")
+                logger.debug("Processing journey: %s", journey.name)
 
             journey_metrics: Dict[str, Any] = {
                 "journey_name": journey.name,
@@ -192,6 +310,11 @@ class JourneyMetricsCalculator:
                 journey_metrics["error"] = "No valid tasks created for journey"
                 return journey_metrics
 
+            tasks = [task for task in tasks if task.mode_key not in skip_modes]
+            if not tasks:
+                journey_metrics["status"] = "skipped"  # Every mode is quarantined
+                return journey_metrics
+
             futures = {self.thread_pool.submit(self.process_task, task): task for task in tasks}
 
             for future in as_completed(futures):
@@ -199,17 +322,19 @@ class JourneyMetricsCalculator:
                 try:
                     result = future.result()
                     if result:
-                        mode_key = f"{task.mode}_routed" if task.is_routed else task.mode
-                        journey_metrics["modes"][mode_key] = result
-                        if isinstance(journey_metrics["modes"], dict):
-                            journey_metrics["modes"][mode_key] = result
+                        journey_metrics["modes"][task.mode_key] = result
                 except Exception as e:
                     logger.error(f"Error processing {task.mode} journey: {str(e)}")
+                    journey_metrics["modes"][task.mode_key] = {"error": str(e)}
                 finally:
                     future.cancel()
 
             if self.debug:
-                logger.info(f"Final journey_metrics: {journey_metrics}")
+                logger.debug(
+                    "Final journey metrics for %s",
+                    journey.name,
+                    extra=log_fields(status=journey_metrics["status"], modes=",".join(journey_metrics["modes"])),
+                )
             return journey_metrics
 
         except Exception as e:
@@ -0,0 +1,116 @@
+import csv
+import io
+import json
+import logging
+import zlib
+from typing import Any, Dict, Iterator, List, Optional
+
+from sqlalchemy.orm import Session
+
+from core.journey.queries import JourneyQueries, MeasurementFilter
+from database.models.journey_measurement import JourneyMeasurement
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = ("csv", "ndjson")
+EXPORT_COLUMNS: List[str] = [
+    "id",
+    "journey_id",
+    "mode",
+    "timestamp",
+    "local_timestamp",
+    "day_of_week_id",
+    "time_slot_id",
+    "duration_seconds",
+    "distance_meters",
+    "speed_kph",
+]
+
+
+class MeasurementExporter:
+    """
+    Stream journey_measurements as CSV or NDJSON in constant memory.
+
+    Rows are pulled through a server-side cursor `batch_size` at a time and encoded as they arrive,
+    so neither the ORM nor the output buffer ever holds more than one batch.
+    """
+
+    def __init__(self, db: Session, batch_size: int = 1000):
+        self.db = db
+        self.batch_size = batch_size
+
+    def iter_rows(self, filters: MeasurementFilter) -> Iterator[Dict[str, Any]]:
+        queries = JourneyQueries(self.db)
+        query = queries.apply_filter(
+            self.db.query(
+                JourneyMeasurement.id,
+                JourneyMeasurement.journey_id,
+                JourneyMeasurement.mode,
+                JourneyMeasurement.timestamp,
+                JourneyMeasurement.local_timestamp,
+                JourneyMeasurement.day_of_week_id,
+                JourneyMeasurement.time_slot_id,
+                JourneyMeasurement.duration_seconds,
+                JourneyMeasurement.distance_meters,
+                JourneyMeasurement.speed_kph,
+            ),
+            filters,
+        )
+        query = query.order_by(JourneyMeasurement.timestamp, JourneyMeasurement.id)
+
+        # yield_per turns on stream_results, i.e. a named (server-side) cursor with psycopg2
+        for row in query.execution_options(yield_per=self.batch_size):
+            yield {
+                "id": row.id,
+                "journey_id": row.journey_id,
+                "mode": row.mode,
+                "timestamp": row.timestamp.isoformat(),
+                "local_timestamp": row.local_timestamp.isoformat(),
+                "day_of_week_id": row.day_of_week_id,
+                "time_slot_id": row.time_slot_id,
+                "duration_seconds": row.duration_seconds,
+                "distance_meters": float(row.distance_meters),
+                "speed_kph": float(row.speed_kph),
+            }
+
+    def iter_csv(self, filters: MeasurementFilter) -> Iterator[str]:
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS)
+        writer.writeheader()
+
+        for count, row in enumerate(self.iter_rows(filters), 1):
+            writer.writerow(row)
+            if count % self.batch_size == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+
+    def iter_ndjson(self, filters: MeasurementFilter) -> Iterator[str]:
+        lines: List[str] = []
+        for row in self.iter_rows(filters):
+            lines.append(json.dumps(row, separators=(",", ":")))
+            if len(lines) >= self.batch_size:
+                yield "\n".join(lines) + "\n"
+                lines = []
+        if lines:
+            yield "\n".join(lines) + "\n"
+
+    def iter_export(self, export_format: str, filters: MeasurementFilter, compress: bool = False) -> Iterator[bytes]:
+        """Yield encoded chunks in `export_format`, gzip-compressed on the fly when `compress` is set."""
+        if export_format == "csv":
+            chunks = self.iter_csv(filters)
+        elif export_format == "ndjson":
+            chunks = self.iter_ndjson(filters)
+        else:
+            raise ValueError(f"Unsupported export format '{export_format}' (expected one of {EXPORT_FORMATS})")
+
+        compressor: Optional[Any] = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None  # wbits=31: gzip
+        for chunk in chunks:
+            data = chunk.encode("utf-8")
+            if compressor is not None:
+                data = compressor.compress(data)
+            if data:
+                yield data
+        if compressor is not None:
+            yield compressor.flush()
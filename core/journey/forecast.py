@@ -0,0 +1,289 @@
+import logging
+import math
+import os
+import struct
+import sys
+import threading
+from array import array
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import pytz
+from sqlalchemy.orm import Session
+
+from core.cache.response_cache import get_response_cache
+from core.journey.heatmap import DAYS, SLOTS, HeatmapMatrix
+from core.journey.queries import JourneyQueries
+from database.models.journey import Journey
+from database.models.journey_forecast import JourneyForecast
+from database.models.journey_measurement import JourneyMeasurement
+from database.models.time_slot import TimeSlot
+
+logger = logging.getLogger(__name__)
+
+WINDOW = 12  # Most recent durations kept per cell for the seasonal median
+TREND_ALPHA = 0.2  # EWMA weight of each new log(duration / seasonal median)
+TREND_HALF_LIFE_HOURS = 2.0  # The trend adjustment halves for every 2 hours of lead time
+NEIGHBOR_SLOTS = 2  # Empty cells borrow the nearest slot within this distance on the same day
+
+# magic, version, days, slots, window
+HEADER = struct.Struct("<4sBBHB")
+MAGIC = b"TTFC"
+VERSION = 1
+
+
+def median(values: Sequence[int]) -> float:
+    ordered = sorted(values)
+    middle = len(ordered) // 2
+    return float(ordered[middle]) if len(ordered) % 2 else (ordered[middle - 1] + ordered[middle]) / 2
+
+
+class ForecastModel:
+    """
+    Seasonal medians per day-of-week × time slot with a damped recent-trend adjustment.
+
+    Each cell keeps its last WINDOW durations in a ring (uint8 count and head, int32 samples) plus the
+    float32 median of them, so a new measurement refits only its own cell. The trend is an EWMA of how
+    far recent measurements ran from their cell's median, in log space.
+    """
+
+    def __init__(
+        self,
+        counts: Optional[array] = None,
+        heads: Optional[array] = None,
+        samples: Optional[array] = None,
+        medians: Optional[array] = None,
+        watermark: int = 0,
+        trend: float = 0.0,
+        trend_at: Optional[datetime] = None,
+    ):
+        cells = DAYS * SLOTS
+        self.counts = counts if counts is not None else array("B", [0] * cells)
+        self.heads = heads if heads is not None else array("B", [0] * cells)
+        self.samples = samples if samples is not None else array("i", [0] * (cells * WINDOW))
+        self.medians = medians if medians is not None else array("f", [0.0] * cells)
+        self.watermark = watermark
+        self.trend = trend
+        self.trend_at = trend_at
+
+    def observe(self, day_of_week_id: int, time_slot_id: int, duration: int, timestamp: datetime) -> None:
+        index = HeatmapMatrix.cell(day_of_week_id, time_slot_id)
+        if self.counts[index] and self.medians[index] > 0 and duration > 0:
+            residual = math.log(duration / self.medians[index])
+            self.trend += TREND_ALPHA * (residual - self.trend)
+        self.trend_at = timestamp
+
+        base = index * WINDOW
+        self.samples[base + self.heads[index]] = duration
+        self.heads[index] = (self.heads[index] + 1) % WINDOW
+        self.counts[index] = min(self.counts[index] + 1, WINDOW)
+        self.medians[index] = median(self.samples[base : base + self.counts[index]])
+
+    def seasonal(self, day_of_week_id: int, time_slot_id: int) -> Tuple[Optional[float], int]:
+        """Median for the cell, or for the nearest slot with data on the same day; with its sample count."""
+        for distance in range(NEIGHBOR_SLOTS + 1):
+            for slot in sorted({time_slot_id - distance, time_slot_id + distance}):
+                if 1 <= slot <= SLOTS:
+                    index = HeatmapMatrix.cell(day_of_week_id, slot)
+                    if self.counts[index]:
+                        return float(self.medians[index]), int(self.counts[index])
+        return None, 0
+
+    def predict(self, day_of_week_id: int, time_slot_id: int, at: datetime) -> Optional[Dict[str, Any]]:
+        seasonal, samples = self.seasonal(day_of_week_id, time_slot_id)
+        if seasonal is None:
+            return None
+        lead_hours = max((at - self.trend_at).total_seconds() / 3600, 0.0) if self.trend_at else math.inf
+        trend_factor = math.exp(self.trend * 0.5 ** (lead_hours / TREND_HALF_LIFE_HOURS))
+        return {
+            "expected_seconds": round(seasonal * trend_factor, 1),
+            "seasonal_seconds": round(seasonal, 1),
+            "trend_factor": round(trend_factor, 4),
+            "samples": samples,
+        }
+
+    def to_bytes(self) -> bytes:
+        parts = [array(a.typecode, a) for a in (self.counts, self.heads, self.samples, self.medians)]
+        if sys.byteorder == "big":
+            for values in parts:
+                values.byteswap()
+        return HEADER.pack(MAGIC, VERSION, DAYS, SLOTS, WINDOW) + b"".join(values.tobytes() for values in parts)
+
+    @classmethod
+    def from_row(cls, row: JourneyForecast) -> "ForecastModel":
+        magic, version, days, slots, window = HEADER.unpack_from(row.payload)
+        if magic != MAGIC or version != VERSION or (days, slots, window) != (DAYS, SLOTS, WINDOW):
+            raise ValueError("Unrecognized forecast payload")
+        cells = DAYS * SLOTS
+        parts = [array("B"), array("B"), array("i"), array("f")]
+        offset = HEADER.size
+        for values, length in zip(parts, (cells, cells, cells * WINDOW, cells)):
+            end = offset + length * values.itemsize
+            values.frombytes(row.payload[offset:end])
+            offset = end
+        if sys.byteorder == "big":
+            for values in parts:
+                values.byteswap()
+        counts, heads, samples, medians = parts
+        trend_at = row.trend_at
+        if trend_at is not None and trend_at.tzinfo is None:
+            trend_at = trend_at.replace(tzinfo=timezone.utc)
+        return cls(counts, heads, samples, medians, watermark=row.watermark, trend=row.trend, trend_at=trend_at)
+
+
+class ForecastBuilder:
+    """Refits journey_forecasts by folding in measurements newer than each model's watermark."""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def refresh_journey(self, journey_id: int) -> int:
+        stored = {
+            row.mode: row for row in self.db.query(JourneyForecast).filter(JourneyForecast.journey_id == journey_id)
+        }
+        models = {mode: ForecastModel.from_row(row) for mode, row in stored.items()}
+        since = min((model.watermark for model in models.values()), default=0)
+
+        query = (
+            self.db.query(
+                JourneyMeasurement.id,
+                JourneyMeasurement.transit_mode_id,
+                JourneyMeasurement.mode,
+                JourneyMeasurement.timestamp,
+                JourneyMeasurement.day_of_week_id,
+                JourneyMeasurement.time_slot_id,
+                JourneyMeasurement.duration_seconds,
+            )
+            .filter(JourneyMeasurement.journey_id == journey_id, JourneyMeasurement.id > since)
+            .order_by(JourneyMeasurement.id)
+        )
+
+        applied = 0
+        touched = set()
+        transit_mode_ids: Dict[str, int] = {}  # For models created in this scan
+        for row in query.execution_options(yield_per=5000):
+            transit_mode_ids[row.mode] = row.transit_mode_id
+            model = models.setdefault(row.mode, ForecastModel())
+            if row.id <= model.watermark:
+                continue
+            timestamp = row.timestamp if row.timestamp.tzinfo else row.timestamp.replace(tzinfo=timezone.utc)
+            model.observe(row.day_of_week_id, row.time_slot_id, int(row.duration_seconds), timestamp)
+            model.watermark = int(row.id)
+            touched.add(row.mode)
+            applied += 1
+
+        now = datetime.now(timezone.utc)
+        for mode in touched:
+            model = models[mode]
+            forecast = stored.get(mode)
+            if forecast is None:
+                forecast = JourneyForecast(journey_id=journey_id, transit_mode_id=transit_mode_ids[mode], mode=mode)
+                self.db.add(forecast)
+            forecast.watermark = model.watermark
+            forecast.trend = model.trend
+            forecast.trend_at = model.trend_at
+            forecast.payload = model.to_bytes()
+            forecast.updated_at = now
+        return applied
+
+    def refresh(self, journey_ids: Sequence[int]) -> Dict[int, int]:
+        applied = {journey_id: self.refresh_journey(journey_id) for journey_id in journey_ids}
+        self.db.commit()
+        logger.info(f"Refit forecasts for {len(journey_ids)} journeys ({sum(applied.values())} new measurements)")
+        return applied
+
+
+class Forecaster:
+    """
+    Answers travel-time forecasts from models cached in memory.
+
+    Models, journey timezones and lookup tables are loaded on first use and dropped when the measurement
+    watermark moves, so repeat forecasts between scheduler runs don't touch the database.
+    """
+
+    def __init__(self) -> None:
+        self.models: Dict[Tuple[int, str], Optional[ForecastModel]] = {}
+        self.timezones: Dict[int, Optional[str]] = {}
+        self.mode_ids: Dict[str, int] = {}
+        self.slot_ids: Dict[str, int] = {}
+        self.watermark: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def sync(self, db: Session) -> None:
+        watermark = get_response_cache().current_watermark(db)
+        if watermark != self.watermark:
+            with self._lock:
+                self.models.clear()
+                self.watermark = watermark
+
+    def transit_mode_id(self, db: Session, mode: str) -> int:
+        if mode.lower() not in self.mode_ids:
+            self.mode_ids[mode.lower()] = JourneyQueries(db).get_transit_mode_id(mode)
+        return self.mode_ids[mode.lower()]
+
+    def time_slot_id(self, db: Session, local_time: datetime) -> int:
+        if not self.slot_ids:
+            self.slot_ids = {str(slot.slot): int(slot.id) for slot in db.query(TimeSlot).all()}
+        return self.slot_ids[TimeSlot.slot_key(local_time)]
+
+    def journey_timezone(self, db: Session, journey_id: int) -> Optional[str]:
+        if journey_id not in self.timezones:
+            journey = db.get(Journey, journey_id)
+            self.timezones[journey_id] = journey.timezone if journey is not None else None
+        return self.timezones[journey_id]
+
+    def model(self, db: Session, journey_id: int, mode: str) -> Optional[ForecastModel]:
+        key = (journey_id, mode)
+        if key not in self.models:
+            row = db.query(JourneyForecast).filter_by(journey_id=journey_id, mode=mode).first()
+            with self._lock:
+                self.models[key] = ForecastModel.from_row(row) if row is not None else None
+        return self.models[key]
+
+    def forecast(
+        self, db: Session, journey_id: int, mode: str, at: Optional[datetime] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Expected travel time for a journey and mode departing at `at` (default now). Naive datetimes are
+        taken as local time in the journey's timezone. Returns None when there is nothing to forecast from.
+        """
+        self.sync(db)
+        transit_mode_id = self.transit_mode_id(db, mode)
+        tz_name = self.journey_timezone(db, journey_id)
+        if tz_name is None:
+            return None
+
+        journey_tz = pytz.timezone(tz_name)
+        at = at or datetime.now(timezone.utc)
+        local_time = journey_tz.localize(at) if at.tzinfo is None else at.astimezone(journey_tz)
+
+        model = self.model(db, journey_id, mode.lower())
+        if model is None:
+            return None
+        day_of_week_id = local_time.isoweekday()
+        time_slot_id = self.time_slot_id(db, local_time)
+        prediction = model.predict(day_of_week_id, time_slot_id, local_time.astimezone(timezone.utc))
+        if prediction is None:
+            return None
+        return {
+            "journey_id": journey_id,
+            "transit_mode_id": transit_mode_id,
+            "mode": mode.lower(),
+            "departure": local_time.isoformat(),
+            "day_of_week_id": day_of_week_id,
+            "time_slot_id": time_slot_id,
+            **prediction,
+        }
+
+
+_forecaster: Optional[Forecaster] = None
+_forecaster_pid: Optional[int] = None
+
+
+def get_forecaster() -> Forecaster:
+    """Return this process's forecaster, so each forked worker keeps its own model cache."""
+    global _forecaster, _forecaster_pid
+    if _forecaster is None or _forecaster_pid != os.getpid():
+        _forecaster = Forecaster()
+        _forecaster_pid = os.getpid()
+    return _forecaster
@@ -0,0 +1,109 @@
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from database.models.geocode_cache_entry import GeocodeCacheEntry
+
+logger = logging.getLogger(__name__)
+
+FIND_PLACE = "find_place"
+REVERSE_GEOCODE = "reverse_geocode"
+TIMEZONE = "timezone"
+GEOCODE_KINDS = (FIND_PLACE, REVERSE_GEOCODE, TIMEZONE)
+
+
+def plus_code_key(plus_code: str, location: str) -> str:
+    return f"{plus_code} {location}"
+
+
+def coordinate_key(lat: float, lng: float) -> str:
+    # ~11 cm at 6 decimal places: the same waypoint always maps to the same key
+    return f"{float(lat):.6f},{float(lng):.6f}"
+
+
+class GeocodeCache:
+    """
+    Persistent cache of Google Maps geocoding results backed by the geocode_cache table.
+
+    Unexpired entries are bulk-loaded once per run and served from memory, so lookups are safe from the
+    processor's worker threads. New results and hit counts are written back by `flush()` on the thread
+    that owns the session.
+    """
+
+    def __init__(self, ttl_days: Optional[int] = None):
+        self.ttl = timedelta(days=ttl_days if ttl_days is not None else settings.GEOCODE_CACHE_TTL_DAYS)
+        self._entries: Dict[Tuple[str, str], Any] = {}
+        self._pending: Dict[Tuple[str, str], Any] = {}
+        self._hits: Dict[Tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+        self.loaded = False
+        self.stats: Dict[str, Dict[str, int]] = {kind: {"hits": 0, "misses": 0} for kind in GEOCODE_KINDS}
+
+    def load(self, db: Session) -> None:
+        now = datetime.now(timezone.utc)
+        rows = db.query(GeocodeCacheEntry).filter(GeocodeCacheEntry.expires_at > now).all()
+        with self._lock:
+            self._entries = {(row.kind, row.cache_key): row.payload for row in rows}
+        self.loaded = True
+        logger.info(f"Loaded {len(rows)} geocode cache entries")
+
+    def ensure_loaded(self, db: Session) -> None:
+        if not self.loaded:
+            self.load(db)
+
+    def get(self, kind: str, key: str) -> Optional[Any]:
+        with self._lock:
+            cache_key = (kind, key)
+            payload = self._entries.get(cache_key)
+            if payload is None:
+                self.stats[kind]["misses"] += 1
+                return None
+            self.stats[kind]["hits"] += 1
+            self._hits[cache_key] = self._hits.get(cache_key, 0) + 1
+            return payload
+
+    def put(self, kind: str, key: str, payload: Any) -> None:
+        with self._lock:
+            self._entries[(kind, key)] = payload
+            self._pending[(kind, key)] = payload
+
+    def flush(self, db: Session) -> int:
+        """Stage new entries and hit counts on `db`; they are committed with the caller's transaction."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            hits, self._hits = self._hits, {}
+        if not pending and not hits:
+            return 0
+
+        now = datetime.now(timezone.utc)
+        keys = set(pending) | set(hits)
+        existing = {
+            (row.kind, row.cache_key): row
+            for row in db.query(GeocodeCacheEntry).filter(
+                GeocodeCacheEntry.cache_key.in_({key for _, key in keys}),
+            )
+        }
+        for (kind, key), payload in pending.items():
+            row = existing.get((kind, key))
+            if row is None:
+                row = GeocodeCacheEntry(kind=kind, cache_key=key, hit_count=0)
+                db.add(row)
+                existing[(kind, key)] = row
+            row.payload = payload
+            row.created_at = now
+            row.expires_at = now + self.ttl
+        for cache_key, count in hits.items():
+            row = existing.get(cache_key)
+            if row is not None:
+                row.hit_count = (row.hit_count or 0) + count
+        return len(pending)
+
+    def summary(self) -> str:
+        parts: List[str] = []
+        for kind, counts in self.stats.items():
+            parts.append(f"{kind}: {counts['hits']} hits / {counts['misses']} misses")
+        return "; ".join(parts)
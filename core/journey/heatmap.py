@@ -0,0 +1,171 @@
+import logging
+import math
+import struct
+import sys
+from array import array
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy.orm import Session
+
+from database.models.journey_heatmap import JourneyHeatmap
+from database.models.journey_measurement import JourneyMeasurement
+
+logger = logging.getLogger(__name__)
+
+DAYS = 7
+SLOTS = 96  # 15-minute slots per day
+HEATMAP_METRICS = ("duration_seconds", "speed_kph")
+
+# magic, version, days, slots, watermark
+HEADER = struct.Struct("<4sBBHI")
+MAGIC = b"TTHM"
+VERSION = 1
+
+
+class HeatmapMatrix:
+    """
+    Dense 7×96 matrix of running means with per-cell sample counts.
+
+    Stored as a 12-byte header followed by uint32 counts and float32 means in row-major order (~5.4 KB),
+    so updating it with new measurements never requires re-reading history.
+    """
+
+    def __init__(self, counts: Optional[array] = None, means: Optional[array] = None, watermark: int = 0):
+        self.counts = counts if counts is not None else array("I", [0] * (DAYS * SLOTS))
+        self.means = means if means is not None else array("f", [0.0] * (DAYS * SLOTS))
+        self.watermark = watermark
+
+    @staticmethod
+    def cell(day_of_week_id: int, time_slot_id: int) -> int:
+        return (day_of_week_id - 1) * SLOTS + (time_slot_id - 1)
+
+    def add(self, day_of_week_id: int, time_slot_id: int, value: float) -> None:
+        index = self.cell(day_of_week_id, time_slot_id)
+        count = self.counts[index] + 1
+        self.counts[index] = count
+        self.means[index] += (value - self.means[index]) / count
+
+    def to_bytes(self) -> bytes:
+        counts, means = array("I", self.counts), array("f", self.means)
+        if sys.byteorder == "big":
+            counts.byteswap()
+            means.byteswap()
+        return HEADER.pack(MAGIC, VERSION, DAYS, SLOTS, self.watermark) + counts.tobytes() + means.tobytes()
+
+    @classmethod
+    def from_bytes(cls, payload: bytes) -> "HeatmapMatrix":
+        magic, version, days, slots, watermark = HEADER.unpack_from(payload)
+        if magic != MAGIC or version != VERSION or (days, slots) != (DAYS, SLOTS):
+            raise ValueError("Unrecognized heatmap payload")
+        cells = DAYS * SLOTS
+        counts, means = array("I"), array("f")
+        counts.frombytes(payload[HEADER.size : HEADER.size + cells * counts.itemsize])
+        means.frombytes(payload[HEADER.size + cells * counts.itemsize :])
+        if sys.byteorder == "big":
+            counts.byteswap()
+            means.byteswap()
+        return cls(counts=counts, means=means, watermark=watermark)
+
+    def to_rows(self, precision: int = 2) -> List[List[Optional[float]]]:
+        """Row per day, column per slot; empty cells are None."""
+        return [
+            [
+                round(self.means[day * SLOTS + slot], precision) if self.counts[day * SLOTS + slot] else None
+                for slot in range(SLOTS)
+            ]
+            for day in range(DAYS)
+        ]
+
+    def count_rows(self) -> List[List[int]]:
+        return [list(self.counts[day * SLOTS : (day + 1) * SLOTS]) for day in range(DAYS)]
+
+
+class HeatmapBuilder:
+    """Keeps journey_heatmaps current by folding in measurements newer than each matrix's watermark."""
+
+    def __init__(self, db: Session, metrics: Sequence[str] = HEATMAP_METRICS):
+        self.db = db
+        self.metrics = metrics
+
+    def load(self, journey_id: int) -> Dict[Tuple[str, str], JourneyHeatmap]:
+        rows = self.db.query(JourneyHeatmap).filter(JourneyHeatmap.journey_id == journey_id).all()
+        return {(row.mode, row.metric): row for row in rows}
+
+    def refresh_journey(self, journey_id: int) -> int:
+        """Fold new measurements for one journey into its matrices. Returns the number of rows applied."""
+        stored = self.load(journey_id)
+        matrices: Dict[Tuple[str, str], HeatmapMatrix] = {
+            key: HeatmapMatrix.from_bytes(row.payload) for key, row in stored.items()
+        }
+        # Every matrix is advanced to the last scanned id, so the oldest watermark bounds the scan
+        since = min((m.watermark for m in matrices.values()), default=0)
+
+        query = (
+            self.db.query(
+                JourneyMeasurement.id,
+                JourneyMeasurement.transit_mode_id,
+                JourneyMeasurement.mode,
+                JourneyMeasurement.day_of_week_id,
+                JourneyMeasurement.time_slot_id,
+                JourneyMeasurement.duration_seconds,
+                JourneyMeasurement.speed_kph,
+            )
+            .filter(JourneyMeasurement.journey_id == journey_id, JourneyMeasurement.id > since)
+            .order_by(JourneyMeasurement.id)
+        )
+
+        applied = 0
+        last_id = since
+        transit_mode_ids: Dict[str, int] = {}  # For matrices created in this scan
+        for row in query.execution_options(yield_per=5000):
+            last_id = int(row.id)
+            transit_mode_ids[row.mode] = row.transit_mode_id
+            for metric in self.metrics:
+                matrix = matrices.setdefault((row.mode, metric), HeatmapMatrix())
+                if row.id <= matrix.watermark:
+                    continue
+                value = getattr(row, metric)
+                if value is None or math.isnan(float(value)):
+                    continue
+                matrix.add(row.day_of_week_id, row.time_slot_id, float(value))
+            applied += 1
+
+        if applied:
+            now = datetime.now(timezone.utc)
+            for (mode, metric), matrix in matrices.items():
+                matrix.watermark = max(matrix.watermark, last_id)
+                heatmap = stored.get((mode, metric))
+                if heatmap is None:
+                    heatmap = JourneyHeatmap(
+                        journey_id=journey_id, transit_mode_id=transit_mode_ids[mode], mode=mode, metric=metric
+                    )
+                    self.db.add(heatmap)
+                heatmap.watermark = matrix.watermark
+                heatmap.payload = matrix.to_bytes()
+                heatmap.updated_at = now
+        return applied
+
+    def refresh(self, journey_ids: Sequence[int]) -> Dict[int, int]:
+        applied = {journey_id: self.refresh_journey(journey_id) for journey_id in journey_ids}
+        self.db.commit()
+        logger.info(f"Refreshed heatmaps for {len(journey_ids)} journeys ({sum(applied.values())} new measurements)")
+        return applied
+
+    def get(self, journey_id: int, mode: str, metric: str) -> Optional[JourneyHeatmap]:
+        return self.db.query(JourneyHeatmap).filter_by(journey_id=journey_id, mode=mode, metric=metric).first()
+
+
+def heatmap_payload(heatmap: JourneyHeatmap) -> Dict[str, Any]:
+    matrix = HeatmapMatrix.from_bytes(heatmap.payload)
+    return {
+        "journey_id": heatmap.journey_id,
+        "transit_mode_id": heatmap.transit_mode_id,
+        "mode": heatmap.mode,
+        "metric": heatmap.metric,
+        "days": DAYS,
+        "slots": SLOTS,
+        "watermark": matrix.watermark,
+        "values": matrix.to_rows(),
+        "counts": matrix.count_rows(),
+    }
@@ -0,0 +1,171 @@
+import json
+import logging
+from dataclasses import dataclass
+from itertools import islice
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, TextIO
+
+from core.journey.processor import JourneyProcessor
+
+logger = logging.getLogger(__name__)
+
+NDJSON_SUFFIXES = (".ndjson", ".jsonl")
+READ_CHUNK_SIZE = 64 * 1024
+
+
+def iter_json_array(f: TextIO, key: str = "journeys", chunk_size: int = READ_CHUNK_SIZE) -> Iterator[Dict[str, Any]]:
+    """
+    Yield the elements of the `key` array of a JSON document (or of a top-level array) one at a time.
+
+    Only the element being decoded and one read chunk are held in memory, however long the array is.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    eof = False
+
+    def fill() -> bool:
+        nonlocal buffer, eof
+        chunk = f.read(chunk_size)
+        if not chunk:
+            eof = True
+            return False
+        buffer += chunk
+        return True
+
+    # Advance to the opening bracket of the array
+    while True:
+        stripped = buffer.lstrip()
+        if stripped.startswith("["):
+            buffer = stripped[1:]
+            break
+        marker = buffer.find(f'"{key}"')
+        if marker != -1:
+            bracket = buffer.find("[", marker)
+            if bracket != -1:
+                buffer = buffer[bracket + 1 :]
+                break
+        if not fill():
+            raise ValueError(f'No "{key}" array found')
+
+    position = 0
+    while True:
+        while position < len(buffer) and buffer[position] in " \t\r\n,":
+            position += 1
+        if position >= len(buffer):
+            buffer, position = "", 0
+            if not fill():
+                raise ValueError(f'Unterminated "{key}" array')
+            continue
+        if buffer[position] == "]":
+            return
+        try:
+            element, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            if eof or not fill():
+                raise
+            continue
+        yield element
+        buffer, position = buffer[end:], 0
+
+
+def iter_ndjson(f: TextIO) -> Iterator[Dict[str, Any]]:
+    for line_number, line in enumerate(f, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON on line {line_number}: {str(e)}")
+
+
+def iter_journey_records(path: Path) -> Iterator[Dict[str, Any]]:
+    """Journeys from either a `{"journeys": [...]}` file or NDJSON with one journey per line."""
+    with path.open("r", encoding="utf-8") as f:
+        records = iter_ndjson(f) if path.suffix in NDJSON_SUFFIXES else iter_json_array(f)
+        yield from records
+
+
+def batched(iterable: Iterable[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+@dataclass
+class ImportStats:
+    read: int = 0
+    changed: int = 0
+    imported: int = 0
+    failed: int = 0
+    batches: int = 0
+
+
+class StreamingJourneyImporter:
+    """
+    Import journey definition files too large to load at once.
+
+    Journeys are read incrementally and processed in fixed-size batches: each batch's place lookups run
+    concurrently, its journeys are written with one commit, and its ORM objects and lookup futures are
+    released before the next batch is read, so memory stays flat regardless of file size.
+    """
+
+    def __init__(self, processor: JourneyProcessor, batch_size: int = 200):
+        self.processor = processor
+        self.db = processor.db
+        self.batch_size = batch_size
+
+    def import_batch(self, batch: List[Dict[str, Any]], stats: ImportStats, force: bool = False) -> None:
+        changed = self.processor.changed_routes(batch, force=force)
+        stats.read += len(batch)
+        stats.changed += len(changed)
+        if not changed:
+            return
+
+        if self.processor.geocache is not None:
+            self.processor.geocache.ensure_loaded(self.db)
+        self.processor.prefetch_routes(changed)
+
+        for journey in changed:
+            try:
+                # A savepoint per journey, so one bad route doesn't discard the rest of the batch
+                with self.db.begin_nested():
+                    self.processor.process_route(
+                        journey["route_url"],
+                        journey["route_name"],
+                        journey.get("route_description"),
+                        commit=False,
+                    )
+                stats.imported += 1
+            except Exception as e:
+                stats.failed += 1
+                logger.error(f"Error processing journey '{journey.get('route_name')}': {str(e)}")
+
+        if self.processor.geocache is not None:
+            self.processor.geocache.flush(self.db)
+        try:
+            self.db.commit()
+        except Exception as e:
+            self.db.rollback()
+            logger.error(f"Database error committing batch {stats.batches + 1}: {str(e)}")
+            raise
+
+    def import_file(self, path: Path, force: bool = False) -> ImportStats:
+        if not path.exists():
+            raise FileNotFoundError(f"Journeys file not found: {path}")
+
+        stats = ImportStats()
+        with self.processor:
+            for batch in batched(iter_journey_records(path), self.batch_size):
+                self.import_batch(batch, stats, force=force)
+                stats.batches += 1
+                self.db.expunge_all()
+                self.processor.reset_lookups()
+                logger.info(
+                    f"Batch {stats.batches}: {stats.read} read, {stats.changed} new or changed, "
+                    f"{stats.imported} imported, {stats.failed} failed"
+                )
+
+        if self.processor.geocache is not None:
+            logger.info(f"Geocode cache: {self.processor.geocache.summary()}")
+        return stats
@@ -0,0 +1,408 @@
+import contextlib
+import logging
+import math
+import os
+import random
+import statistics
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from core.journey.api_usage import SIMULATED_SOURCE, CountingClient
+from core.journey.quarantine import DISABLED_STATUS_ID
+from core.journey.scheduler import JourneyScheduler
+from core.journey.segments import encode_polyline
+from database.models.api_usage import ApiUsage
+from database.models.journey import Journey
+from database.models.journey_anomaly import JourneyAnomaly
+from database.models.journey_baseline import JourneyBaseline
+from database.models.journey_failure import JourneyFailure
+from database.models.journey_forecast import JourneyForecast
+from database.models.journey_heatmap import JourneyHeatmap
+from database.models.journey_leg import JourneyLeg
+from database.models.journey_measurement import JourneyMeasurement
+from database.models.journey_measurement_segments import JourneyMeasurementSegments
+from database.models.waypoint import Waypoint
+
+logger = logging.getLogger(__name__)
+
+JOURNEY_PREFIX = "loadgen-"  # Synthetic journeys are recognised, and cleaned up, by name
+PLACE_PREFIX = "loadgen:"
+
+# Real East Bay / San Francisco endpoints; synthetic waypoints are scattered up to ~1 km around them
+ANCHORS: List[Tuple[str, float, float]] = [
+    ("Embarcadero BART", 37.79293, -122.39716),
+    ("12th St Oakland City Center BART", 37.80377, -122.27156),
+    ("MacArthur BART", 37.82896, -122.26711),
+    ("Fruitvale BART", 37.77484, -122.22426),
+    ("Lake Merritt BART", 37.79760, -122.26530),
+    ("Alameda South Shore Center", 37.75620, -122.25200),
+    ("Alameda Webster St", 37.77300, -122.27650),
+    ("Berkeley Downtown BART", 37.87015, -122.26805),
+    ("Emeryville Public Market", 37.84020, -122.29100),
+    ("Oakland Airport", 37.71260, -122.21970),
+]
+JITTER_DEGREES = 0.01
+
+MODE_SPEED_KPH = {"driving": 38.0, "bicycling": 16.0, "walking": 4.8, "transit": 22.0}
+DETOUR_FACTOR = 1.3  # Road distance over straight-line distance
+STEPS_PER_LEG = 8
+
+
+def haversine_meters(a: Tuple[float, float], b: Tuple[float, float]) -> float:
+    lat1, lng1, lat2, lng2 = map(math.radians, (a[0], a[1], b[0], b[1]))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * 6371000 * math.asin(math.sqrt(h))
+
+
+def e5(point: Sequence[float]) -> Tuple[int, int]:
+    return round(point[0] * 1e5), round(point[1] * 1e5)
+
+
+def place_location(place: str) -> Tuple[float, float]:
+    """Coordinates encoded in a synthetic place id, with or without the `place_id:` prefix."""
+    lat, lng = place.split(PLACE_PREFIX, 1)[1].split(",")
+    return float(lat), float(lng)
+
+
+class FakeMapsClient:
+    """
+    Stand-in for googlemaps.Client that answers Directions requests for synthetic journeys.
+
+    Every call sleeps for a normally distributed latency (never below zero) to mimic the API. Routes are
+    straight lines between the waypoints encoded in the place ids, split into steps with polylines, with
+    durations from a per-mode speed, so everything downstream (segments, heatmaps, forecasts) has
+    realistic work to do.
+    """
+
+    def __init__(self, latency_ms: float = 250.0, jitter_ms: float = 100.0, seed: int = 0):
+        self.latency = latency_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.calls = 0
+        self.wait_seconds = 0.0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _wait(self) -> float:
+        """Sleep like a real request would and return a speed factor for this route."""
+        with self._lock:
+            delay = max(self._random.gauss(self.latency, self.jitter), 0.0)
+            speed_noise = self._random.uniform(0.8, 1.2)
+            self.calls += 1
+            self.wait_seconds += delay
+        time.sleep(delay)
+        return speed_noise
+
+    def directions(
+        self,
+        origin: str,
+        destination: str,
+        mode: str = "driving",
+        waypoints: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> List[Dict[str, Any]]:
+        speed_noise = self._wait()
+        speed_mps = MODE_SPEED_KPH.get(mode, MODE_SPEED_KPH["driving"]) * speed_noise / 3.6
+        points = [place_location(place) for place in [origin, *(waypoints or []), destination]]
+        legs = []
+        for start, end in zip(points, points[1:]):
+            steps = []
+            for i in range(STEPS_PER_LEG):
+                a = [start[k] + (end[k] - start[k]) * i / STEPS_PER_LEG for k in (0, 1)]
+                b = [start[k] + (end[k] - start[k]) * (i + 1) / STEPS_PER_LEG for k in (0, 1)]
+                meters = haversine_meters((a[0], a[1]), (b[0], b[1])) * DETOUR_FACTOR
+                steps.append(
+                    {
+                        "duration": {"value": int(meters / speed_mps)},
+                        "distance": {"value": int(meters)},
+                        "polyline": {"points": encode_polyline([e5(a), e5(b)])},
+                    }
+                )
+            legs.append(
+                {
+                    "start_address": f"{start[0]:.5f},{start[1]:.5f}",
+                    "end_address": f"{end[0]:.5f},{end[1]:.5f}",
+                    "duration": {"value": sum(step["duration"]["value"] for step in steps)},
+                    "distance": {"value": sum(step["distance"]["value"] for step in steps)},
+                    "steps": steps,
+                }
+            )
+        return [{"legs": legs}]
+
+
+def synthesize_journeys(db: Session, count: int, start_index: int = 0, seed: int = 0) -> List[int]:
+    """
+    Insert `count` journeys of 2–4 waypoints around ANCHORS and return their ids. They are disabled, so a
+    scheduler running against the same database never measures them.
+    """
+    rng = random.Random(seed + start_index)
+    now = datetime.now(timezone.utc)
+    journeys = []
+    for index in range(start_index, start_index + count):
+        journey = Journey(
+            name=f"{JOURNEY_PREFIX}{index:05d}",
+            description="Synthetic journey for load testing",
+            city="Oakland",
+            state="CA",
+            country="US",
+            timezone="America/Los_Angeles",
+            status_id=DISABLED_STATUS_ID,
+            created_at=now,
+            updated_at=now,
+        )
+        for sequence, (label, lat, lng) in enumerate(rng.sample(ANCHORS, rng.randint(2, 4)), 1):
+            lat += rng.uniform(-JITTER_DEGREES, JITTER_DEGREES)
+            lng += rng.uniform(-JITTER_DEGREES, JITTER_DEGREES)
+            journey.waypoints.append(
+                Waypoint(
+                    sequence_number=sequence,
+                    place_id=f"{PLACE_PREFIX}{lat:.6f},{lng:.6f}",
+                    formatted_address=f"Near {label}",
+                    latitude=lat,
+                    longitude=lng,
+                    created_at=now,
+                )
+            )
+        db.add(journey)
+        journeys.append(journey)
+    db.commit()
+    return [journey.id for journey in journeys]
+
+
+def load_synthetic_journeys(db: Session, journey_ids: Sequence[int]) -> List[Journey]:
+    """The given synthetic journeys, in place of the scheduler's query for active ones."""
+    return db.query(Journey).filter(Journey.id.in_(journey_ids), Journey.name.startswith(JOURNEY_PREFIX)).all()
+
+
+def remove_synthetic_journeys(db: Session) -> int:
+    """Delete every synthetic journey with everything derived from it, and the load test's API usage rows."""
+    journey_ids = [row.id for row in db.query(Journey.id).filter(Journey.name.startswith(JOURNEY_PREFIX))]
+    if journey_ids:
+        measurement_ids = db.query(JourneyMeasurement.id).filter(JourneyMeasurement.journey_id.in_(journey_ids))
+        for model in (JourneyAnomaly, JourneyMeasurementSegments):
+            db.query(model).filter(model.journey_id.in_(journey_ids)).delete(synchronize_session=False)
+        db.query(JourneyLeg).filter(JourneyLeg.journey_measurement_id.in_(measurement_ids.scalar_subquery())).delete(
+            synchronize_session=False
+        )
+        for model in (JourneyMeasurement, JourneyBaseline, JourneyForecast, JourneyHeatmap, JourneyFailure, Waypoint):
+            db.query(model).filter(model.journey_id.in_(journey_ids)).delete(synchronize_session=False)
+        db.query(Journey).filter(Journey.id.in_(journey_ids)).delete(synchronize_session=False)
+    db.query(ApiUsage).filter(ApiUsage.source == SIMULATED_SOURCE).delete(synchronize_session=False)
+    db.commit()
+    return len(journey_ids)
+
+
+class DatabaseMeter:
+    """
+    Time spent in and statements sent to every engine in the process, via cursor events, and rows written by
+    every session flush. Rows are counted at the ORM level because drivers report no rowcount for the batched
+    INSERT ... RETURNING statements the ORM uses; everything the scheduler writes goes through the ORM.
+    """
+
+    def __init__(self) -> None:
+        self.seconds = 0.0
+        self.statements = 0
+        self.rows_written = 0
+        self._lock = threading.Lock()
+
+    def _before(self, conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool) -> None:
+        conn.info.setdefault("loadgen_started", []).append(time.perf_counter())
+
+    def _after(self, conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool) -> None:
+        elapsed = time.perf_counter() - conn.info["loadgen_started"].pop()
+        with self._lock:
+            self.seconds += elapsed
+            self.statements += 1
+
+    def _flushed(self, session: Session, flush_context: Any) -> None:
+        modified = sum(1 for instance in session.dirty if session.is_modified(instance))
+        with self._lock:
+            self.rows_written += len(session.new) + len(session.deleted) + modified
+
+    @contextlib.contextmanager
+    def measure(self) -> Iterator["DatabaseMeter"]:
+        listeners = [
+            (Engine, "before_cursor_execute", self._before),
+            (Engine, "after_cursor_execute", self._after),
+            (Session, "after_flush", self._flushed),
+        ]
+        for target, name, listener in listeners:
+            event.listen(target, name, listener)
+        try:
+            yield self
+        finally:
+            for target, name, listener in listeners:
+                event.remove(target, name, listener)
+
+
+def peak_rss_mb() -> Optional[float]:
+    try:
+        import resource
+    except ImportError:  # Not available on Windows
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KB on Linux
+
+
+@dataclass
+class CycleResult:
+    journeys: int
+    wall_seconds: float
+    phases: Dict[str, float]
+    db_seconds: float
+    db_statements: int
+    rows_written: int
+    api_calls: int
+    api_wait_seconds: float
+    peak_rss_mb: Optional[float]
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows_written / self.wall_seconds if self.wall_seconds else 0.0
+
+
+@dataclass
+class CapacityReport:
+    max_workers: int
+    latency_ms: float
+    slot_seconds: float
+    headroom: float
+    cycles: List[CycleResult] = field(default_factory=list)
+    fixed_seconds: float = 0.0
+    seconds_per_journey: float = 0.0
+    max_journeys_per_slot: Optional[int] = None
+
+    def fit(self) -> None:
+        """Least-squares line through the median cycle time of each journey count; one count fits through zero."""
+        by_size: Dict[int, List[float]] = {}
+        for cycle in self.cycles:
+            by_size.setdefault(cycle.journeys, []).append(cycle.wall_seconds)
+        points = sorted((size, statistics.median(walls)) for size, walls in by_size.items())
+        if not points:
+            return
+        if len(points) == 1:
+            size, wall = points[0]
+            self.fixed_seconds, self.seconds_per_journey = 0.0, wall / size
+        else:
+            xs, ys = [x for x, _ in points], [y for _, y in points]
+            x_mean, y_mean = statistics.fmean(xs), statistics.fmean(ys)
+            slope = sum((x - x_mean) * (y - y_mean) for x, y in points) / sum((x - x_mean) ** 2 for x in xs)
+            self.seconds_per_journey = max(slope, 1e-9)
+            self.fixed_seconds = max(y_mean - slope * x_mean, 0.0)
+        budget = self.slot_seconds * self.headroom - self.fixed_seconds
+        self.max_journeys_per_slot = max(int(budget / self.seconds_per_journey), 0)
+
+    def to_dict(self) -> Dict[str, Any]:
+        payload = asdict(self)
+        for cycle, data in zip(self.cycles, payload["cycles"]):
+            data["rows_per_second"] = round(cycle.rows_per_second, 1)
+        return payload
+
+
+class LoadGenerator:
+    """
+    Run full scheduler cycles over synthetic journeys against FakeMapsClient and the configured database.
+
+    The scheduler is the production one; only its journey list is replaced by the (disabled) synthetic
+    journeys and its methods are wrapped with timers to attribute cycle time to phases.
+    """
+
+    PHASES = (
+        "load_active_journeys",
+        "process_route",
+        "save_journey_metrics",
+        "refresh_heatmaps",
+        "refresh_forecasts",
+        "publish_cache_watermark",
+        "record_api_usage",
+        "print_batch_summary",
+    )
+
+    def __init__(self, max_workers: int, latency_ms: float = 250.0, jitter_ms: float = 100.0, seed: int = 0):
+        self.max_workers = max_workers
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.seed = seed
+
+    def timed(self, phases: Dict[str, float], name: str, method: Callable[..., Any]) -> Callable[..., Any]:
+        lock = threading.Lock()
+
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            started = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                with lock:
+                    phases[name] = phases.get(name, 0.0) + time.perf_counter() - started
+
+        return wrapper
+
+    def run_cycle(self, journey_ids: Sequence[int]) -> CycleResult:
+        client = FakeMapsClient(self.latency_ms, self.jitter_ms, seed=self.seed)
+        scheduler = JourneyScheduler(
+            max_workers=self.max_workers, debug=False, gmaps_client=CountingClient(client, source=SIMULATED_SOURCE)
+        )
+        scheduler.load_active_journeys = (  # type: ignore[method-assign]
+            lambda db: load_synthetic_journeys(db, journey_ids)
+        )
+
+        phases: Dict[str, float] = {}
+        owners = {"print_batch_summary": scheduler.reporter, "process_route": scheduler.calculator}
+        for name in self.PHASES:
+            owner = owners.get(name, scheduler)
+            setattr(owner, name, self.timed(phases, name, getattr(owner, name)))
+
+        meter = DatabaseMeter()
+        started = time.perf_counter()
+        with meter.measure(), open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            scheduler.process_all_journeys()
+        wall = time.perf_counter() - started
+
+        return CycleResult(
+            journeys=len(journey_ids),
+            wall_seconds=wall,
+            phases={name: round(seconds, 3) for name, seconds in phases.items()},
+            db_seconds=round(meter.seconds, 3),
+            db_statements=meter.statements,
+            rows_written=meter.rows_written,
+            api_calls=client.calls,
+            api_wait_seconds=round(client.wait_seconds, 3),
+            peak_rss_mb=peak_rss_mb(),
+        )
+
+    def run(
+        self,
+        db_factory: Callable[[], Any],
+        sizes: Sequence[int],
+        cycles: int,
+        slot_seconds: float = 900.0,
+        headroom: float = 0.8,
+    ) -> CapacityReport:
+        """Grow the synthetic fleet to each size in turn and run `cycles` scheduler cycles at each."""
+        report = CapacityReport(
+            max_workers=self.max_workers, latency_ms=self.latency_ms, slot_seconds=slot_seconds, headroom=headroom
+        )
+        journey_ids: List[int] = []
+        for size in sorted(sizes):
+            if size > len(journey_ids):
+                with db_factory() as db:
+                    journey_ids += synthesize_journeys(db, size - len(journey_ids), len(journey_ids), self.seed)
+            for cycle in range(cycles):
+                result = self.run_cycle(journey_ids[:size])
+                report.cycles.append(result)
+                logger.warning(
+                    "%d journeys, cycle %d: %.1fs, %d rows written (%.0f rows/s), peak RSS %s MB",
+                    size,
+                    cycle + 1,
+                    result.wall_seconds,
+                    result.rows_written,
+                    result.rows_per_second,
+                    f"{result.peak_rss_mb:.0f}" if result.peak_rss_mb is not None else "?",
+                )
+        report.fit()
+        return report
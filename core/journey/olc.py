@@ -0,0 +1,209 @@
+"""
+Minimal Open Location Code (plus code) implementation: validation, encoding, decoding and short code recovery.
+
+Follows the reference algorithm at https://github.com/google/open-location-code so waypoints can be located
+from their plus codes without a Places API call.
+"""
+
+from dataclasses import dataclass
+
+CODE_ALPHABET = "23456789CFGHJMPQRVWX"
+SEPARATOR = "+"
+SEPARATOR_POSITION = 8
+PADDING_CHARACTER = "0"
+ENCODING_BASE = len(CODE_ALPHABET)
+LATITUDE_MAX = 90
+LONGITUDE_MAX = 180
+MAX_DIGIT_COUNT = 15
+PAIR_CODE_LENGTH = 10
+PAIR_FIRST_PLACE_VALUE = ENCODING_BASE ** (PAIR_CODE_LENGTH // 2 - 1)
+PAIR_PRECISION = ENCODING_BASE**3
+GRID_CODE_LENGTH = MAX_DIGIT_COUNT - PAIR_CODE_LENGTH
+GRID_COLUMNS = 4
+GRID_ROWS = 5
+GRID_LAT_FIRST_PLACE_VALUE = GRID_ROWS ** (GRID_CODE_LENGTH - 1)
+GRID_LNG_FIRST_PLACE_VALUE = GRID_COLUMNS ** (GRID_CODE_LENGTH - 1)
+FINAL_LAT_PRECISION = PAIR_PRECISION * GRID_ROWS**GRID_CODE_LENGTH
+FINAL_LNG_PRECISION = PAIR_PRECISION * GRID_COLUMNS**GRID_CODE_LENGTH
+MIN_TRIMMABLE_CODE_LEN = 6
+
+
+@dataclass
+class CodeArea:
+    latitude_lo: float
+    longitude_lo: float
+    latitude_hi: float
+    longitude_hi: float
+    code_length: int
+
+    @property
+    def latitude_center(self) -> float:
+        return min(self.latitude_lo + (self.latitude_hi - self.latitude_lo) / 2, LATITUDE_MAX)
+
+    @property
+    def longitude_center(self) -> float:
+        return min(self.longitude_lo + (self.longitude_hi - self.longitude_lo) / 2, LONGITUDE_MAX)
+
+
+def is_valid(code: str) -> bool:
+    if not code or code.count(SEPARATOR) != 1:
+        return False
+    separator_index = code.find(SEPARATOR)
+    if separator_index > SEPARATOR_POSITION or separator_index % 2 == 1:
+        return False
+
+    if PADDING_CHARACTER in code:
+        # Padding is only allowed before the separator, in an even-length run, and not at the start
+        if separator_index < SEPARATOR_POSITION or code.startswith(PADDING_CHARACTER):
+            return False
+        padding = code[code.find(PADDING_CHARACTER) : separator_index]
+        if len(padding) % 2 == 1 or padding.strip(PADDING_CHARACTER):
+            return False
+        if not code.endswith(SEPARATOR):
+            return False
+
+    if len(code) - separator_index - 1 == 1:
+        return False
+    return all(char in CODE_ALPHABET for char in code.upper() if char not in (SEPARATOR, PADDING_CHARACTER))
+
+
+def is_short(code: str) -> bool:
+    return is_valid(code) and 0 <= code.find(SEPARATOR) < SEPARATOR_POSITION
+
+
+def is_full(code: str) -> bool:
+    if not is_valid(code) or is_short(code):
+        return False
+    code = code.upper()
+    if CODE_ALPHABET.find(code[0]) * ENCODING_BASE >= LATITUDE_MAX * 2:
+        return False
+    return len(code) <= 1 or CODE_ALPHABET.find(code[1]) * ENCODING_BASE < LONGITUDE_MAX * 2
+
+
+def clip_latitude(latitude: float) -> float:
+    return min(LATITUDE_MAX, max(-LATITUDE_MAX, latitude))
+
+
+def normalize_longitude(longitude: float) -> float:
+    while longitude < -LONGITUDE_MAX:
+        longitude += LONGITUDE_MAX * 2
+    while longitude >= LONGITUDE_MAX:
+        longitude -= LONGITUDE_MAX * 2
+    return longitude
+
+
+def compute_latitude_precision(code_length: int) -> float:
+    if code_length <= PAIR_CODE_LENGTH:
+        return float(ENCODING_BASE ** (code_length // -2 + 2))
+    return ENCODING_BASE**-3 / GRID_ROWS ** (code_length - PAIR_CODE_LENGTH)
+
+
+def encode(latitude: float, longitude: float, code_length: int = PAIR_CODE_LENGTH) -> str:
+    if code_length < 2 or (code_length < PAIR_CODE_LENGTH and code_length % 2 == 1):
+        raise ValueError(f"Invalid Open Location Code length - {code_length}")
+    code_length = min(code_length, MAX_DIGIT_COUNT)
+    latitude = clip_latitude(latitude)
+    longitude = normalize_longitude(longitude)
+    if latitude == LATITUDE_MAX:
+        latitude -= compute_latitude_precision(code_length)
+
+    lat_value = int(round((latitude + LATITUDE_MAX) * FINAL_LAT_PRECISION, 6))
+    lng_value = int(round((longitude + LONGITUDE_MAX) * FINAL_LNG_PRECISION, 6))
+
+    code = ""
+    if code_length > PAIR_CODE_LENGTH:
+        for _ in range(GRID_CODE_LENGTH):
+            code = CODE_ALPHABET[(lat_value % GRID_ROWS) * GRID_COLUMNS + lng_value % GRID_COLUMNS] + code
+            lat_value //= GRID_ROWS
+            lng_value //= GRID_COLUMNS
+    else:
+        lat_value //= GRID_ROWS**GRID_CODE_LENGTH
+        lng_value //= GRID_COLUMNS**GRID_CODE_LENGTH
+
+    for _ in range(PAIR_CODE_LENGTH // 2):
+        code = CODE_ALPHABET[lng_value % ENCODING_BASE] + code
+        code = CODE_ALPHABET[lat_value % ENCODING_BASE] + code
+        lat_value //= ENCODING_BASE
+        lng_value //= ENCODING_BASE
+
+    code = code[:SEPARATOR_POSITION] + SEPARATOR + code[SEPARATOR_POSITION:]
+    if code_length >= SEPARATOR_POSITION:
+        return code[: code_length + 1]
+    return code[:code_length] + PADDING_CHARACTER * (SEPARATOR_POSITION - code_length) + SEPARATOR
+
+
+def decode(code: str) -> CodeArea:
+    if not is_full(code):
+        raise ValueError(f"Passed Open Location Code is not a valid full code - {code}")
+    code = code.replace(SEPARATOR, "").replace(PADDING_CHARACTER, "").upper()[:MAX_DIGIT_COUNT]
+
+    normal_lat = -LATITUDE_MAX * PAIR_PRECISION
+    normal_lng = -LONGITUDE_MAX * PAIR_PRECISION
+    grid_lat = 0
+    grid_lng = 0
+
+    digits = min(len(code), PAIR_CODE_LENGTH)
+    place_value = PAIR_FIRST_PLACE_VALUE
+    for i in range(0, digits, 2):
+        normal_lat += CODE_ALPHABET.find(code[i]) * place_value
+        normal_lng += CODE_ALPHABET.find(code[i + 1]) * place_value
+        if i < digits - 2:
+            place_value //= ENCODING_BASE
+    lat_precision = place_value / PAIR_PRECISION
+    lng_precision = place_value / PAIR_PRECISION
+
+    if len(code) > PAIR_CODE_LENGTH:
+        row_place_value = GRID_LAT_FIRST_PLACE_VALUE
+        col_place_value = GRID_LNG_FIRST_PLACE_VALUE
+        digits = min(len(code), MAX_DIGIT_COUNT)
+        for i in range(PAIR_CODE_LENGTH, digits):
+            digit_value = CODE_ALPHABET.find(code[i])
+            grid_lat += (digit_value // GRID_COLUMNS) * row_place_value
+            grid_lng += (digit_value % GRID_COLUMNS) * col_place_value
+            if i < digits - 1:
+                row_place_value //= GRID_ROWS
+                col_place_value //= GRID_COLUMNS
+        lat_precision = row_place_value / FINAL_LAT_PRECISION
+        lng_precision = col_place_value / FINAL_LNG_PRECISION
+
+    latitude = normal_lat / PAIR_PRECISION + grid_lat / FINAL_LAT_PRECISION
+    longitude = normal_lng / PAIR_PRECISION + grid_lng / FINAL_LNG_PRECISION
+    return CodeArea(
+        round(latitude, 14),
+        round(longitude, 14),
+        round(latitude + lat_precision, 14),
+        round(longitude + lng_precision, 14),
+        min(len(code), MAX_DIGIT_COUNT),
+    )
+
+
+def recover_nearest(code: str, reference_latitude: float, reference_longitude: float) -> str:
+    """Recover the full code for a short code, choosing the match closest to the reference location."""
+    if not is_short(code):
+        if is_full(code):
+            return code.upper()
+        raise ValueError(f"Passed short code is not valid - {code}")
+
+    reference_latitude = clip_latitude(reference_latitude)
+    reference_longitude = normalize_longitude(reference_longitude)
+    code = code.upper()
+
+    padding_length = SEPARATOR_POSITION - code.find(SEPARATOR)
+    resolution = ENCODING_BASE ** (2 - (padding_length / 2))
+    half_resolution = resolution / 2.0
+
+    area = decode(encode(reference_latitude, reference_longitude)[:padding_length] + code)
+    latitude_center = area.latitude_center
+    longitude_center = area.longitude_center
+
+    if reference_latitude + half_resolution < latitude_center and latitude_center - resolution >= -LATITUDE_MAX:
+        latitude_center -= resolution
+    elif reference_latitude - half_resolution > latitude_center and latitude_center + resolution <= LATITUDE_MAX:
+        latitude_center += resolution
+
+    if reference_longitude + half_resolution < longitude_center:
+        longitude_center -= resolution
+    elif reference_longitude - half_resolution > longitude_center:
+        longitude_center += resolution
+
+    return encode(latitude_center, longitude_center, area.code_length)
@@ -1,58 +1,154 @@
+import hashlib
 import json
 import logging
 import re
+import threading
 import urllib.parse
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 import googlemaps
 import pytz
-from sqlalchemy import Column
+from sqlalchemy import Column, or_
 from sqlalchemy.orm import Session
 
+from core.config import settings
+from core.journey import olc
+from core.journey.geocache import (
+    FIND_PLACE,
+    REVERSE_GEOCODE,
+    TIMEZONE,
+    GeocodeCache,
+    coordinate_key,
+    plus_code_key,
+)
 from database.models.journey import Journey
+from database.models.journey_leg import JourneyLeg
 from database.models.waypoint import Waypoint
 
 logger = logging.getLogger(__name__)
 
 
+def journey_fingerprint(maps_url: str, description: Optional[str]) -> str:
+    """Hash of the inputs that define a journey, used to skip unchanged routes on repeat setups."""
+    return hashlib.sha256(f"{maps_url}\n{description or ''}".encode("utf-8")).hexdigest()
+
+
 class JourneyProcessor:
-    def __init__(self, db: Session, gmaps_client: googlemaps.Client, debug: Optional[bool] = None):
+    def __init__(
+        self,
+        db: Session,
+        gmaps_client: googlemaps.Client,
+        debug: Optional[bool] = None,
+        max_workers: Optional[int] = None,
+        geocache: Optional[GeocodeCache] = None,
+        use_geocache: bool = True,
+    ):
         self.db = db
         self.gmaps = gmaps_client
         self.debug = debug if debug is not None else False
-
-    def extract_plus_codes(self, url: str) -> List[Dict[str, str]]:
+        self.max_workers = max_workers if max_workers is not None else settings.MAX_WORKERS
+        self.geocache = geocache if geocache is not None else (GeocodeCache() if use_geocache else None)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # In-flight and completed lookups for this run, shared so identical plus codes hit the API once
+        self._place_futures: Dict[Tuple[str, str], "Future[Dict[str, Any]]"] = {}
+        self._timezone_futures: Dict[Tuple[float, float], "Future[str]"] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def thread_pool(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    def __enter__(self) -> "JourneyProcessor":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[type],
+        exc_val: Optional[BaseException],
+        exc_tb: Optional[Any],
+    ) -> None:
+        if self._executor:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        self.reset_lookups()
+
+    def reset_lookups(self) -> None:
+        """Forget this run's completed lookups; the geocode cache still serves repeats without API calls."""
+        with self._lock:
+            self._place_futures.clear()
+            self._timezone_futures.clear()
+
+    def extract_plus_codes(self, url: str) -> List[Dict[str, Any]]:
+        """
+        Pull each waypoint's short plus code and locality out of a Maps URL.
+
+        When present, the waypoint's embedded `!1d<lng>!2d<lat>` coordinates and the map's `@lat,lng`
+        viewport centre are included too, so the waypoint can be located without a find_place call.
+        """
         decoded_url = urllib.parse.unquote(url)
-        matches = re.findall(r"!2s([A-Z0-9]{4,6}\+[A-Z0-9]{2,3}),\+([^!]+)", decoded_url)
+        matches = re.findall(
+            r"!2s([A-Z0-9]{4,6}\+[A-Z0-9]{2,3}),\+([^!]+)(?:!2m2!1d(-?\d+(?:\.\d+)?)!2d(-?\d+(?:\.\d+)?))?",
+            decoded_url,
+        )
         if not matches:
             raise ValueError("No Plus Codes found in the URL")
-        return [{"plus_code": code, "location": location} for code, location in matches]
 
-    def enrich_waypoint_data(self, plus_code_with_location: Dict[str, str]) -> Dict[str, Any]:
+        viewport = re.search(r"/@(-?\d+(?:\.\d+)?),(-?\d+(?:\.\d+)?)", decoded_url)
+        waypoints: List[Dict[str, Any]] = []
+        for code, location, lng, lat in matches:
+            waypoint: Dict[str, Any] = {"plus_code": code, "location": location}
+            if lat and lng:
+                waypoint["latitude"] = float(lat)
+                waypoint["longitude"] = float(lng)
+            if viewport:
+                waypoint["reference"] = (float(viewport.group(1)), float(viewport.group(2)))
+            waypoints.append(waypoint)
+        return waypoints
+
+    def resolve_coordinates_offline(self, plus_code_with_location: Dict[str, Any]) -> Optional[Tuple[float, float]]:
+        """Locate a waypoint from its embedded coordinates, or by recovering its full plus code; None if neither."""
+        if "latitude" in plus_code_with_location and "longitude" in plus_code_with_location:
+            return float(plus_code_with_location["latitude"]), float(plus_code_with_location["longitude"])
+
+        reference = plus_code_with_location.get("reference")
+        if reference is not None:
+            try:
+                full_code = olc.recover_nearest(plus_code_with_location["plus_code"], reference[0], reference[1])
+                area = olc.decode(full_code)
+                return area.latitude_center, area.longitude_center
+            except ValueError as e:
+                logger.warning(f"Could not decode plus code {plus_code_with_location['plus_code']}: {str(e)}")
+        return None
+
+    def resolve_place(self, plus_code_with_location: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Locate a plus code and reverse geocode the result (no timezone).
+
+        The find_place call is only made when the coordinates can't be resolved offline from the URL.
+        """
         full_code = f"{plus_code_with_location['plus_code']} {plus_code_with_location['location']}"
 
-        place_result = self.gmaps.find_place(full_code, "textquery", fields=["geometry"])
-
-        if not place_result["candidates"]:
-            raise ValueError(f"Could not find coordinates for {full_code}")
-
-        lat = place_result["candidates"][0]["geometry"]["location"]["lat"]
-        lng = place_result["candidates"][0]["geometry"]["location"]["lng"]
-
-        timezone_result = self.gmaps.timezone((lat, lng))
-        if not timezone_result or "timeZoneId" not in timezone_result:
-            raise ValueError(f"Could not determine timezone for coordinates {lat}, {lng}")
-
-        timezone_str = timezone_result["timeZoneId"]
-
-        reverse_geocode = self.gmaps.reverse_geocode((lat, lng))
-
-        if not reverse_geocode:
-            raise ValueError(f"Could not find place details for coordinates {lat}, {lng}")
+        offline = self.resolve_coordinates_offline(plus_code_with_location)
+        if offline is not None:
+            lat, lng = offline
+        else:
+            location = self.cached_call(
+                FIND_PLACE,
+                plus_code_key(plus_code_with_location["plus_code"], plus_code_with_location["location"]),
+                lambda: self.find_place_location(full_code),
+            )
+            lat, lng = location["lat"], location["lng"]
 
-        place_details = reverse_geocode[0]
+        place_details = self.cached_call(
+            REVERSE_GEOCODE,
+            coordinate_key(lat, lng),
+            lambda: self.reverse_geocode_details(lat, lng),
+        )
         address_components = place_details.get("address_components", [])
 
         city = next(
@@ -77,28 +173,163 @@ class JourneyProcessor:
             "city": city,
             "state": state,
             "country": country,
-            "timezone": timezone_str,
         }
 
-    def process_route(self, maps_url: str, journey_name: str, description: Optional[str] = None) -> Journey:
+    def cached_call(self, kind: str, key: str, fetch: Callable[[], Any]) -> Any:
+        """Serve a lookup from the geocode cache, calling the API and recording the result on a miss."""
+        if self.geocache is not None:
+            cached = self.geocache.get(kind, key)
+            if cached is not None:
+                return cached
+        result = fetch()
+        if self.geocache is not None:
+            self.geocache.put(kind, key, result)
+        return result
+
+    def find_place_location(self, full_code: str) -> Dict[str, float]:
+        place_result = self.gmaps.find_place(full_code, "textquery", fields=["geometry"])
+
+        if not place_result["candidates"]:
+            raise ValueError(f"Could not find coordinates for {full_code}")
+
+        location = place_result["candidates"][0]["geometry"]["location"]
+        return {"lat": location["lat"], "lng": location["lng"]}
+
+    def reverse_geocode_details(self, lat: float, lng: float) -> Dict[str, Any]:
+        reverse_geocode = self.gmaps.reverse_geocode((lat, lng))
+
+        if not reverse_geocode:
+            raise ValueError(f"Could not find place details for coordinates {lat}, {lng}")
+
+        place_details = reverse_geocode[0]
+        return {
+            "place_id": place_details["place_id"],
+            "formatted_address": place_details.get("formatted_address", ""),
+            "address_components": place_details.get("address_components", []),
+        }
+
+    def resolve_timezone(self, lat: float, lng: float) -> str:
+        def fetch_timezone() -> str:
+            timezone_result = self.gmaps.timezone((lat, lng))
+            if not timezone_result or "timeZoneId" not in timezone_result:
+                raise ValueError(f"Could not determine timezone for coordinates {lat}, {lng}")
+            return str(timezone_result["timeZoneId"])
+
+        return str(self.cached_call(TIMEZONE, coordinate_key(lat, lng), fetch_timezone))
+
+    def enrich_waypoint_data(self, plus_code_with_location: Dict[str, Any]) -> Dict[str, Any]:
+        enriched = dict(self.submit_place(plus_code_with_location).result())
+        enriched["timezone"] = self.submit_timezone(enriched["latitude"], enriched["longitude"]).result()
+        return enriched
+
+    def submit_place(self, plus_code_with_location: Dict[str, Any]) -> "Future[Dict[str, Any]]":
+        key = (plus_code_with_location["plus_code"], plus_code_with_location["location"])
+        with self._lock:
+            future = self._place_futures.get(key)
+            if future is None:
+                future = self.thread_pool.submit(self.resolve_place, plus_code_with_location)
+                self._place_futures[key] = future
+            elif self.debug:
+                logger.info(f"Reusing lookup for duplicate plus code {key[0]}")
+        return future
+
+    def submit_timezone(self, lat: float, lng: float) -> "Future[str]":
+        key = (round(float(lat), 4), round(float(lng), 4))
+        with self._lock:
+            future = self._timezone_futures.get(key)
+            if future is None:
+                future = self.thread_pool.submit(self.resolve_timezone, lat, lng)
+                self._timezone_futures[key] = future
+        return future
+
+    def enrich_waypoints(
+        self, waypoints_data: List[Dict[str, Any]], include_timezone: bool = False
+    ) -> List[Optional[Dict[str, Any]]]:
+        """
+        Enrich all waypoints of a journey concurrently. Failed waypoints come back as None.
+
+        The journey's timezone is only looked up once, for the first waypoint, when `include_timezone` is set.
+        """
+        futures = [self.submit_place(waypoint_data) for waypoint_data in waypoints_data]
+
+        enriched: List[Optional[Dict[str, Any]]] = []
+        for waypoint_data, future in zip(waypoints_data, futures):
+            try:
+                enriched.append(dict(future.result()))
+            except Exception as e:
+                logger.error(f"Error processing waypoint {waypoint_data}: {str(e)}")
+                enriched.append(None)
+
+        if include_timezone and enriched and enriched[0] is not None:
+            first = enriched[0]
+            first["timezone"] = self.submit_timezone(first["latitude"], first["longitude"]).result()
+        return enriched
+
+    def changed_routes(self, journeys_data: List[Dict[str, Any]], force: bool = False) -> List[Dict[str, Any]]:
+        """Drop routes whose stored fingerprint matches the file, using one query for all journeys."""
+        if force:
+            return journeys_data
+
+        names = {journey["route_name"] for journey in journeys_data}
+        stored = dict(
+            self.db.query(Journey.name, Journey.fingerprint)
+            .filter(Journey.name.in_(names), Journey.waypoints.any())
+            .all()
+        )
+        changed = [
+            journey
+            for journey in journeys_data
+            if stored.get(journey["route_name"])
+            != journey_fingerprint(journey["route_url"], journey.get("route_description"))
+        ]
+        logger.info(f"{len(changed)} of {len(journeys_data)} journeys are new or changed")
+        return changed
+
+    def prefetch_routes(self, journeys_data: List[Dict[str, Any]]) -> None:
+        """Start place lookups for every waypoint of every journey so they overlap across journeys."""
+        for journey in journeys_data:
+            try:
+                for waypoint_data in self.extract_plus_codes(journey["route_url"]):
+                    self.submit_place(waypoint_data)
+            except Exception as e:
+                logger.error(f"Error prefetching journey '{journey.get('route_name')}': {str(e)}")
+
+    def process_route(
+        self, maps_url: str, journey_name: str, description: Optional[str] = None, commit: bool = True
+    ) -> Journey:
+        """
+        Create or update one journey and its waypoints. With `commit=False` the changes are only flushed and
+        geocode results are left pending, so a caller can commit many journeys in one transaction.
+        """
         if self.debug:
             logger.info(f"Processing journey: {journey_name}")
 
         waypoints_data = self.extract_plus_codes(maps_url)
         now = datetime.now(pytz.UTC)
+        if self.geocache is not None:
+            self.geocache.ensure_loaded(self.db)
 
         existing_journey = self.db.query(Journey).filter_by(name=journey_name).first()
 
+        # Only plus codes the journey doesn't already have need enriching
+        known_codes = {wp.plus_code for wp in existing_journey.waypoints} if existing_journey else set()
+        new_waypoints_data = [wd for wd in waypoints_data if wd["plus_code"] not in known_codes]
+        enriched_waypoints = self.enrich_waypoints(new_waypoints_data, include_timezone=existing_journey is None)
+        enriched_by_code = {
+            wd["plus_code"]: enriched for wd, enriched in zip(new_waypoints_data, enriched_waypoints) if enriched
+        }
+
         if existing_journey:
-            logger.info(f"Journey '{journey_name}' already exists. Updating details.")
+            logger.info(f"Journey '{journey_name}' changed. Updating details.")
             journey = existing_journey
             journey.description = description or journey.description
+            journey.maps_url = maps_url
+            journey.raw_data = {"url": maps_url}
             journey.updated_at = now
-
-            self.db.query(Waypoint).filter(Waypoint.journey_id == journey.id).delete(synchronize_session=False)
-            self.db.flush()
         else:
-            first_waypoint = self.enrich_waypoint_data(waypoints_data[0])
+            first_waypoint = enriched_waypoints[0]
+            if first_waypoint is None:
+                raise ValueError(f"Could not enrich the first waypoint of journey '{journey_name}'")
 
             journey = Journey(
                 name=journey_name,
@@ -115,25 +346,17 @@ class JourneyProcessor:
             )
             self.db.add(journey)
 
-        for idx, waypoint_data in enumerate(waypoints_data, 1):
-            try:
-                enriched_data = self.enrich_waypoint_data(waypoint_data)
-
-                waypoint = Waypoint(
-                    sequence_number=idx,
-                    journey_id=journey.id,
-                    place_id=str(enriched_data["place_id"]),
-                    plus_code=str(enriched_data["plus_code"]),
-                    formatted_address=str(enriched_data["formatted_address"]),
-                    latitude=enriched_data["latitude"],
-                    longitude=enriched_data["longitude"],
-                    created_at=now,
-                )
-                journey.waypoints.append(waypoint)
+        # Without a fingerprint the next setup retries the waypoints that could not be enriched this time
+        resolved = all(wd["plus_code"] in known_codes or wd["plus_code"] in enriched_by_code for wd in waypoints_data)
+        journey.fingerprint = journey_fingerprint(maps_url, description) if resolved else None
+        self.sync_waypoints(journey, waypoints_data, enriched_by_code, now)
 
-            except Exception as e:
-                logger.error(f"Error processing waypoint {waypoint_data}: {str(e)}")
-                continue
+        if not commit:
+            self.db.flush()
+            return journey
+
+        if self.geocache is not None:
+            self.geocache.flush(self.db)
 
         try:
             self.db.commit()
@@ -146,7 +369,65 @@ class JourneyProcessor:
 
         return journey
 
-    def process_routes_file(self, journeys_filename: Optional[Path] = None) -> List[Journey]:
+    def sync_waypoints(
+        self,
+        journey: Journey,
+        waypoints_data: List[Dict[str, Any]],
+        enriched_by_code: Dict[str, Dict[str, Any]],
+        now: datetime,
+    ) -> None:
+        """
+        Reconcile a journey's waypoints with the route, keeping rows (and their IDs) for unchanged plus codes.
+
+        Only new plus codes are inserted and only dropped ones are deleted, so journey_legs that reference
+        unchanged waypoints stay intact.
+        """
+        existing_by_code: Dict[str, List[Waypoint]] = {}
+        for waypoint in sorted(journey.waypoints, key=lambda w: w.sequence_number):
+            existing_by_code.setdefault(str(waypoint.plus_code), []).append(waypoint)
+
+        if journey.waypoints:
+            # Park existing rows on negative sequence numbers so re-ordering can't collide with uq_journey_sequence
+            for waypoint in journey.waypoints:
+                waypoint.sequence_number = -waypoint.sequence_number
+            self.db.flush()
+
+        for idx, waypoint_data in enumerate(waypoints_data, 1):
+            reusable = existing_by_code.get(waypoint_data["plus_code"])
+            if reusable:
+                reusable.pop(0).sequence_number = idx
+                continue
+
+            enriched_data = enriched_by_code.get(waypoint_data["plus_code"])
+            if enriched_data is None:
+                continue
+
+            waypoint = Waypoint(
+                sequence_number=idx,
+                journey_id=journey.id,
+                place_id=str(enriched_data["place_id"]),
+                plus_code=str(enriched_data["plus_code"]),
+                formatted_address=str(enriched_data["formatted_address"]),
+                latitude=enriched_data["latitude"],
+                longitude=enriched_data["longitude"],
+                created_at=now,
+            )
+            journey.waypoints.append(waypoint)
+
+        removed = [waypoint for waypoints in existing_by_code.values() for waypoint in waypoints]
+        if removed:
+            removed_ids = [waypoint.id for waypoint in removed]
+            deleted_legs = (
+                self.db.query(JourneyLeg)
+                .filter(or_(JourneyLeg.start_waypoint_id.in_(removed_ids), JourneyLeg.end_waypoint_id.in_(removed_ids)))
+                .delete(synchronize_session=False)
+            )
+            if deleted_legs:
+                logger.warning(f"Deleted {deleted_legs} legs that referenced waypoints removed from '{journey.name}'")
+            for waypoint in removed:
+                journey.waypoints.remove(waypoint)
+
+    def process_routes_file(self, journeys_filename: Optional[Path] = None, force: bool = False) -> List[Journey]:
         if self.debug:
             logger.info(f"Processing journeys from {journeys_filename}")
 
@@ -159,22 +440,33 @@ class JourneyProcessor:
 
             processed_journeys = []
 
-            for journey in journeys_data.get("journeys", []):
-                try:
-                    if self.debug:
-                        logger.info(f"\nProcessing journey: {journey['route_name']}")
+            changed_journeys = self.changed_routes(journeys_data.get("journeys", []), force=force)
+
+            if self.geocache is not None and changed_journeys:
+                self.geocache.ensure_loaded(self.db)
+
+            with self:
+                # Network lookups for all journeys run concurrently; database writes stay on this thread
+                self.prefetch_routes(changed_journeys)
+
+                for journey in changed_journeys:
+                    try:
+                        if self.debug:
+                            logger.info(f"\nProcessing journey: {journey['route_name']}")
 
-                    processed_journey = self.process_route(
-                        journey["route_url"],
-                        journey["route_name"],
-                        journey.get("route_description"),
-                    )
-                    processed_journeys.append(processed_journey)
+                        processed_journey = self.process_route(
+                            journey["route_url"],
+                            journey["route_name"],
+                            journey.get("route_description"),
+                        )
+                        processed_journeys.append(processed_journey)
 
-                except Exception as e:
-                    logger.error(f"Error processing journey '{journey['route_name']}': {str(e)}")
-                    continue
+                    except Exception as e:
+                        logger.error(f"Error processing journey '{journey['route_name']}': {str(e)}")
+                        continue
 
+            if self.geocache is not None:
+                logger.info(f"Geocode cache: {self.geocache.summary()}")
             return processed_journeys
 
         except json.JSONDecodeError:
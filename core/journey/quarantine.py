@@ -0,0 +1,159 @@
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional, Set
+
+from sqlalchemy import and_, exists, or_
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.elements import ColumnElement
+
+from core.config import settings
+from core.journey.calculator import MODES
+from database.models.journey import Journey
+from database.models.journey_failure import JourneyFailure
+
+logger = logging.getLogger(__name__)
+
+# journey_statuses rows seeded by the initial migration
+ACTIVE_STATUS_ID = 1
+ERROR_STATUS_ID = 2
+DISABLED_STATUS_ID = 3
+
+MAX_ERROR_LENGTH = 1000
+
+
+def backoff_delay(consecutive_failures: int, threshold: int, base: timedelta, cap: timedelta) -> Optional[timedelta]:
+    """Time to wait before retrying: none below `threshold` failures, then base, 2×base, 4×base, ... up to `cap`."""
+    if consecutive_failures < threshold:
+        return None
+    return min(base * 2 ** min(consecutive_failures - threshold, 32), cap)
+
+
+def as_utc(dt: datetime) -> datetime:
+    return dt if dt.tzinfo is not None else dt.replace(tzinfo=timezone.utc)
+
+
+class FailureQuarantine:
+    """
+    Track consecutive failures per journey and calculator mode, and back off from repeat offenders.
+
+    After `threshold` failures in a row a mode is skipped until its `retry_after`, which doubles with every
+    further failure up to `max_backoff`; one success clears it. A journey whose modes are all quarantined is
+    put in the error state, with its last error in `error_message`, so `load_active_journeys` only picks it
+    up again once a retry is due. Like the anomaly detector, changes are staged on the caller's session and
+    committed with the journey's measurements.
+    """
+
+    def __init__(
+        self,
+        threshold: Optional[int] = None,
+        base_backoff: Optional[timedelta] = None,
+        max_backoff: Optional[timedelta] = None,
+    ):
+        self.threshold = threshold if threshold is not None else settings.QUARANTINE_AFTER_FAILURES
+        self.base_backoff = base_backoff or timedelta(minutes=settings.QUARANTINE_BACKOFF_MINUTES)
+        self.max_backoff = max_backoff or timedelta(hours=settings.QUARANTINE_MAX_BACKOFF_HOURS)
+        self.failures: Dict[int, Dict[str, JourneyFailure]] = {}
+        self.skipped: Dict[int, Set[str]] = {}
+
+    @staticmethod
+    def due_clause(now: datetime) -> ColumnElement:
+        """Journeys to measure: active ones, plus errored ones with a mode whose retry is due."""
+        retry_due = exists().where(
+            JourneyFailure.journey_id == Journey.id,
+            or_(JourneyFailure.retry_after.is_(None), JourneyFailure.retry_after <= now),
+        )
+        return or_(Journey.status_id == ACTIVE_STATUS_ID, and_(Journey.status_id == ERROR_STATUS_ID, retry_due))
+
+    def load(self, db: Session, journey_id: int) -> Dict[str, JourneyFailure]:
+        if journey_id not in self.failures:
+            rows = db.query(JourneyFailure).filter(JourneyFailure.journey_id == journey_id).all()
+            self.failures[journey_id] = {row.mode: row for row in rows}
+        return self.failures[journey_id]
+
+    def skipped_modes(self, db: Session, journey: Journey, now: Optional[datetime] = None) -> Set[str]:
+        """Modes of `journey` still waiting out their backoff."""
+        now = now or datetime.now(timezone.utc)
+        skipped = {
+            mode
+            for mode, failure in self.load(db, journey.id).items()
+            if failure.retry_after is not None and as_utc(failure.retry_after) > now
+        }
+        self.skipped[journey.id] = skipped
+        if skipped:
+            logger.info(f"Skipping quarantined modes for journey '{journey.name}': {', '.join(sorted(skipped))}")
+        return skipped
+
+    @staticmethod
+    def outcomes(metrics: Dict[str, Any], skipped: Set[str]) -> Dict[str, Optional[str]]:
+        """Error message (or None on success) for every mode process_route attempted."""
+        if metrics.get("status") == "error":
+            # The journey failed before any mode ran, e.g. its waypoints have no place ids
+            return {mode: metrics.get("error") or "Unknown error" for mode in MODES if mode not in skipped}
+        return {mode: mode_data.get("error") for mode, mode_data in metrics.get("modes", {}).items()}
+
+    def record(self, db: Session, journey: Journey, metrics: Dict[str, Any], now: Optional[datetime] = None) -> None:
+        """Stage failure counts and the journey's status for one process_route result."""
+        now = now or datetime.now(timezone.utc)
+        failures = self.load(db, journey.id)
+        skipped = self.skipped.pop(journey.id, set())
+        outcomes = self.outcomes(metrics, skipped)
+
+        for mode, error in outcomes.items():
+            failure = failures.get(mode)
+            if error is None:
+                if failure is not None:
+                    logger.info(
+                        f"Mode {mode} of journey '{journey.name}' recovered after "
+                        f"{failure.consecutive_failures} failures"
+                    )
+                    db.delete(failure)
+                    del failures[mode]
+                continue
+
+            if failure is None:
+                failure = JourneyFailure(journey_id=journey.id, mode=mode, consecutive_failures=0, first_failed_at=now)
+                db.add(failure)
+                failures[mode] = failure
+            failure.consecutive_failures += 1
+            failure.last_error = error[:MAX_ERROR_LENGTH]
+            failure.last_failed_at = now
+            delay = backoff_delay(failure.consecutive_failures, self.threshold, self.base_backoff, self.max_backoff)
+            failure.retry_after = now + delay if delay is not None else None
+            if delay is not None:
+                logger.warning(
+                    f"Quarantined mode {mode} of journey '{journey.name}' after {failure.consecutive_failures} "
+                    f"consecutive failures, next attempt after {failure.retry_after.isoformat(timespec='seconds')}"
+                )
+
+        self.update_journey(journey, failures, succeeded=any(error is None for error in outcomes.values()), now=now)
+
+    def update_journey(
+        self, journey: Journey, failures: Dict[str, JourneyFailure], succeeded: bool, now: datetime
+    ) -> None:
+        error_message = None
+        if failures:
+            mode, latest = max(failures.items(), key=lambda item: as_utc(item[1].last_failed_at))
+            error_message = f"{mode}: {latest.last_error}"
+        if journey.error_message != error_message:
+            journey.error_message = error_message
+            journey.updated_at = now  # Moves the /api/journeys ETag
+
+        if journey.status_id not in (ACTIVE_STATUS_ID, ERROR_STATUS_ID):
+            return  # Disabled journeys, such as the load generator's, keep their status
+
+        quarantined = bool(failures) and all(
+            failure.retry_after is not None and as_utc(failure.retry_after) > now for failure in failures.values()
+        )
+        status_id = ACTIVE_STATUS_ID if succeeded or not quarantined else ERROR_STATUS_ID
+        if journey.status_id != status_id:
+            if status_id == ERROR_STATUS_ID:
+                logger.warning(f"Journey '{journey.name}' moved to the error state: {journey.error_message}")
+            else:
+                logger.info(f"Journey '{journey.name}' is active again")
+            journey.status_id = status_id
+            journey.updated_at = now
+
+    def reset(self) -> None:
+        """Drop in-memory state, e.g. after a rollback, so failures are reloaded from what was committed."""
+        self.failures.clear()
+        self.skipped.clear()
@@ -0,0 +1,206 @@
+import base64
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import func, tuple_
+from sqlalchemy.orm import Session
+
+from database.models.journey import Journey
+from database.models.journey_measurement import JourneyMeasurement
+from database.models.transit_mode import TransitMode
+from database.models.waypoint import Waypoint
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PAGE_SIZE = 500
+MAX_PAGE_SIZE = 5000
+
+
+@dataclass(frozen=True)
+class MeasurementCursor:
+    """Keyset position in the (timestamp, id) ordering of journey_measurements."""
+
+    timestamp: datetime
+    id: int
+
+    def encode(self) -> str:
+        raw = f"{self.timestamp.isoformat()}|{self.id}".encode("utf-8")
+        return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+    @classmethod
+    def decode(cls, token: str) -> "MeasurementCursor":
+        try:
+            padded = token + "=" * (-len(token) % 4)
+            timestamp_str, id_str = base64.urlsafe_b64decode(padded).decode("utf-8").split("|", 1)
+            return cls(timestamp=ensure_utc(datetime.fromisoformat(timestamp_str)), id=int(id_str))
+        except (ValueError, UnicodeDecodeError) as e:
+            raise ValueError(f"Invalid cursor: {token}") from e
+
+
+@dataclass(frozen=True)
+class MeasurementFilter:
+    journey_id: Optional[int] = None
+    mode: Optional[str] = None  # Calculator mode key, e.g. "driving_routed"
+    transit_mode_id: Optional[int] = None  # Pools driving and driving_routed, like the segment profiles do
+    start: Optional[datetime] = None
+    end: Optional[datetime] = None
+
+
+def ensure_utc(dt: datetime) -> datetime:
+    """Treat naive datetimes as UTC and convert aware ones to UTC."""
+    if dt.tzinfo is None:
+        return dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc)
+
+
+class JourneyQueries:
+    """Read-side queries backing the JSON API. Every list query is index-driven and keyset paginated."""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def get_transit_mode_id(self, mode: str) -> int:
+        """Resolve a mode name strictly; unlike TransitMode.get_id there is no fallback to driving."""
+        mode_record = self.db.query(TransitMode).filter_by(mode=mode.lower()).first()
+        if mode_record is None:
+            raise ValueError(f"Unknown transit mode '{mode}'")
+        return int(mode_record.id)
+
+    def resolve_mode(self, mode: str) -> str:
+        """Validate a mode name and return the key measurements are stored under."""
+        self.get_transit_mode_id(mode)
+        return mode.lower()
+
+    def apply_filter(self, query: Any, filters: MeasurementFilter) -> Any:
+        if filters.journey_id is not None:
+            query = query.filter(JourneyMeasurement.journey_id == filters.journey_id)
+        if filters.mode is not None:
+            query = query.filter(JourneyMeasurement.mode == filters.mode)
+        if filters.transit_mode_id is not None:
+            query = query.filter(JourneyMeasurement.transit_mode_id == filters.transit_mode_id)
+        if filters.start is not None:
+            query = query.filter(JourneyMeasurement.timestamp >= filters.start)
+        if filters.end is not None:
+            query = query.filter(JourneyMeasurement.timestamp < filters.end)
+        return query
+
+    def measurement_watermark(self, filters: Optional[MeasurementFilter] = None) -> Optional[int]:
+        """
+        Return the highest id among the measurements matching the filters.
+
+        Ids only grow, so this changes whenever a matching measurement is inserted, including a replayed one
+        older than the newest timestamp. It is an aggregate over the journey's index range, which is still
+        cheap enough to run on every conditional request.
+        """
+        query = self.db.query(func.max(JourneyMeasurement.id))
+        watermark = self.apply_filter(query, filters or MeasurementFilter()).scalar()
+        return int(watermark) if watermark is not None else None
+
+    def journeys_watermark(self) -> Tuple[int, Optional[datetime]]:
+        count, updated_at = self.db.query(func.count(Journey.id), func.max(Journey.updated_at)).one()
+        return int(count), updated_at
+
+    def list_journeys(self) -> List[Dict[str, Any]]:
+        waypoint_counts = dict(
+            self.db.query(Waypoint.journey_id, func.count(Waypoint.id)).group_by(Waypoint.journey_id).all()
+        )
+        return [
+            {
+                "id": journey.id,
+                "name": journey.name,
+                "description": journey.description,
+                "city": journey.city,
+                "state": journey.state,
+                "country": journey.country,
+                "timezone": journey.timezone,
+                "status_id": journey.status_id,
+                "error_message": journey.error_message,
+                "waypoint_count": int(waypoint_counts.get(journey.id, 0)),
+                "updated_at": journey.updated_at.isoformat() if journey.updated_at else None,
+            }
+            for journey in self.db.query(Journey).order_by(Journey.id).all()
+        ]
+
+    def list_measurements(
+        self,
+        filters: MeasurementFilter,
+        cursor: Optional[MeasurementCursor] = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+    ) -> Tuple[List[Dict[str, Any]], Optional[MeasurementCursor]]:
+        """Return one page of measurements ordered by (timestamp, id) plus the cursor for the next page."""
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        columns = (
+            JourneyMeasurement.id,
+            JourneyMeasurement.journey_id,
+            JourneyMeasurement.mode,
+            JourneyMeasurement.timestamp,
+            JourneyMeasurement.local_timestamp,
+            JourneyMeasurement.day_of_week_id,
+            JourneyMeasurement.time_slot_id,
+            JourneyMeasurement.duration_seconds,
+            JourneyMeasurement.distance_meters,
+            JourneyMeasurement.speed_kph,
+        )
+        query = self.apply_filter(self.db.query(*columns), filters)
+        if cursor is not None:
+            query = query.filter(
+                tuple_(JourneyMeasurement.timestamp, JourneyMeasurement.id) > tuple_(cursor.timestamp, cursor.id)
+            )
+
+        # Fetch one extra row to learn whether another page exists without a COUNT(*)
+        rows = query.order_by(JourneyMeasurement.timestamp, JourneyMeasurement.id).limit(limit + 1).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+
+        items = [
+            {
+                "id": row.id,
+                "journey_id": row.journey_id,
+                "mode": row.mode,
+                "timestamp": row.timestamp.isoformat(),
+                "local_timestamp": row.local_timestamp.isoformat(),
+                "day_of_week_id": row.day_of_week_id,
+                "time_slot_id": row.time_slot_id,
+                "duration_seconds": row.duration_seconds,
+                "distance_meters": float(row.distance_meters),
+                "speed_kph": float(row.speed_kph),
+            }
+            for row in rows
+        ]
+
+        next_cursor = None
+        if has_more and rows:
+            next_cursor = MeasurementCursor(timestamp=ensure_utc(rows[-1].timestamp), id=int(rows[-1].id))
+        return items, next_cursor
+
+    def slot_profile(self, filters: MeasurementFilter) -> List[Dict[str, Any]]:
+        """Aggregate measurements into one row per (day_of_week_id, time_slot_id)."""
+        query = self.db.query(
+            JourneyMeasurement.day_of_week_id,
+            JourneyMeasurement.time_slot_id,
+            func.count(JourneyMeasurement.id).label("sample_count"),
+            func.avg(JourneyMeasurement.duration_seconds).label("avg_duration_seconds"),
+            func.min(JourneyMeasurement.duration_seconds).label("min_duration_seconds"),
+            func.max(JourneyMeasurement.duration_seconds).label("max_duration_seconds"),
+            func.avg(JourneyMeasurement.speed_kph).label("avg_speed_kph"),
+        )
+        query = self.apply_filter(query, filters)
+        rows = (
+            query.group_by(JourneyMeasurement.day_of_week_id, JourneyMeasurement.time_slot_id)
+            .order_by(JourneyMeasurement.day_of_week_id, JourneyMeasurement.time_slot_id)
+            .all()
+        )
+        return [
+            {
+                "day_of_week_id": row.day_of_week_id,
+                "time_slot_id": row.time_slot_id,
+                "sample_count": int(row.sample_count),
+                "avg_duration_seconds": float(row.avg_duration_seconds),
+                "min_duration_seconds": int(row.min_duration_seconds),
+                "max_duration_seconds": int(row.max_duration_seconds),
+                "avg_speed_kph": float(row.avg_speed_kph),
+            }
+            for row in rows
+        ]
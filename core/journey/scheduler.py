@@ -1,44 +1,67 @@
 import logging
-from datetime import datetime
-from typing import Any, Dict, List, Optional
+from datetime import datetime, timezone
+from typing import Any, Collection, Dict, List, Optional, Union
 
 import googlemaps
 import pytz
-from sqlalchemy import and_
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, selectinload
 
+from core.cache.response_cache import publish_watermark
 from core.config import settings
-from core.journey.calculator import JourneyMetricsCalculator
+from core.config.logging_config import log_fields
+from core.journey.anomaly import AnomalyDetector
+from core.journey.api_usage import ApiBudget, CountingClient, usage_report
+from core.journey.calculator import JourneyMetricsCalculator, JourneySnapshot
+from core.journey.forecast import ForecastBuilder
+from core.journey.heatmap import HeatmapBuilder
+from core.journey.quarantine import FailureQuarantine
 from core.journey.reporter import JourneyReporter
+from core.journey.spool import (
+    DATABASE_UNAVAILABLE_ERRORS,
+    MeasurementSpool,
+    SpoolReplayer,
+    build_measurements,
+    measurement_record,
+)
 from database.models.journey import Journey
 from database.models.journey_measurement import JourneyMeasurement
-from database.models.time_slot import TimeSlot
-from database.models.transit_mode import TransitMode
 from database.session import get_db
 
 logger = logging.getLogger(__name__)
 
 
 class JourneyScheduler:
-    def __init__(self, max_workers: Optional[int] = None, debug: Optional[bool] = None):
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        debug: Optional[bool] = None,
+        gmaps_client: Optional[Union[googlemaps.Client, CountingClient]] = None,
+    ):
         self.max_workers = max_workers if max_workers is not None else settings.MAX_WORKERS
         self.debug = debug if debug is not None else settings.DEBUG
         self.completed_routes: List[Dict[str, Any]] = []
 
-        api_key = settings.get_google_maps_api_key()
-        self.gmaps = googlemaps.Client(key=api_key)
+        if gmaps_client is None:
+            gmaps_client = googlemaps.Client(key=settings.get_google_maps_api_key())
+        if not isinstance(gmaps_client, CountingClient):
+            gmaps_client = CountingClient(gmaps_client, source="scheduler")
+        self.gmaps = gmaps_client
 
         self.calculator = JourneyMetricsCalculator(self.gmaps, max_workers=self.max_workers, debug=self.debug)
         self.reporter = JourneyReporter(debug=self.debug)
+        self.detector = AnomalyDetector()
+        self.quarantine = FailureQuarantine()
+        self.budget = ApiBudget()
+        self.spool = MeasurementSpool()
+        self.database_down = False  # Set on the first outage; the rest of the run only spools
 
     def load_active_journeys(self, db: Session) -> List[Journey]:
         active_journeys = (
             db.query(Journey)
+            .options(selectinload(Journey.waypoints))
             .filter(
-                and_(
-                    Journey.status_id == 1,
-                    Journey.waypoints.any(),
-                )
+                FailureQuarantine.due_clause(datetime.now(timezone.utc)),
+                Journey.waypoints.any(),
             )
             .all()
         )
@@ -51,72 +74,191 @@ class JourneyScheduler:
 
         return active_journeys
 
-    def save_journey_metrics(self, db: Session, journey: Journey, metrics: Dict[str, Any]) -> None:
+    def save_journey_metrics(
+        self, db: Session, journey: Journey, snapshot: JourneySnapshot, metrics: Dict[str, Any]
+    ) -> None:
         """
         Save metrics for a journey, ensuring proper handling of local and UTC timestamps.
+        The ORM journey is only used while the database is up; the spool record is built from the snapshot.
         """
+        record: Optional[Dict[str, Any]] = None
         try:
             now = datetime.now()  # Current timestamp in the server's timezone
 
-            if not journey.timezone:
-                raise ValueError(f"Journey {journey.id} is missing a timezone.")
+            if not snapshot.timezone:
+                raise ValueError(f"Journey {snapshot.id} is missing a timezone.")
 
-            local_tz = pytz.timezone(journey.timezone)  # Now guaranteed to be a str
+            local_tz = pytz.timezone(snapshot.timezone)  # Now guaranteed to be a str
             local_timestamp = now.astimezone(local_tz)  # Convert `now` to local time for the journey
 
             if local_timestamp.tzinfo is None:
                 local_timestamp = pytz.utc.localize(local_timestamp)
 
-            for mode, mode_data in metrics["modes"].items():
-                transit_mode_id = TransitMode.get_id(db, mode)
-
-                measurement = JourneyMeasurement(
-                    journey_id=journey.id,
-                    transit_mode_id=transit_mode_id,
-                    local_timestamp=local_timestamp,  # Pass the local time
-                    day_of_week_id=local_timestamp.isoweekday(),
-                    time_slot_id=TimeSlot.get_id(db, local_timestamp),
-                    duration_seconds=mode_data["metrics"]["duration_seconds"],
-                    distance_meters=mode_data["metrics"]["distance_meters"],
-                    speed_kph=mode_data["metrics"]["speed_kph"],
-                    raw_response=mode_data,
-                    journey=journey,  # Pass the journey object for timezone access
-                )
+            # Durably logged before the insert, so the results survive the database being down or slow
+            record = measurement_record(snapshot.id, local_timestamp, metrics)
+            self.spool.append(record)
+            for mode_data in metrics.get("modes", {}).values():
+                mode_data.pop("segments", None)  # Serialized in the record; completed_routes doesn't keep them
+            if self.database_down:
+                return
+
+            for measurement in build_measurements(db, journey, record):
                 db.add(measurement)
+                self.detect_anomaly(db, measurement)
 
+            self.quarantine.record(db, journey, metrics)
+            self.detector.flush(db)
             db.commit()
-            logger.info(f"Inserted new measurement for journey '{journey.name}'")
+            self.spool.acknowledge(record["id"])
+            logger.info(
+                "Inserted new measurement for journey '%s'",
+                snapshot.name,
+                extra=log_fields(journey_id=snapshot.id, modes=len(metrics.get("modes", {}))),
+            )
+
+        except DATABASE_UNAVAILABLE_ERRORS as e:
+            self.mark_database_down(db, e)
 
         except Exception as e:
             db.rollback()
+            self.detector.reset()
+            self.quarantine.reset()
+            if record is not None:
+                self.spool.acknowledge(record["id"])  # Not an outage; replaying would fail the same way
             logger.error(f"Error saving metrics: {str(e)}")
             raise
 
-    def process_single_journey(self, db: Session, journey: Journey) -> None:
+    def mark_database_down(self, db: Session, error: Exception) -> None:
+        """
+        Keep measuring after a database outage; results go to the spool only. The rollback expires every
+        loaded Journey, so from here on the run reads nothing but the snapshots taken before the loop.
+        """
+        db.rollback()
+        self.detector.reset()
+        self.quarantine.reset()
+        self.database_down = True
+        logger.error(f"Database unavailable, spooling the rest of this run for replay: {str(error)}")
+
+    def detect_anomaly(self, db: Session, measurement: JourneyMeasurement) -> None:
+        """Score a new measurement against its slot baseline; detection problems never block saving it."""
+        try:
+            self.detector.observe(db, measurement)
+        except Exception as e:
+            logger.warning(f"Could not score measurement for anomalies: {str(e)}")
+
+    def process_single_journey(
+        self, db: Session, journey: Journey, snapshot: JourneySnapshot, deferred_modes: Collection[str] = ()
+    ) -> None:
         try:
-            logger.info(f"Processing journey: {journey.name}")
-            metrics = self.calculator.process_route(journey)
-            self.save_journey_metrics(db, journey, metrics)
+            logger.info(f"Processing journey: {snapshot.name}")
+            skip_modes = set(deferred_modes)
+            if not self.database_down:  # Quarantine state lives in the database
+                try:
+                    skip_modes |= self.quarantine.skipped_modes(db, journey)
+                except DATABASE_UNAVAILABLE_ERRORS as e:
+                    self.mark_database_down(db, e)
+            metrics = self.calculator.process_route(snapshot, skip_modes=skip_modes)
+            self.save_journey_metrics(db, journey, snapshot, metrics)
             self.completed_routes.append(metrics)
-            logger.info(f"Completed processing journey: {journey.name}")
+            logger.info(f"Completed processing journey: {snapshot.name}")
         except Exception as e:
-            logger.error(f"Error processing journey '{journey.name}': {str(e)}")
+            logger.error(f"Error processing journey '{snapshot.name}': {str(e)}")
             raise
 
+    def refresh_heatmaps(self, db: Session, journeys: List[Journey]) -> None:
+        """Fold this run's measurements into the precomputed day-of-week × time-slot heatmaps."""
+        try:
+            HeatmapBuilder(db).refresh([journey.id for journey in journeys])
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"Could not refresh heatmaps: {str(e)}")
+
+    def refresh_forecasts(self, db: Session, journeys: List[Journey]) -> None:
+        """Refit the per-slot travel-time models with this run's measurements."""
+        try:
+            ForecastBuilder(db).refresh([journey.id for journey in journeys])
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"Could not refit forecasts: {str(e)}")
+
+    def publish_cache_watermark(self, db: Session) -> None:
+        """Invalidate read API caches now that this slot's measurements are committed."""
+        try:
+            publish_watermark(db)
+        except Exception as e:
+            logger.warning(f"Could not publish response cache watermark: {str(e)}")
+
+    def record_api_usage(self, db: Session) -> None:
+        """Persist this run's Google Maps call counts and log spend against the budget."""
+        try:
+            calls, cost = self.gmaps.run_calls(), self.gmaps.run_cost()
+            self.gmaps.flush(db)
+            report = usage_report(db)
+            logger.info(
+                f"Google Maps API: {calls} calls (${cost:.2f}) this run, ${report['today_cost_usd']:.2f} today, "
+                f"${report['projected_month_usd']:.2f} projected this month"
+            )
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"Could not record API usage: {str(e)}")
+
+    def replay_spool(self, db: Session) -> None:
+        """Insert results that earlier runs spooled but could not write, before measuring anything new."""
+        try:
+            SpoolReplayer(db, self.spool.directory, self.detector).replay()
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"Could not replay spooled measurements: {str(e)}")
+
+    def replay_after_outage(self) -> None:
+        """
+        Insert what this run spooled while the database was down, then record the API usage that couldn't be
+        written during the outage. Raises if the database is still unavailable, so run_scheduler retries (the
+        retry only replays; the results are already paid for).
+        """
+        if not self.spool.enabled:
+            raise RuntimeError("Database unavailable during the run and the spool is disabled; results were lost")
+        try:
+            with get_db() as db:
+                SpoolReplayer(db, self.spool.directory, self.detector).replay()
+                self.record_api_usage(db)
+        except Exception as e:
+            raise RuntimeError(f"Database still unavailable, spooled results kept for the next run: {str(e)}") from e
+        self.database_down = False
+        self.detector.reset()  # Its baselines belong to the replay's session, which is closed now
+        logger.info("Replayed the results spooled during the database outage")
+
     def process_all_journeys(self) -> None:
         start_time = datetime.now()
 
         with get_db() as db:
             try:
+                self.database_down = False
+                self.replay_spool(db)
                 journeys = self.load_active_journeys(db)
+                snapshots = [JourneySnapshot.of(journey) for journey in journeys]
                 total_journeys = len(journeys)
                 logger.info(f"Processing {total_journeys} journeys")
 
+                self.budget.start_run(db)
                 with self.calculator:
-                    for journey in journeys:
-                        self.process_single_journey(db, journey)
+                    for index, (journey, snapshot) in enumerate(zip(journeys, snapshots)):
+                        decision = self.budget.check(self.gmaps)
+                        if decision.stop:
+                            logger.warning(f"Daily API budget spent, deferring {total_journeys - index} journeys")
+                            break
+                        self.process_single_journey(db, journey, snapshot, deferred_modes=decision.deferred_modes)
 
-                self.reporter.print_batch_summary(db, journeys)
+                if self.database_down:
+                    logger.warning(
+                        "Skipping the batch summary, heatmaps and forecasts while the database is unavailable"
+                    )
+                else:
+                    self.reporter.print_batch_summary(db, journeys)
+                    self.refresh_heatmaps(db, journeys)
+                    self.refresh_forecasts(db, journeys)
+                    self.publish_cache_watermark(db)
+                self.record_api_usage(db)
 
                 processing_time = (datetime.now() - start_time).total_seconds() * 1000
                 logger.info(f"Completed in {processing_time:.2f}ms")
@@ -126,4 +268,11 @@ class JourneyScheduler:
 
             except Exception as e:
                 logger.error(f"Error in process_all_journeys: {str(e)}")
+                db.rollback()
+                self.record_api_usage(db)  # The calls were made (and billed) even though the run failed
                 raise
+            finally:
+                self.spool.close()
+
+        if self.database_down:
+            self.replay_after_outage()
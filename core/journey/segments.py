@@ -0,0 +1,249 @@
+import base64
+import hashlib
+import logging
+import sys
+from array import array
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from database.models.journey_measurement import JourneyMeasurement
+from database.models.journey_measurement_segments import JourneyMeasurementSegments
+
+logger = logging.getLogger(__name__)
+
+POLYLINE_PRECISION = 1e5  # Google's encoded polylines carry E5 coordinates
+
+
+def decode_polyline(encoded: str) -> List[Tuple[int, int]]:
+    """Decode a Google encoded polyline to (lat, lng) pairs in integer E5 units, without float rounding."""
+    points: List[Tuple[int, int]] = []
+    index = lat = lng = 0
+    length = len(encoded)
+    while index < length:
+        deltas = []
+        for _ in range(2):
+            shift = result = 0
+            while True:
+                byte = ord(encoded[index]) - 63
+                index += 1
+                result |= (byte & 0x1F) << shift
+                shift += 5
+                if byte < 0x20:
+                    break
+            deltas.append(~(result >> 1) if result & 1 else result >> 1)
+        lat += deltas[0]
+        lng += deltas[1]
+        points.append((lat, lng))
+    return points
+
+
+def encode_polyline(points: List[Tuple[int, int]]) -> str:
+    """Encode E5 (lat, lng) pairs as a Google polyline, for clients that draw segments on a map."""
+    chunks: List[str] = []
+    previous_lat = previous_lng = 0
+    for lat, lng in points:
+        for delta in (lat - previous_lat, lng - previous_lng):
+            value = ~(delta << 1) if delta < 0 else delta << 1
+            while value >= 0x20:
+                chunks.append(chr((0x20 | (value & 0x1F)) + 63))
+                value >>= 5
+            chunks.append(chr(value + 63))
+        previous_lat, previous_lng = lat, lng
+    return "".join(chunks)
+
+
+def pack_array(values: array) -> bytes:
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def unpack_array(typecode: str, payload: bytes) -> array:
+    values = array(typecode)
+    values.frombytes(payload)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+def delta_encode(coordinates: array) -> array:
+    """Interleaved lat/lng → first point, then differences from the previous point (mostly small values)."""
+    deltas = array("i", coordinates)
+    for i in range(len(deltas) - 1, 1, -1):
+        deltas[i] -= deltas[i - 2]
+    return deltas
+
+
+def delta_decode(deltas: array) -> array:
+    coordinates = array("i", deltas)
+    for i in range(2, len(coordinates)):
+        coordinates[i] += coordinates[i - 2]
+    return coordinates
+
+
+@dataclass
+class RouteSegments:
+    """
+    Steps of a Directions route as parallel arrays: int32 seconds and meters per step, uint32 offsets
+    into the interleaved int32 E5 coordinates (`offsets[i]` to `offsets[i + 1]` are step i's points).
+    """
+
+    durations: array = field(default_factory=lambda: array("i"))
+    distances: array = field(default_factory=lambda: array("i"))
+    offsets: array = field(default_factory=lambda: array("I", [0]))
+    coordinates: array = field(default_factory=lambda: array("i"))
+
+    @classmethod
+    def from_legs(cls, legs: List[Dict[str, Any]]) -> "RouteSegments":
+        segments = cls()
+        for leg in legs:
+            for step in leg.get("steps", []):
+                points = decode_polyline(step.get("polyline", {}).get("points", ""))
+                segments.durations.append(int(step.get("duration", {}).get("value", 0)))
+                segments.distances.append(int(step.get("distance", {}).get("value", 0)))
+                for lat, lng in points:
+                    segments.coordinates.append(lat)
+                    segments.coordinates.append(lng)
+                segments.offsets.append(len(segments.coordinates) // 2)
+        return segments
+
+    @property
+    def count(self) -> int:
+        return len(self.durations)
+
+    def points(self, index: int) -> List[Tuple[int, int]]:
+        start, end = self.offsets[index], self.offsets[index + 1]
+        return [(self.coordinates[2 * i], self.coordinates[2 * i + 1]) for i in range(start, end)]
+
+    def speeds_kph(self) -> List[float]:
+        return [
+            (distance / 1000) / (duration / 3600) if duration > 0 else 0.0
+            for duration, distance in zip(self.durations, self.distances)
+        ]
+
+    def geometry_hash(self) -> str:
+        digest = hashlib.sha1(pack_array(self.offsets))
+        digest.update(pack_array(self.coordinates))
+        return digest.hexdigest()
+
+    def to_model(self, journey_id: int, transit_mode_id: int) -> JourneyMeasurementSegments:
+        return JourneyMeasurementSegments(
+            journey_id=journey_id,
+            transit_mode_id=transit_mode_id,
+            geometry_hash=self.geometry_hash(),
+            segment_count=self.count,
+            durations=pack_array(self.durations),
+            distances=pack_array(self.distances),
+            point_offsets=pack_array(self.offsets),
+            coordinates=pack_array(delta_encode(self.coordinates)),
+            created_at=datetime.now(timezone.utc),
+        )
+
+    def to_json(self) -> Dict[str, str]:
+        """The arrays as base64 of their packed (little-endian) bytes, coordinates delta-encoded as in to_model."""
+        return {
+            "durations": base64.b64encode(pack_array(self.durations)).decode("ascii"),
+            "distances": base64.b64encode(pack_array(self.distances)).decode("ascii"),
+            "offsets": base64.b64encode(pack_array(self.offsets)).decode("ascii"),
+            "coordinates": base64.b64encode(pack_array(delta_encode(self.coordinates))).decode("ascii"),
+        }
+
+    @classmethod
+    def from_json(cls, data: Dict[str, str]) -> "RouteSegments":
+        return cls(
+            durations=unpack_array("i", base64.b64decode(data["durations"])),
+            distances=unpack_array("i", base64.b64decode(data["distances"])),
+            offsets=unpack_array("I", base64.b64decode(data["offsets"])),
+            coordinates=delta_decode(unpack_array("i", base64.b64decode(data["coordinates"]))),
+        )
+
+    @classmethod
+    def from_model(cls, row: JourneyMeasurementSegments, with_coordinates: bool = True) -> "RouteSegments":
+        return cls(
+            durations=unpack_array("i", row.durations),
+            distances=unpack_array("i", row.distances),
+            offsets=unpack_array("I", row.point_offsets),
+            coordinates=delta_decode(unpack_array("i", row.coordinates)) if with_coordinates else array("i"),
+        )
+
+
+class SegmentProfiler:
+    """Per-step speeds across time slots for the route geometry a journey most often takes."""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def dominant_geometry(self, journey_id: int, transit_mode_id: int) -> Optional[str]:
+        hashes = Counter(
+            geometry_hash
+            for (geometry_hash,) in self.db.query(JourneyMeasurementSegments.geometry_hash).filter(
+                JourneyMeasurementSegments.journey_id == journey_id,
+                JourneyMeasurementSegments.transit_mode_id == transit_mode_id,
+            )
+        )
+        return hashes.most_common(1)[0][0] if hashes else None
+
+    def profile(self, journey_id: int, transit_mode_id: int) -> Optional[Dict[str, Any]]:
+        geometry_hash = self.dominant_geometry(journey_id, transit_mode_id)
+        if geometry_hash is None:
+            return None
+
+        query = (
+            self.db.query(
+                JourneyMeasurement.time_slot_id,
+                JourneyMeasurementSegments.durations,
+                JourneyMeasurementSegments.distances,
+            )
+            .join(JourneyMeasurement, JourneyMeasurement.id == JourneyMeasurementSegments.journey_measurement_id)
+            .filter(
+                JourneyMeasurementSegments.journey_id == journey_id,
+                JourneyMeasurementSegments.transit_mode_id == transit_mode_id,
+                JourneyMeasurementSegments.geometry_hash == geometry_hash,
+            )
+        )
+
+        # time slot -> running totals per step; speeds are computed from summed distance and duration
+        totals: Dict[int, Tuple[array, array, int]] = {}
+        for time_slot_id, durations_blob, distances_blob in query.execution_options(yield_per=1000):
+            durations = unpack_array("i", durations_blob)
+            distances = unpack_array("i", distances_blob)
+            if time_slot_id not in totals:
+                totals[time_slot_id] = (array("q", [0] * len(durations)), array("q", [0] * len(distances)), 0)
+            slot_durations, slot_distances, samples = totals[time_slot_id]
+            for i, (duration, distance) in enumerate(zip(durations, distances)):
+                slot_durations[i] += duration
+                slot_distances[i] += distance
+            totals[time_slot_id] = (slot_durations, slot_distances, samples + 1)
+
+        reference = (
+            self.db.query(JourneyMeasurementSegments)
+            .filter_by(journey_id=journey_id, transit_mode_id=transit_mode_id, geometry_hash=geometry_hash)
+            .order_by(JourneyMeasurementSegments.journey_measurement_id.desc())
+            .first()
+        )
+        segments = RouteSegments.from_model(reference)
+        return {
+            "journey_id": journey_id,
+            "transit_mode_id": transit_mode_id,
+            "geometry_hash": geometry_hash,
+            "segments": [
+                {"index": i, "distance_meters": segments.distances[i], "polyline": encode_polyline(segments.points(i))}
+                for i in range(segments.count)
+            ],
+            "slots": [
+                {
+                    "time_slot_id": time_slot_id,
+                    "samples": samples,
+                    "speed_kph": [
+                        round((distance / 1000) / (duration / 3600), 2) if duration > 0 else None
+                        for duration, distance in zip(slot_durations, slot_distances)
+                    ],
+                }
+                for time_slot_id, (slot_durations, slot_distances, samples) in sorted(totals.items())
+            ],
+        }
@@ -0,0 +1,315 @@
+import json
+import logging
+import os
+import threading
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import IO, Any, Collection, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy.exc import InterfaceError, OperationalError
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from core.journey.anomaly import AnomalyDetector
+from core.journey.segments import RouteSegments
+from database.models.journey import Journey
+from database.models.journey_measurement import JourneyMeasurement
+from database.models.time_slot import TimeSlot
+from database.models.transit_mode import TransitMode
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows; segments are then not locked against a concurrent replay
+    fcntl = None  # type: ignore[assignment]
+
+logger = logging.getLogger(__name__)
+
+SPOOL_VERSION = 1
+SEGMENT_SUFFIX = ".ndjson"
+
+# Errors that mean the database is down or too slow, rather than that the measurement itself is bad
+DATABASE_UNAVAILABLE_ERRORS = (OperationalError, InterfaceError, PoolTimeoutError)
+
+
+def measurement_record(journey_id: int, local_timestamp: datetime, metrics: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    A JSON-ready spool record of one journey's calculator result: every mode that succeeded, with its
+    raw_response and route segments, and the local time the measurements are stamped with.
+    """
+    modes = {}
+    for mode, mode_data in metrics.get("modes", {}).items():
+        if "error" in mode_data:
+            continue
+        segments = mode_data.get("segments")
+        modes[mode] = {
+            "raw_response": {key: value for key, value in mode_data.items() if key != "segments"},
+            "segments": segments.to_json() if segments is not None and segments.count else None,
+        }
+    return {
+        "type": "measurement",
+        "v": SPOOL_VERSION,
+        "id": uuid.uuid4().hex,
+        "journey_id": journey_id,
+        "local_timestamp": local_timestamp.isoformat(),
+        "spooled_at": datetime.now(timezone.utc).isoformat(),
+        "modes": modes,
+    }
+
+
+def record_timestamp(record: Dict[str, Any]) -> datetime:
+    """UTC timestamp the record's measurements get (local_timestamp is stored with its offset)."""
+    return datetime.fromisoformat(record["local_timestamp"]).astimezone(timezone.utc)
+
+
+def build_measurements(
+    db: Session, journey: Journey, record: Dict[str, Any], skip_modes: Collection[str] = ()
+) -> List[JourneyMeasurement]:
+    """JourneyMeasurement rows (with segments) for a spool record; the scheduler and the replayer share this."""
+    local_timestamp = datetime.fromisoformat(record["local_timestamp"])
+    time_slot_id = TimeSlot.get_id(db, local_timestamp)
+    measurements = []
+    for mode, entry in record["modes"].items():
+        if mode in skip_modes:
+            continue
+        raw_response = entry["raw_response"]
+        transit_mode_id = TransitMode.get_id(db, mode)
+        measurement = JourneyMeasurement(
+            journey_id=journey.id,
+            transit_mode_id=transit_mode_id,
+            mode=mode,
+            local_timestamp=local_timestamp,
+            day_of_week_id=local_timestamp.isoweekday(),
+            time_slot_id=time_slot_id,
+            duration_seconds=raw_response["metrics"]["duration_seconds"],
+            distance_meters=raw_response["metrics"]["distance_meters"],
+            speed_kph=raw_response["metrics"]["speed_kph"],
+            raw_response=raw_response,
+            journey=journey,  # Pass the journey object for timezone access
+        )
+        if entry.get("segments"):
+            measurement.segments = RouteSegments.from_json(entry["segments"]).to_model(journey.id, transit_mode_id)
+        measurements.append(measurement)
+    return measurements
+
+
+def lock_segment(handle: IO[Any], blocking: bool = True) -> bool:
+    if fcntl is None:
+        return True
+    try:
+        fcntl.flock(handle.fileno(), fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+    except BlockingIOError:
+        return False
+    return True
+
+
+class MeasurementSpool:
+    """
+    Append-only NDJSON write-ahead log of the scheduler's measurements.
+
+    Each run writes one segment, `<SPOOL_DATA_DIR>/measurements_<utc time>_<pid>.ndjson`, opened on the
+    first append and locked while open. A journey's record is appended (and fsynced, with SPOOL_FSYNC) before
+    its measurements are inserted, and an `ack` line follows once they are committed. On close, a segment
+    whose records were all acknowledged is deleted; anything else is left for SpoolReplayer, so results
+    already paid for survive a database outage or a crash.
+    """
+
+    def __init__(self, directory: Optional[Path] = None, enabled: Optional[bool] = None, fsync: Optional[bool] = None):
+        self.directory = Path(directory or settings.SPOOL_DATA_DIR)
+        self.enabled = enabled if enabled is not None else settings.SPOOL_ENABLED
+        self.fsync = fsync if fsync is not None else settings.SPOOL_FSYNC
+        self.path: Optional[Path] = None
+        self.pending: Set[str] = set()
+        self._file: Optional[IO[str]] = None
+        self._lock = threading.Lock()
+
+    def _open(self) -> IO[str]:
+        if self._file is None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+            self.path = self.directory / f"measurements_{stamp}_{os.getpid()}{SEGMENT_SUFFIX}"
+            self._file = open(self.path, "a", encoding="utf-8")
+            lock_segment(self._file)
+        return self._file
+
+    def _write(self, entry: Dict[str, Any], sync: bool) -> None:
+        handle = self._open()
+        handle.write(json.dumps(entry, separators=(",", ":")) + "\n")
+        handle.flush()
+        if sync:
+            os.fsync(handle.fileno())
+
+    def append(self, record: Dict[str, Any]) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._write(record, sync=self.fsync)
+            self.pending.add(record["id"])
+
+    def acknowledge(self, record_id: str) -> None:
+        """Mark a record as committed. Not fsynced: a lost ack only costs a duplicate check on replay."""
+        if not self.enabled or record_id not in self.pending:
+            return
+        with self._lock:
+            self._write({"type": "ack", "id": record_id}, sync=False)
+            self.pending.discard(record_id)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.close()
+            self._file = None
+            if self.pending:
+                logger.warning(
+                    f"{len(self.pending)} spooled journey results not in the database yet, kept in {self.path}"
+                )
+            elif self.path is not None:
+                self.path.unlink(missing_ok=True)
+            self.path = None
+            self.pending = set()
+
+
+def read_segment(path: Path) -> Tuple[List[Dict[str, Any]], int]:
+    """Unacknowledged records of a segment and the number of unreadable lines (e.g. a write cut off by a crash)."""
+    records: Dict[str, Dict[str, Any]] = {}
+    acked: Set[str] = set()
+    corrupt = 0
+    with open(path, encoding="utf-8") as handle:
+        for line in handle:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                corrupt += 1
+                continue
+            if entry.get("type") == "ack":
+                acked.add(entry["id"])
+            elif entry.get("type") == "measurement":
+                records[entry["id"]] = entry
+    return [record for record_id, record in records.items() if record_id not in acked], corrupt
+
+
+@dataclass
+class ReplayStats:
+    segments: int = 0
+    records: int = 0
+    inserted: int = 0
+    duplicates: int = 0
+    anomalies: int = 0
+    skipped: int = 0  # Records of journeys that no longer exist, or that can't be rebuilt
+    busy_segments: int = 0  # Locked by a scheduler that is still writing them
+
+
+class SpoolReplayer:
+    """
+    Bulk-load spooled measurements that never made it into the database.
+
+    Segments are replayed oldest first, each in one transaction, and deleted once committed. Measurements
+    already present (same journey, mode and timestamp, e.g. when only the ack was lost) are skipped, so a
+    replay can safely be repeated. Inserted measurements go through the anomaly detector like the scheduler's,
+    so baselines include them and late slowdowns are still recorded.
+    """
+
+    def __init__(self, db: Session, directory: Optional[Path] = None, detector: Optional[AnomalyDetector] = None):
+        self.db = db
+        self.directory = Path(directory or settings.SPOOL_DATA_DIR)
+        self.detector = detector or AnomalyDetector()
+
+    def segments(self) -> List[Path]:
+        if not self.directory.exists():
+            return []
+        return sorted(self.directory.glob(f"*{SEGMENT_SUFFIX}"))
+
+    def existing_keys(self, records: List[Dict[str, Any]]) -> Set[Tuple[int, int, datetime]]:
+        """(journey, transit mode, UTC timestamp) of the records' measurements already in the database."""
+        if not records:
+            return set()
+        rows = (
+            self.db.query(
+                JourneyMeasurement.journey_id, JourneyMeasurement.transit_mode_id, JourneyMeasurement.timestamp
+            )
+            .filter(
+                JourneyMeasurement.journey_id.in_({record["journey_id"] for record in records}),
+                JourneyMeasurement.timestamp.in_({record_timestamp(record) for record in records}),
+            )
+            .all()
+        )
+        return {(journey_id, mode_id, JourneyMeasurement.ensure_utc(ts)) for journey_id, mode_id, ts in rows}
+
+    def replay_segment(self, path: Path, stats: ReplayStats) -> None:
+        with open(path, encoding="utf-8") as handle:
+            if not lock_segment(handle, blocking=False):
+                stats.busy_segments += 1
+                return
+            records, corrupt = read_segment(path)
+            if corrupt:
+                logger.warning(f"Skipped {corrupt} unreadable lines in {path.name}")
+
+            journey_ids = {record["journey_id"] for record in records}
+            journeys = {}
+            if journey_ids:
+                journeys = {j.id: j for j in self.db.query(Journey).filter(Journey.id.in_(journey_ids))}
+            existing = self.existing_keys(records)
+            inserted = duplicates = anomalies = 0
+            for record in records:
+                journey = journeys.get(record["journey_id"])
+                if journey is None:
+                    stats.skipped += 1
+                    continue
+                timestamp = record_timestamp(record)
+                present = {
+                    mode
+                    for mode in record["modes"]
+                    if (journey.id, TransitMode.get_id(self.db, mode), timestamp) in existing
+                }
+                try:
+                    measurements = build_measurements(self.db, journey, record, skip_modes=present)
+                except DATABASE_UNAVAILABLE_ERRORS:
+                    raise
+                except Exception as e:
+                    logger.warning(f"Could not rebuild spooled measurements for journey '{journey.name}': {str(e)}")
+                    stats.skipped += 1
+                    continue
+                for measurement in measurements:
+                    self.db.add(measurement)
+                    anomalies += self.observe(measurement)
+                inserted += len(measurements)
+                duplicates += len(present)
+            self.detector.flush(self.db)
+            self.db.commit()
+
+        path.unlink(missing_ok=True)
+        stats.segments += 1
+        stats.records += len(records)
+        stats.inserted += inserted
+        stats.duplicates += duplicates
+        stats.anomalies += anomalies
+
+    def observe(self, measurement: JourneyMeasurement) -> int:
+        """Score a replayed measurement; as in the scheduler, detection problems never block inserting it."""
+        try:
+            return int(self.detector.observe(self.db, measurement) is not None)
+        except DATABASE_UNAVAILABLE_ERRORS:
+            raise
+        except Exception as e:
+            logger.warning(f"Could not score replayed measurement for anomalies: {str(e)}")
+            return 0
+
+    def replay(self) -> ReplayStats:
+        stats = ReplayStats()
+        for path in self.segments():
+            try:
+                self.replay_segment(path, stats)
+            except Exception:
+                self.db.rollback()
+                self.detector.reset()
+                raise
+        if stats.segments:
+            logger.info(
+                f"Replayed {stats.records} spooled journey results from {stats.segments} segments: "
+                f"{stats.inserted} measurements inserted ({stats.anomalies} anomalies), "
+                f"{stats.duplicates} already present, {stats.skipped} skipped"
+            )
+        return stats
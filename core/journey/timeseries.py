@@ -0,0 +1,224 @@
+import logging
+import os
+import threading
+import time
+from array import array
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from core.cache.response_cache import latest_revision_id
+from core.config import settings
+from database.models.journey_measurement import JourneyMeasurement
+
+logger = logging.getLogger(__name__)
+
+# (epoch seconds, duration_seconds, distance_meters, speed_kph)
+Sample = Tuple[float, int, float, float]
+
+SLOT_INTERVAL = timedelta(minutes=15)  # The scheduler adds one sample per series per time slot
+
+
+class RingBuffer:
+    """
+    Fixed-capacity series of samples in preallocated typed arrays (28 bytes per sample).
+
+    Samples are kept in timestamp order, so window lookups binary-search the timestamps instead of scanning.
+    New slots arrive in order and are appended; a measurement replayed from the spool after an outage can be
+    older than samples already held and is inserted in place.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.timestamps = array("d", [0.0] * capacity)
+        self.durations = array("i", [0] * capacity)
+        self.distances = array("d", [0.0] * capacity)
+        self.speeds = array("d", [0.0] * capacity)
+        self.start = 0
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    @property
+    def nbytes(self) -> int:
+        return sum(a.itemsize * len(a) for a in (self.timestamps, self.durations, self.distances, self.speeds))
+
+    def physical(self, index: int) -> int:
+        return (self.start + index) % self.capacity
+
+    def append(self, timestamp: float, duration: int, distance: float, speed: float) -> None:
+        if self.size < self.capacity:
+            slot = self.physical(self.size)
+            self.size += 1
+        else:
+            # Full: overwrite the oldest sample
+            slot = self.start
+            self.start = (self.start + 1) % self.capacity
+        self.timestamps[slot] = timestamp
+        self.durations[slot] = duration
+        self.distances[slot] = distance
+        self.speeds[slot] = speed
+
+    def copy(self, source: int, target: int) -> None:
+        for values in (self.timestamps, self.durations, self.distances, self.speeds):
+            values[target] = values[source]
+
+    def insert(self, timestamp: float, duration: int, distance: float, speed: float) -> None:
+        """Add a sample at its timestamp's position. When full, the oldest sample (possibly this one) is dropped."""
+        if self.size == 0 or timestamp >= self.timestamps[self.physical(self.size - 1)]:
+            self.append(timestamp, duration, distance, speed)
+            return
+        index = self.bisect(timestamp, after=True)
+        if self.size == self.capacity:
+            if index == 0:
+                return  # Older than everything held
+            # Drop the oldest sample and shift the ones before the insertion point back by one
+            for position in range(1, index):
+                self.copy(self.physical(position), self.physical(position - 1))
+            index -= 1
+        else:
+            # Shift the samples from the insertion point on forward by one
+            for position in range(self.size, index, -1):
+                self.copy(self.physical(position - 1), self.physical(position))
+            self.size += 1
+        slot = self.physical(index)
+        self.timestamps[slot] = timestamp
+        self.durations[slot] = duration
+        self.distances[slot] = distance
+        self.speeds[slot] = speed
+
+    def bisect(self, timestamp: float, after: bool = False) -> int:
+        """Logical index of the first sample at or after `timestamp` (strictly after it, with `after`)."""
+        lo, hi = 0, self.size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            value = self.timestamps[self.physical(mid)]
+            if value < timestamp or (after and value == timestamp):
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def window(self, since: float, until: Optional[float] = None) -> Iterator[Sample]:
+        for index in range(self.bisect(since), self.size):
+            slot = self.physical(index)
+            timestamp = self.timestamps[slot]
+            if until is not None and timestamp > until:
+                break
+            yield timestamp, self.durations[slot], self.distances[slot], self.speeds[slot]
+
+
+class TimeSeriesStore:
+    """
+    Recent measurements per (journey, calculator mode) held in ring buffers, for dashboard windows served from memory.
+
+    The store is warmed with the last `retention` of measurements and then catches up by measurement id,
+    so new scheduler slots are appended with a single indexed query no matter which process committed them.
+    A new measurement revision (a backfill rewrote stored values) warms it again.
+    """
+
+    def __init__(self, capacity: Optional[int] = None, retention: Optional[timedelta] = None):
+        self.capacity = capacity or settings.TIMESERIES_CAPACITY
+        self.retention = retention or timedelta(hours=settings.TIMESERIES_RETENTION_HOURS)
+        self.buffers: Dict[Tuple[int, str], RingBuffer] = {}
+        self.watermark = 0  # Newest measurement id loaded
+        self.checked_watermark = 0  # Newest data watermark (see core.cache.response_cache) caught up to
+        self.revision = 0
+        self.warmed = False
+        self._lock = threading.RLock()
+
+    def append(self, journey_id: int, mode: str, sample: Sample) -> None:
+        key = (journey_id, mode)
+        buffer = self.buffers.get(key)
+        if buffer is None:
+            buffer = self.buffers[key] = RingBuffer(self.capacity)
+        buffer.insert(*sample)
+
+    def load(self, db: Session, after_id: int = 0, since: Optional[datetime] = None) -> int:
+        query = db.query(
+            JourneyMeasurement.id,
+            JourneyMeasurement.journey_id,
+            JourneyMeasurement.mode,
+            JourneyMeasurement.timestamp,
+            JourneyMeasurement.duration_seconds,
+            JourneyMeasurement.distance_meters,
+            JourneyMeasurement.speed_kph,
+        ).filter(JourneyMeasurement.id > after_id)
+        if since is not None:
+            query = query.filter(JourneyMeasurement.timestamp >= since)
+
+        loaded = 0
+        with self._lock:
+            rows = query.order_by(JourneyMeasurement.timestamp, JourneyMeasurement.id)
+            for row in rows.execution_options(yield_per=5000):
+                timestamp = JourneyMeasurement.ensure_utc(row.timestamp).timestamp()
+                sample = (timestamp, int(row.duration_seconds), float(row.distance_meters), float(row.speed_kph))
+                self.append(row.journey_id, row.mode, sample)
+                self.watermark = max(self.watermark, int(row.id))
+                loaded += 1
+        return loaded
+
+    def warm(self, db: Session) -> int:
+        started = time.perf_counter()
+        with self._lock:
+            self.buffers.clear()
+            self.watermark = 0
+            self.revision = latest_revision_id(db)
+            loaded = self.load(db, since=datetime.now(timezone.utc) - self.retention)
+            self.warmed = True
+        logger.info(
+            f"Warmed time series store with {loaded} measurements across {len(self.buffers)} series "
+            f"({self.nbytes / 1024:.0f} KB) in {(time.perf_counter() - started) * 1000:.0f}ms"
+        )
+        return loaded
+
+    def catch_up(self, db: Session, watermark: Optional[int] = None) -> int:
+        """Append measurements committed since the last load. Skips the queries when `watermark` hasn't moved."""
+        if watermark is not None and self.warmed and watermark <= self.checked_watermark:
+            return 0
+        if not self.warmed or latest_revision_id(db) != self.revision:
+            loaded = self.warm(db)
+        else:
+            loaded = self.load(db, after_id=self.watermark)
+        if watermark is not None:
+            self.checked_watermark = max(self.checked_watermark, watermark)
+        return loaded
+
+    def recent(
+        self,
+        journey_id: int,
+        mode: str,
+        window: timedelta,
+        now: Optional[datetime] = None,
+    ) -> List[Sample]:
+        since = (now or datetime.now(timezone.utc)) - window
+        with self._lock:
+            buffer = self.buffers.get((journey_id, mode))
+            return list(buffer.window(since.timestamp())) if buffer is not None else []
+
+    @property
+    def span(self) -> timedelta:
+        """Longest window every series holds: the retention, or fewer hours when capacity runs out first."""
+        return min(self.retention, SLOT_INTERVAL * self.capacity)
+
+    def covers(self, window: timedelta) -> bool:
+        return window <= self.span
+
+    @property
+    def nbytes(self) -> int:
+        return sum(buffer.nbytes for buffer in self.buffers.values())
+
+
+_store: Optional[TimeSeriesStore] = None
+_store_pid: Optional[int] = None
+
+
+def get_timeseries_store() -> TimeSeriesStore:
+    """Return this process's store; forked workers each build their own on first use."""
+    global _store, _store_pid
+    if _store is None or _store_pid != os.getpid():
+        _store = TimeSeriesStore()
+        _store_pid = os.getpid()
+    return _store
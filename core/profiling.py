@@ -0,0 +1,262 @@
+"""
+Opt-in sampling profiler for the CLI entry points (`--profile`).
+
+A daemon thread snapshots the stack of every other thread with `sys._current_frames()` every
+PROFILE_INTERVAL_MS and counts identical stacks, so the profiled code runs untouched and the cost is one
+stack walk per thread per sample. Samples are wall-clock: a worker blocked on a Google Maps response shows
+up under the socket read it is waiting in, which is exactly the time we want to see. Each run writes
+
+    <PROFILE_DATA_DIR>/<name>_<timestamp>.collapsed   one `frame;frame;frame count` line per stack
+    <PROFILE_DATA_DIR>/<name>_<timestamp>.svg         a flamegraph of the same stacks
+
+The collapsed file is the format of Brendan Gregg's flamegraph.pl and speedscope, for other viewers, and
+keeps every sample; the SVG and the hot function summary leave out threads parked waiting for work (idle
+pool workers, the log listener). Worker threads of a pool are merged under one root (e.g.
+`ThreadPoolExecutor-0`).
+"""
+
+import html
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from types import CodeType, FrameType
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+MAX_DEPTH = 200
+# Leaf frames (function, module) of threads parked with nothing to do, left out of the flamegraph and hot
+# function summary. Pool workers and the log listener block in C, so their own loop is the leaf frame.
+IDLE_FRAMES = {
+    ("wait", "threading.py"),
+    ("_wait_for_tstate_lock", "threading.py"),
+    ("get", "queue.py"),
+    ("select", "selectors.py"),
+    ("_worker", "futures/thread.py"),
+    ("dequeue", "logging/handlers.py"),
+}
+
+Stack = Tuple[str, ...]
+
+
+def frame_label(code: CodeType) -> str:
+    """`function (path:line)`, with paths relative to the project or to site-packages."""
+    filename = code.co_filename
+    base = str(settings.BASE_DIR) + os.sep
+    if filename.startswith(base):
+        filename = filename[len(base) :]
+    else:
+        marker = filename.rfind("-packages" + os.sep)
+        if marker != -1:
+            filename = filename[marker + len("-packages" + os.sep) :]
+        elif os.sep in filename:
+            filename = os.path.join(*Path(filename).parts[-2:])
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})".replace(";", ":")
+
+
+def thread_label(thread: Optional[threading.Thread], ident: int) -> str:
+    if thread is None:
+        return f"thread-{ident}"
+    return re.sub(r"_\d+$", "", thread.name)  # ThreadPoolExecutor-0_3 -> ThreadPoolExecutor-0
+
+
+class SamplingProfiler:
+    """Count the stacks of all threads every `interval` seconds, from a background thread."""
+
+    def __init__(self, interval: Optional[float] = None):
+        self.interval = interval if interval is not None else settings.PROFILE_INTERVAL_MS / 1000
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.sampling_seconds = 0.0  # Time spent taking samples, to report the profiler's own overhead
+        self.started_at = 0.0
+        self.stopped_at = 0.0
+        self._labels: Dict[CodeType, str] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "SamplingProfiler":
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.stopped_at = time.perf_counter()
+
+    def _run(self) -> None:
+        own_ident = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            started = time.perf_counter()
+            threads = {thread.ident: thread for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident != own_ident:
+                    self.stacks[self._stack(thread_label(threads.get(ident), ident), frame)] += 1
+            self.samples += 1
+            self.sampling_seconds += time.perf_counter() - started
+
+    def _stack(self, root: str, frame: Optional[FrameType]) -> Stack:
+        labels = []
+        while frame is not None and len(labels) < MAX_DEPTH:
+            code = frame.f_code
+            label = self._labels.get(code)
+            if label is None:
+                label = self._labels[code] = frame_label(code)
+            labels.append(label)
+            frame = frame.f_back
+        labels.append(root)
+        return tuple(reversed(labels))
+
+    @property
+    def wall_seconds(self) -> float:
+        return (self.stopped_at or time.perf_counter()) - self.started_at
+
+    @property
+    def overhead(self) -> float:
+        """Share of the run the sampler thread spent walking stacks."""
+        return self.sampling_seconds / self.wall_seconds if self.wall_seconds else 0.0
+
+    def collapsed(self) -> str:
+        return "".join(f"{';'.join(stack)} {count}\n" for stack, count in sorted(self.stacks.items()))
+
+    def busy_stacks(self) -> Counter:
+        return Counter({stack: count for stack, count in self.stacks.items() if not is_idle(stack[-1])})
+
+    def hot_functions(self, limit: int = 15) -> List[Tuple[str, int, int]]:
+        """(function, self samples, total samples) of busy stacks, by self samples."""
+        own: Counter = Counter()
+        total: Counter = Counter()
+        for stack, count in self.busy_stacks().items():
+            own[stack[-1]] += count
+            for label in set(stack[1:]):
+                total[label] += count
+        return [(label, count, total[label]) for label, count in own.most_common(limit)]
+
+
+def is_idle(label: str) -> bool:
+    name, _, location = label.partition(" (")
+    path = location.split(":")[0]
+    return any(name == function and path.endswith(module) for function, module in IDLE_FRAMES)
+
+
+# ---------------------------------------------------------------------------
+# Flamegraph rendering
+# ---------------------------------------------------------------------------
+
+SVG_WIDTH = 1200
+FRAME_HEIGHT = 16
+FONT_SIZE = 12
+CHAR_WIDTH = 7  # Approximate width of a character at FONT_SIZE, to decide what fits in a box
+MIN_WIDTH = 0.5  # Boxes narrower than this many pixels are dropped
+
+
+PROJECT_PACKAGES = ("app/", "core/", "database/", "scripts/")
+
+
+def frame_color(label: str) -> str:
+    """Warm colours, stable per function; project code is redder than the standard library and dependencies."""
+    name, _, location = label.partition(" (")
+    seed = sum(ord(c) * (i + 1) for i, c in enumerate(name)) % 55
+    if location.startswith(PROJECT_PACKAGES):
+        return f"rgb(225,{60 + seed},{30 + seed // 3})"
+    return f"rgb(230,{150 + seed},{40 + seed // 2})"
+
+
+def render_flamegraph(stacks: Counter, title: str) -> str:
+    """A self-contained SVG flamegraph (root at the bottom) with a tooltip per frame."""
+    total = sum(stacks.values())
+    tree: Dict = {}
+    for stack, count in stacks.items():
+        node = tree
+        for label in stack:
+            child = node.setdefault(label, [0, {}])
+            child[0] += count
+            node = child[1]
+    depth = max((len(stack) for stack in stacks), default=0)
+    height = (depth + 3) * FRAME_HEIGHT
+    scale = (SVG_WIDTH - 20) / total if total else 0.0
+
+    boxes: List[str] = []
+
+    def draw(node: Dict, x: float, level: int) -> None:
+        for label, (count, children) in sorted(node.items()):
+            width = count * scale
+            if width >= MIN_WIDTH:
+                y = height - (level + 2) * FRAME_HEIGHT
+                text = html.escape(label)
+                tooltip = f"{text} ({count} samples, {count / total:.2%})"
+                chars = int(width / CHAR_WIDTH) - 1
+                caption = html.escape(label if len(label) <= chars else label[: chars - 2] + "..") if chars > 2 else ""
+                boxes.append(
+                    f'<g><title>{tooltip}</title><rect x="{x:.1f}" y="{y}" width="{width:.1f}" '
+                    f'height="{FRAME_HEIGHT - 1}" fill="{frame_color(label)}" rx="2"/>'
+                    f'<text x="{x + 3:.1f}" y="{y + FRAME_HEIGHT - 4}">{caption}</text></g>'
+                )
+                draw(children, x, level + 1)
+            x += width
+
+    draw(tree, 10.0, 0)
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{SVG_WIDTH}" height="{height}" '
+        f'viewBox="0 0 {SVG_WIDTH} {height}" font-family="Verdana, sans-serif" font-size="{FONT_SIZE}">\n'
+        f'<rect width="100%" height="100%" fill="#f8f8f0"/>\n'
+        f'<text x="{SVG_WIDTH / 2}" y="{FRAME_HEIGHT + 2}" text-anchor="middle" font-size="{FONT_SIZE + 4}">'
+        f"{html.escape(title)}</text>\n" + "\n".join(boxes) + "\n</svg>\n"
+    )
+
+
+@contextmanager
+def profile_run(name: str, enabled: bool = True, top: int = 15) -> Iterator[Optional[SamplingProfiler]]:
+    """
+    Sample everything that runs inside the block and write `<name>_<timestamp>.collapsed` and `.svg` to
+    PROFILE_DATA_DIR, logging the hottest functions. Output is written even when the block raises or exits.
+    """
+    if not enabled:
+        yield None
+        return
+
+    profiler = SamplingProfiler().start()
+    logger.info(f"Sampling profiler started ({profiler.interval * 1000:.0f} ms interval)")
+    try:
+        yield profiler
+    finally:
+        profiler.stop()
+        write_profile(profiler, name, top)
+
+
+def write_profile(profiler: SamplingProfiler, name: str, top: int = 15) -> Optional[Path]:
+    if not profiler.stacks:
+        logger.warning("Profiler collected no samples")
+        return None
+
+    directory = Path(settings.PROFILE_DATA_DIR)
+    stem = f"{name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    title = f"{name}: {profiler.samples} samples over {profiler.wall_seconds:.1f}s"
+    try:
+        directory.mkdir(parents=True, exist_ok=True)
+        (directory / f"{stem}.collapsed").write_text(profiler.collapsed())
+        (directory / f"{stem}.svg").write_text(render_flamegraph(profiler.busy_stacks(), title))
+    except OSError as e:
+        logger.warning(f"Could not write profile: {str(e)}")
+        return None
+
+    lines = [f"{'self':>6} {'total':>6}  function"]
+    busy = sum(profiler.busy_stacks().values()) or 1
+    for label, own, total in profiler.hot_functions(top):
+        lines.append(f"{own / busy:>6.1%} {total / busy:>6.1%}  {label}")
+    logger.info(
+        f"Profile written to {directory / stem}.{{collapsed,svg}} ({title}, sampler overhead "
+        f"{profiler.overhead:.1%}). Hot functions by share of busy samples:\n" + "\n".join(lines)
+    )
+    return directory / f"{stem}.svg"
@@ -47,7 +47,7 @@ def run_migrations_offline():
 
 def run_migrations_online():
     """Run migrations in 'online' mode."""
-    connectable = get_engine(DATABASE_URL)
+    connectable = get_engine(DATABASE_URL, pooled=False)
 
     with connectable.connect() as connection:
         context.configure(
@@ -0,0 +1,37 @@
+"""Add api_usage for Google Maps call counts and spend
+
+Revision ID: 0d7e5a93c6f1
+Revises: 8c41d27e9b53
+Create Date: 2026-10-19 20:14:55.902137
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0d7e5a93c6f1"
+down_revision = "8c41d27e9b53"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Create api_usage"""
+    op.create_table(
+        "api_usage",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("run_started_at", sa.TIMESTAMP(timezone=True), nullable=False),
+        sa.Column("day", sa.Date, nullable=False),
+        sa.Column("source", sa.String(32), nullable=False),
+        sa.Column("endpoint", sa.String(50), nullable=False),
+        sa.Column("mode", sa.String(50), nullable=False, server_default=""),
+        sa.Column("calls", sa.Integer, nullable=False),
+        sa.Column("cost_usd", sa.Float, nullable=False),
+    )
+    op.create_index("ix_api_usage_day", "api_usage", ["day"])
+
+
+def downgrade() -> None:
+    """Drop api_usage"""
+    op.drop_index("ix_api_usage_day", table_name="api_usage")
+    op.drop_table("api_usage")
@@ -0,0 +1,35 @@
+"""Add journey_heatmaps for precomputed day-of-week x time-slot matrices
+
+Revision ID: 1706f5a0859a
+Revises: badcf20e9224
+Create Date: 2026-10-19 11:26:03.744512
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "1706f5a0859a"
+down_revision = "badcf20e9224"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Create journey_heatmaps"""
+    op.create_table(
+        "journey_heatmaps",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("journey_id", sa.Integer, sa.ForeignKey("journeys.id"), nullable=False),
+        sa.Column("transit_mode_id", sa.Integer, sa.ForeignKey("transit_modes.id"), nullable=False),
+        sa.Column("metric", sa.String(32), nullable=False),
+        sa.Column("watermark", sa.Integer, nullable=False, server_default="0"),
+        sa.Column("payload", sa.LargeBinary, nullable=False),
+        sa.Column("updated_at", sa.TIMESTAMP(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.UniqueConstraint("journey_id", "transit_mode_id", "metric", name="uq_journey_heatmap"),
+    )
+
+
+def downgrade() -> None:
+    """Drop journey_heatmaps"""
+    op.drop_table("journey_heatmaps")
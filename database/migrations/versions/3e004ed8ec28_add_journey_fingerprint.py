@@ -0,0 +1,25 @@
+"""Add journeys.fingerprint for incremental journeys setup
+
+Revision ID: 3e004ed8ec28
+Revises: ca8dfb7307a2
+Create Date: 2026-10-19 14:58:30.216475
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "3e004ed8ec28"
+down_revision = "ca8dfb7307a2"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Add the route fingerprint column (NULL means the journey is re-processed once)"""
+    op.add_column("journeys", sa.Column("fingerprint", sa.String(64), nullable=True))
+
+
+def downgrade() -> None:
+    """Drop the route fingerprint column"""
+    op.drop_column("journeys", "fingerprint")
@@ -0,0 +1,49 @@
+"""Record the calculator mode key on measurements and key heatmaps by it
+
+Revision ID: 4b8e2f61d0a7
+Revises: 0d7e5a93c6f1
+Create Date: 2026-10-20 09:12:44.103582
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "4b8e2f61d0a7"
+down_revision = "0d7e5a93c6f1"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Add journey_measurements.mode, backfilled from the transit mode and the number of legs"""
+    op.add_column("journey_measurements", sa.Column("mode", sa.String(50), nullable=True))
+    op.execute(
+        "UPDATE journey_measurements m SET mode = t.mode FROM transit_modes t WHERE t.id = m.transit_mode_id"
+    )
+    # driving_routed is stored under the driving transit mode. It is the only driving request made with
+    # waypoints, and Directions returns one leg per waypoint stop, so routed results have more than one leg.
+    op.execute(
+        """
+        UPDATE journey_measurements SET mode = 'driving_routed'
+        WHERE mode = 'driving'
+          AND CASE WHEN jsonb_typeof(raw_response -> 'leg_details') = 'array'
+                   THEN jsonb_array_length(raw_response -> 'leg_details') ELSE 0 END > 1
+        """
+    )
+    op.alter_column("journey_measurements", "mode", nullable=False)
+
+    # Existing heatmaps pool driving and driving_routed; they are rebuilt from the measurements on the next run
+    op.execute("DELETE FROM journey_heatmaps")
+    op.add_column("journey_heatmaps", sa.Column("mode", sa.String(50), nullable=False))
+    op.drop_constraint("uq_journey_heatmap", "journey_heatmaps", type_="unique")
+    op.create_unique_constraint("uq_journey_heatmap", "journey_heatmaps", ["journey_id", "mode", "metric"])
+
+
+def downgrade() -> None:
+    """Key heatmaps by transit mode again and drop journey_measurements.mode"""
+    op.execute("DELETE FROM journey_heatmaps")
+    op.drop_constraint("uq_journey_heatmap", "journey_heatmaps", type_="unique")
+    op.create_unique_constraint("uq_journey_heatmap", "journey_heatmaps", ["journey_id", "transit_mode_id", "metric"])
+    op.drop_column("journey_heatmaps", "mode")
+    op.drop_column("journey_measurements", "mode")
@@ -0,0 +1,48 @@
+"""Add journey_measurement_segments for step-level segment speeds
+
+Revision ID: 51a0a580df20
+Revises: 3e004ed8ec28
+Create Date: 2026-10-19 16:12:47.508133
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "51a0a580df20"
+down_revision = "3e004ed8ec28"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Create journey_measurement_segments"""
+    op.create_table(
+        "journey_measurement_segments",
+        sa.Column(
+            "journey_measurement_id",
+            sa.Integer,
+            sa.ForeignKey("journey_measurements.id", ondelete="CASCADE"),
+            primary_key=True,
+        ),
+        sa.Column("journey_id", sa.Integer, sa.ForeignKey("journeys.id"), nullable=False),
+        sa.Column("transit_mode_id", sa.Integer, sa.ForeignKey("transit_modes.id"), nullable=False),
+        sa.Column("geometry_hash", sa.String(40), nullable=False),
+        sa.Column("segment_count", sa.SmallInteger, nullable=False),
+        sa.Column("durations", sa.LargeBinary, nullable=False),
+        sa.Column("distances", sa.LargeBinary, nullable=False),
+        sa.Column("point_offsets", sa.LargeBinary, nullable=False),
+        sa.Column("coordinates", sa.LargeBinary, nullable=False),
+        sa.Column("created_at", sa.TIMESTAMP(timezone=True), server_default=sa.func.now(), nullable=False),
+    )
+    op.create_index(
+        "ix_journey_measurement_segments_journey_mode_geometry",
+        "journey_measurement_segments",
+        ["journey_id", "transit_mode_id", "geometry_hash"],
+    )
+
+
+def downgrade() -> None:
+    """Drop journey_measurement_segments"""
+    op.drop_index("ix_journey_measurement_segments_journey_mode_geometry", table_name="journey_measurement_segments")
+    op.drop_table("journey_measurement_segments")
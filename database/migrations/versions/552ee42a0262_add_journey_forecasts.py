@@ -0,0 +1,36 @@
+"""Add journey_forecasts for per-slot travel-time models
+
+Revision ID: 552ee42a0262
+Revises: e3f1b7c6a2d4
+Create Date: 2026-10-19 17:48:09.314275
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "552ee42a0262"
+down_revision = "e3f1b7c6a2d4"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Create journey_forecasts"""
+    op.create_table(
+        "journey_forecasts",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("journey_id", sa.Integer, sa.ForeignKey("journeys.id"), nullable=False),
+        sa.Column("transit_mode_id", sa.Integer, sa.ForeignKey("transit_modes.id"), nullable=False),
+        sa.Column("watermark", sa.Integer, nullable=False, server_default="0"),
+        sa.Column("trend", sa.Float, nullable=False, server_default="0"),
+        sa.Column("trend_at", sa.TIMESTAMP(timezone=True), nullable=True),
+        sa.Column("payload", sa.LargeBinary, nullable=False),
+        sa.Column("updated_at", sa.TIMESTAMP(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.UniqueConstraint("journey_id", "transit_mode_id", name="uq_journey_forecast"),
+    )
+
+
+def downgrade() -> None:
+    """Drop journey_forecasts"""
+    op.drop_table("journey_forecasts")
@@ -0,0 +1,39 @@
+"""Key anomaly baselines by the calculator mode and record it on anomalies
+
+Revision ID: 6d2a94c3b8e1
+Revises: 9f3c71a2e5b4
+Create Date: 2026-10-20 11:23:51.208377
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "6d2a94c3b8e1"
+down_revision = "9f3c71a2e5b4"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Add journey_baselines.mode and journey_anomalies.mode"""
+    # Existing baselines pool driving and driving_routed; the scheduler seeds them again from the measurements
+    op.execute("DELETE FROM journey_baselines")
+    op.add_column("journey_baselines", sa.Column("mode", sa.String(50), nullable=False))
+    op.drop_constraint("uq_journey_baseline", "journey_baselines", type_="unique")
+    op.create_unique_constraint("uq_journey_baseline", "journey_baselines", ["journey_id", "mode"])
+
+    op.add_column("journey_anomalies", sa.Column("mode", sa.String(50), nullable=True))
+    op.execute(
+        "UPDATE journey_anomalies a SET mode = m.mode FROM journey_measurements m WHERE m.id = a.journey_measurement_id"
+    )
+    op.alter_column("journey_anomalies", "mode", nullable=False)
+
+
+def downgrade() -> None:
+    """Key baselines by transit mode again and drop the mode columns"""
+    op.drop_column("journey_anomalies", "mode")
+    op.execute("DELETE FROM journey_baselines")
+    op.drop_constraint("uq_journey_baseline", "journey_baselines", type_="unique")
+    op.create_unique_constraint("uq_journey_baseline", "journey_baselines", ["journey_id", "transit_mode_id"])
+    op.drop_column("journey_baselines", "mode")
@@ -0,0 +1,36 @@
+"""Add journey_failures for quarantining failing journeys and modes
+
+Revision ID: 8c41d27e9b53
+Revises: 552ee42a0262
+Create Date: 2026-10-19 19:02:41.508316
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "8c41d27e9b53"
+down_revision = "552ee42a0262"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Create journey_failures"""
+    op.create_table(
+        "journey_failures",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("journey_id", sa.Integer, sa.ForeignKey("journeys.id"), nullable=False),
+        sa.Column("mode", sa.String(50), nullable=False),
+        sa.Column("consecutive_failures", sa.Integer, nullable=False, server_default="0"),
+        sa.Column("last_error", sa.Text, nullable=True),
+        sa.Column("first_failed_at", sa.TIMESTAMP(timezone=True), nullable=False),
+        sa.Column("last_failed_at", sa.TIMESTAMP(timezone=True), nullable=False),
+        sa.Column("retry_after", sa.TIMESTAMP(timezone=True), nullable=True),
+        sa.UniqueConstraint("journey_id", "mode", name="uq_journey_failure"),
+    )
+
+
+def downgrade() -> None:
+    """Drop journey_failures"""
+    op.drop_table("journey_failures")
@@ -0,0 +1,33 @@
+"""Add measurement_revisions to record bulk rewrites of measurements
+
+Revision ID: 9f3c71a2e5b4
+Revises: 4b8e2f61d0a7
+Create Date: 2026-10-20 10:41:07.662915
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "9f3c71a2e5b4"
+down_revision = "4b8e2f61d0a7"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Create measurement_revisions"""
+    op.create_table(
+        "measurement_revisions",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("reason", sa.String(64), nullable=False),
+        sa.Column("first_measurement_id", sa.Integer, nullable=False),
+        sa.Column("last_measurement_id", sa.Integer, nullable=False),
+        sa.Column("rows", sa.Integer, nullable=False),
+        sa.Column("created_at", sa.TIMESTAMP(timezone=True), server_default=sa.func.now(), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    """Drop measurement_revisions"""
+    op.drop_table("measurement_revisions")
@@ -0,0 +1,34 @@
+"""Key the per-journey keyset index by the calculator mode
+
+Revision ID: a7d4e09b3c62
+Revises: c5e83a1f9d27
+Create Date: 2026-10-20 14:21:07.318640
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "a7d4e09b3c62"
+down_revision = "c5e83a1f9d27"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Index (journey_id, mode, timestamp, id), which the API filters on now that driving_routed is its own mode"""
+    op.drop_index("ix_journey_measurements_journey_mode_timestamp_id", table_name="journey_measurements")
+    op.create_index(
+        "ix_journey_measurements_journey_mode_timestamp_id",
+        "journey_measurements",
+        ["journey_id", "mode", "timestamp", "id"],
+    )
+
+
+def downgrade() -> None:
+    """Index (journey_id, transit_mode_id, timestamp, id) again"""
+    op.drop_index("ix_journey_measurements_journey_mode_timestamp_id", table_name="journey_measurements")
+    op.create_index(
+        "ix_journey_measurements_journey_mode_timestamp_id",
+        "journey_measurements",
+        ["journey_id", "transit_mode_id", "timestamp", "id"],
+    )
@@ -0,0 +1,34 @@
+"""Add api_cache_entries for the shared read API response cache
+
+Revision ID: badcf20e9224
+Revises: f64cdeb70e82
+Create Date: 2026-10-19 10:02:17.518830
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "badcf20e9224"
+down_revision = "f64cdeb70e82"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Create the shared response cache table"""
+    op.create_table(
+        "api_cache_entries",
+        sa.Column("cache_key", sa.String(64), primary_key=True),
+        sa.Column("watermark", sa.Integer, nullable=False),
+        sa.Column("etag", sa.String, nullable=False),
+        sa.Column("payload", sa.JSON),  # Stored and served whole, never queried into
+        sa.Column("created_at", sa.TIMESTAMP(timezone=True), server_default=sa.func.now(), nullable=False),
+    )
+    op.create_index("ix_api_cache_entries_watermark", "api_cache_entries", ["watermark"])
+
+
+def downgrade() -> None:
+    """Drop the shared response cache table"""
+    op.drop_index("ix_api_cache_entries_watermark", table_name="api_cache_entries")
+    op.drop_table("api_cache_entries")
@@ -0,0 +1,32 @@
+"""Key forecasts by the calculator mode
+
+Revision ID: c5e83a1f9d27
+Revises: 6d2a94c3b8e1
+Create Date: 2026-10-20 11:58:16.540932
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "c5e83a1f9d27"
+down_revision = "6d2a94c3b8e1"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Add journey_forecasts.mode"""
+    # Existing models pool driving and driving_routed; they are refit from the measurements on the next run
+    op.execute("DELETE FROM journey_forecasts")
+    op.add_column("journey_forecasts", sa.Column("mode", sa.String(50), nullable=False))
+    op.drop_constraint("uq_journey_forecast", "journey_forecasts", type_="unique")
+    op.create_unique_constraint("uq_journey_forecast", "journey_forecasts", ["journey_id", "mode"])
+
+
+def downgrade() -> None:
+    """Key forecasts by transit mode again"""
+    op.execute("DELETE FROM journey_forecasts")
+    op.drop_constraint("uq_journey_forecast", "journey_forecasts", type_="unique")
+    op.create_unique_constraint("uq_journey_forecast", "journey_forecasts", ["journey_id", "transit_mode_id"])
+    op.drop_column("journey_forecasts", "mode")
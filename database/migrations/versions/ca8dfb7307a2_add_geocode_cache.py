@@ -0,0 +1,35 @@
+"""Add geocode_cache for persistent plus code, place and timezone lookups
+
+Revision ID: ca8dfb7307a2
+Revises: 1706f5a0859a
+Create Date: 2026-10-19 13:40:51.902117
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "ca8dfb7307a2"
+down_revision = "1706f5a0859a"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Create geocode_cache"""
+    op.create_table(
+        "geocode_cache",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("kind", sa.String(32), nullable=False),
+        sa.Column("cache_key", sa.String, nullable=False),
+        sa.Column("payload", sa.JSON),  # Stored and returned whole, never queried into
+        sa.Column("hit_count", sa.Integer, nullable=False, server_default="0"),
+        sa.Column("created_at", sa.TIMESTAMP(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column("expires_at", sa.TIMESTAMP(timezone=True), nullable=False),
+        sa.UniqueConstraint("kind", "cache_key", name="uq_geocode_cache_kind_key"),
+    )
+
+
+def downgrade() -> None:
+    """Drop geocode_cache"""
+    op.drop_table("geocode_cache")
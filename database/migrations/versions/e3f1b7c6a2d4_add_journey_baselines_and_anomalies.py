@@ -0,0 +1,58 @@
+"""Add journey_baselines and journey_anomalies for online slowdown detection
+
+Revision ID: e3f1b7c6a2d4
+Revises: 51a0a580df20
+Create Date: 2026-10-19 17:03:21.880412
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "e3f1b7c6a2d4"
+down_revision = "51a0a580df20"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Create journey_baselines and journey_anomalies"""
+    op.create_table(
+        "journey_baselines",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("journey_id", sa.Integer, sa.ForeignKey("journeys.id"), nullable=False),
+        sa.Column("transit_mode_id", sa.Integer, sa.ForeignKey("transit_modes.id"), nullable=False),
+        sa.Column("payload", sa.LargeBinary, nullable=False),
+        sa.Column("updated_at", sa.TIMESTAMP(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.UniqueConstraint("journey_id", "transit_mode_id", name="uq_journey_baseline"),
+    )
+    op.create_table(
+        "journey_anomalies",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column(
+            "journey_measurement_id",
+            sa.Integer,
+            sa.ForeignKey("journey_measurements.id", ondelete="CASCADE"),
+            nullable=False,
+            unique=True,
+        ),
+        sa.Column("journey_id", sa.Integer, sa.ForeignKey("journeys.id"), nullable=False),
+        sa.Column("transit_mode_id", sa.Integer, sa.ForeignKey("transit_modes.id"), nullable=False),
+        sa.Column("day_of_week_id", sa.Integer, sa.ForeignKey("days_of_week.id"), nullable=False),
+        sa.Column("time_slot_id", sa.Integer, sa.ForeignKey("time_slots.id"), nullable=False),
+        sa.Column("timestamp", sa.TIMESTAMP(timezone=True), nullable=False),
+        sa.Column("duration_seconds", sa.Integer, nullable=False),
+        sa.Column("expected_seconds", sa.Float, nullable=False),
+        sa.Column("z_score", sa.Float, nullable=False),
+        sa.Column("created_at", sa.TIMESTAMP(timezone=True), server_default=sa.func.now(), nullable=False),
+    )
+    op.create_index("ix_journey_anomalies_timestamp", "journey_anomalies", ["timestamp"])
+    op.create_index("ix_journey_anomalies_journey_timestamp", "journey_anomalies", ["journey_id", "timestamp"])
+
+
+def downgrade() -> None:
+    """Drop journey_anomalies and journey_baselines"""
+    op.drop_index("ix_journey_anomalies_journey_timestamp", table_name="journey_anomalies")
+    op.drop_index("ix_journey_anomalies_timestamp", table_name="journey_anomalies")
+    op.drop_table("journey_anomalies")
+    op.drop_table("journey_baselines")
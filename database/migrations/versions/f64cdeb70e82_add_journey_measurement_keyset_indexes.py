@@ -0,0 +1,34 @@
+"""Add keyset pagination indexes to journey_measurements
+
+Revision ID: f64cdeb70e82
+Revises: 80fc315ceec8
+Create Date: 2026-10-19 09:12:44.381204
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "f64cdeb70e82"
+down_revision = "80fc315ceec8"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Index (timestamp, id) globally and per journey/mode so API pages and ETag probes are index scans"""
+    op.create_index(
+        "ix_journey_measurements_timestamp_id",
+        "journey_measurements",
+        ["timestamp", "id"],
+    )
+    op.create_index(
+        "ix_journey_measurements_journey_mode_timestamp_id",
+        "journey_measurements",
+        ["journey_id", "transit_mode_id", "timestamp", "id"],
+    )
+
+
+def downgrade() -> None:
+    """Drop the keyset pagination indexes"""
+    op.drop_index("ix_journey_measurements_journey_mode_timestamp_id", table_name="journey_measurements")
+    op.drop_index("ix_journey_measurements_timestamp_id", table_name="journey_measurements")
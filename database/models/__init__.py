@@ -1,9 +1,19 @@
+from .api_cache_entry import ApiCacheEntry
+from .api_usage import ApiUsage
 from .base import Base
 from .day_of_week import DayOfWeek
+from .geocode_cache_entry import GeocodeCacheEntry
 from .journey import Journey
+from .journey_anomaly import JourneyAnomaly
+from .journey_baseline import JourneyBaseline
+from .journey_failure import JourneyFailure
+from .journey_forecast import JourneyForecast
+from .journey_heatmap import JourneyHeatmap
 from .journey_leg import JourneyLeg
 from .journey_measurement import JourneyMeasurement
+from .journey_measurement_segments import JourneyMeasurementSegments
 from .journey_status import JourneyStatus
+from .measurement_revision import MeasurementRevision
 from .time_slot import TimeSlot
 from .transit_mode import TransitMode
 from .waypoint import Waypoint
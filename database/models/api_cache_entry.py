@@ -0,0 +1,17 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import JSON, DateTime, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from database.models.base import Base
+
+
+class ApiCacheEntry(Base):
+    __tablename__ = "api_cache_entries"
+
+    cache_key: Mapped[str] = mapped_column(String(64), primary_key=True)
+    watermark: Mapped[int] = mapped_column(Integer, nullable=False, index=True)
+    etag: Mapped[str] = mapped_column(String, nullable=False)
+    payload: Mapped[Optional[dict]] = mapped_column(JSON, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
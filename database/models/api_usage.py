@@ -0,0 +1,22 @@
+from datetime import date, datetime
+
+from sqlalchemy import Date, DateTime, Float, Index, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from database.models.base import Base
+
+
+class ApiUsage(Base):
+    """Google Maps calls and their list-price cost for one run, endpoint and mode, see core.journey.api_usage."""
+
+    __tablename__ = "api_usage"
+    __table_args__ = (Index("ix_api_usage_day", "day"),)
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    run_started_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    day: Mapped[date] = mapped_column(Date, nullable=False)  # UTC day of the run
+    source: Mapped[str] = mapped_column(String(32), nullable=False)  # scheduler or setup
+    endpoint: Mapped[str] = mapped_column(String(50), nullable=False)
+    mode: Mapped[str] = mapped_column(String(50), nullable=False, default="")
+    calls: Mapped[int] = mapped_column(Integer, nullable=False)
+    cost_usd: Mapped[float] = mapped_column(Float, nullable=False)
@@ -0,0 +1,22 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import JSON, DateTime, Integer, String, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+
+from database.models.base import Base
+
+
+class GeocodeCacheEntry(Base):
+    """A cached Google Maps geocoding result, see core.journey.geocache."""
+
+    __tablename__ = "geocode_cache"
+    __table_args__ = (UniqueConstraint("kind", "cache_key", name="uq_geocode_cache_kind_key"),)
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    kind: Mapped[str] = mapped_column(String(32), nullable=False)
+    cache_key: Mapped[str] = mapped_column(String, nullable=False)
+    payload: Mapped[Optional[dict]] = mapped_column(JSON, nullable=True)
+    hit_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
@@ -0,0 +1,33 @@
+from datetime import datetime
+
+from sqlalchemy import DateTime, Float, ForeignKey, Index, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+
+from database.models.base import Base
+
+
+class JourneyAnomaly(Base):
+    """A measurement whose duration was unusually long for its journey, mode, day of week and time slot."""
+
+    __tablename__ = "journey_anomalies"
+    __table_args__ = (
+        Index("ix_journey_anomalies_timestamp", "timestamp"),
+        Index("ix_journey_anomalies_journey_timestamp", "journey_id", "timestamp"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    journey_measurement_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("journey_measurements.id", ondelete="CASCADE"), nullable=False, unique=True
+    )
+    journey_id: Mapped[int] = mapped_column(Integer, ForeignKey("journeys.id"), nullable=False)
+    transit_mode_id: Mapped[int] = mapped_column(Integer, ForeignKey("transit_modes.id"), nullable=False)
+    mode: Mapped[str] = mapped_column(String(50), nullable=False)  # Calculator mode key, see JourneyMeasurement.mode
+    day_of_week_id: Mapped[int] = mapped_column(Integer, ForeignKey("days_of_week.id"), nullable=False)
+    time_slot_id: Mapped[int] = mapped_column(Integer, ForeignKey("time_slots.id"), nullable=False)
+    timestamp: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    duration_seconds: Mapped[int] = mapped_column(Integer, nullable=False)
+    expected_seconds: Mapped[float] = mapped_column(Float, nullable=False)
+    z_score: Mapped[float] = mapped_column(Float, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+
+    measurement = relationship("JourneyMeasurement")
@@ -0,0 +1,20 @@
+from datetime import datetime
+
+from sqlalchemy import DateTime, ForeignKey, Integer, LargeBinary, String, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+
+from database.models.base import Base
+
+
+class JourneyBaseline(Base):
+    """Running duration statistics per day-of-week × time slot for one (journey, mode), see core.journey.anomaly."""
+
+    __tablename__ = "journey_baselines"
+    __table_args__ = (UniqueConstraint("journey_id", "mode", name="uq_journey_baseline"),)
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    journey_id: Mapped[int] = mapped_column(Integer, ForeignKey("journeys.id"), nullable=False)
+    transit_mode_id: Mapped[int] = mapped_column(Integer, ForeignKey("transit_modes.id"), nullable=False)
+    mode: Mapped[str] = mapped_column(String(50), nullable=False)  # Calculator mode key, see JourneyMeasurement.mode
+    payload: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
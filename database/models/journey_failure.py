@@ -0,0 +1,24 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import DateTime, ForeignKey, Integer, String, Text, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+
+from database.models.base import Base
+
+
+class JourneyFailure(Base):
+    """Consecutive failures of one journey and calculator mode, see core.journey.quarantine."""
+
+    __tablename__ = "journey_failures"
+    __table_args__ = (UniqueConstraint("journey_id", "mode", name="uq_journey_failure"),)
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    journey_id: Mapped[int] = mapped_column(Integer, ForeignKey("journeys.id"), nullable=False)
+    # Calculator mode key, e.g. "driving_routed", which shares its transit_mode_id with "driving"
+    mode: Mapped[str] = mapped_column(String(50), nullable=False)
+    consecutive_failures: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    last_error: Mapped[Optional[str]] = mapped_column(Text)
+    first_failed_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    last_failed_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    retry_after: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
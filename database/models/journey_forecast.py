@@ -0,0 +1,24 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import DateTime, Float, ForeignKey, Integer, LargeBinary, String, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+
+from database.models.base import Base
+
+
+class JourneyForecast(Base):
+    """Fitted travel-time model for one (journey, mode), see core.journey.forecast."""
+
+    __tablename__ = "journey_forecasts"
+    __table_args__ = (UniqueConstraint("journey_id", "mode", name="uq_journey_forecast"),)
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    journey_id: Mapped[int] = mapped_column(Integer, ForeignKey("journeys.id"), nullable=False)
+    transit_mode_id: Mapped[int] = mapped_column(Integer, ForeignKey("transit_modes.id"), nullable=False)
+    mode: Mapped[str] = mapped_column(String(50), nullable=False)  # Calculator mode key, see JourneyMeasurement.mode
+    watermark: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    trend: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    trend_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
+    payload: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
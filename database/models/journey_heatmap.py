@@ -0,0 +1,22 @@
+from datetime import datetime
+
+from sqlalchemy import DateTime, ForeignKey, Integer, LargeBinary, String, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+
+from database.models.base import Base
+
+
+class JourneyHeatmap(Base):
+    """Precomputed day-of-week × time-slot matrix for one (journey, mode, metric), see core.journey.heatmap."""
+
+    __tablename__ = "journey_heatmaps"
+    __table_args__ = (UniqueConstraint("journey_id", "mode", "metric", name="uq_journey_heatmap"),)
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    journey_id: Mapped[int] = mapped_column(Integer, ForeignKey("journeys.id"), nullable=False)
+    transit_mode_id: Mapped[int] = mapped_column(Integer, ForeignKey("transit_modes.id"), nullable=False)
+    mode: Mapped[str] = mapped_column(String(50), nullable=False)  # Calculator mode key, see JourneyMeasurement.mode
+    metric: Mapped[str] = mapped_column(String(32), nullable=False)
+    watermark: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    payload: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
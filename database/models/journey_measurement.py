@@ -8,12 +8,15 @@ from sqlalchemy import (
     TIMESTAMP,
     Column,
     ForeignKey,
+    Index,
     Integer,
     Numeric,
+    String,
     func,
 )
 from sqlalchemy.orm import relationship
 
+from core.config.logging_config import log_fields
 from database.models.base import Base
 
 logger = logging.getLogger(__name__)  # Initialize logger
@@ -21,10 +24,16 @@ logger = logging.getLogger(__name__)  # Initialize logger
 
 class JourneyMeasurement(Base):
     __tablename__ = "journey_measurements"
+    __table_args__ = (
+        Index("ix_journey_measurements_timestamp_id", "timestamp", "id"),
+        Index("ix_journey_measurements_journey_mode_timestamp_id", "journey_id", "mode", "timestamp", "id"),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     journey_id = Column(Integer, ForeignKey("journeys.id"), nullable=False)
     transit_mode_id = Column(Integer, ForeignKey("transit_modes.id"), nullable=False)
+    # Calculator mode key, e.g. "driving_routed", which shares its transit_mode_id with "driving"
+    mode = Column(String(50), nullable=False)
 
     # UTC event time (calculated by the model)
     timestamp = Column(TIMESTAMP(timezone=True), nullable=False)
@@ -50,6 +59,9 @@ class JourneyMeasurement(Base):
     # Relationships
     journey = relationship("Journey", back_populates="measurements")
     legs = relationship("JourneyLeg", back_populates="measurement", cascade="all, delete, delete-orphan")
+    segments = relationship(
+        "JourneyMeasurementSegments", back_populates="measurement", uselist=False, cascade="all, delete, delete-orphan"
+    )
 
     @staticmethod
     def ensure_utc(dt: datetime) -> datetime:
@@ -57,11 +69,8 @@ class JourneyMeasurement(Base):
         Ensure a datetime object is in UTC. Convert naive datetimes assuming they are UTC.
         """
         if dt.tzinfo is None:
-            logger.debug(f"⏱️ ensure_utc TIME - ENSURE UTC (Naive -> UTC): Original: {dt.isoformat()} Assumed UTC: {dt.replace(tzinfo=timezone.utc).isoformat()}")
             return dt.replace(tzinfo=timezone.utc)
-        utc_dt = dt.astimezone(timezone.utc)
-        logger.debug(f"⏱️ ensure_utc TIME - ENSURE UTC (Aware -> UTC): Original: {dt.isoformat()} Converted UTC: {utc_dt.isoformat()}")
-        return utc_dt
+        return dt.astimezone(timezone.utc)
 
 
     def __init__(self, **kwargs: Any) -> None:
@@ -92,9 +101,12 @@ class JourneyMeasurement(Base):
         # Ensure `created_at` is always UTC
         kwargs["created_at"] = self.ensure_utc(kwargs.get("created_at", datetime.now(timezone.utc)))
 
-        # Debug logging
-        logger.debug(f"⏱️ init 2 TIME - TRIP LOCAL: {kwargs['local_timestamp'].isoformat()}")
-        logger.debug(f"⏱️ init 2 TIME - UTC: {kwargs['timestamp'].isoformat()}")
-        logger.debug(f"⏱️ init 2 TIME - CREATED_AT: {kwargs['created_at'].isoformat()}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "Measurement timestamps",
+                extra=log_fields(
+                    local=kwargs["local_timestamp"], utc=kwargs["timestamp"], created_at=kwargs["created_at"]
+                ),
+            )
 
         super().__init__(**kwargs)
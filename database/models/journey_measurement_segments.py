@@ -0,0 +1,38 @@
+from datetime import datetime
+
+from sqlalchemy import DateTime, ForeignKey, Index, Integer, LargeBinary, SmallInteger, String
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+
+from database.models.base import Base
+
+
+class JourneyMeasurementSegments(Base):
+    """
+    Step-level segments of one measurement's route, see core.journey.segments.
+
+    Per-step durations and distances are packed int32 arrays; the step polylines are stored once as
+    delta-encoded int32 E5 coordinates with a uint32 offset per step. Measurements sharing a
+    geometry_hash followed identical steps, so their segments can be compared position by position.
+    """
+
+    __tablename__ = "journey_measurement_segments"
+    __table_args__ = (
+        Index(
+            "ix_journey_measurement_segments_journey_mode_geometry", "journey_id", "transit_mode_id", "geometry_hash"
+        ),
+    )
+
+    journey_measurement_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("journey_measurements.id", ondelete="CASCADE"), primary_key=True
+    )
+    journey_id: Mapped[int] = mapped_column(Integer, ForeignKey("journeys.id"), nullable=False)
+    transit_mode_id: Mapped[int] = mapped_column(Integer, ForeignKey("transit_modes.id"), nullable=False)
+    geometry_hash: Mapped[str] = mapped_column(String(40), nullable=False)
+    segment_count: Mapped[int] = mapped_column(SmallInteger, nullable=False)
+    durations: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+    distances: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+    point_offsets: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+    coordinates: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+
+    measurement = relationship("JourneyMeasurement", back_populates="segments")
@@ -0,0 +1,22 @@
+from datetime import datetime
+
+from sqlalchemy import DateTime, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from database.models.base import Base
+
+
+class MeasurementRevision(Base):
+    """
+    A bulk rewrite of stored journey_measurements, e.g. a metrics backfill. Rewrites keep their ids, so the
+    newest revision id is part of the response cache watermark, see core.cache.response_cache.
+    """
+
+    __tablename__ = "measurement_revisions"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    reason: Mapped[str] = mapped_column(String(64), nullable=False)  # e.g. backfill:metrics
+    first_measurement_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    last_measurement_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    rows: Mapped[int] = mapped_column(Integer, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
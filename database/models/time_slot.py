@@ -14,8 +14,8 @@ class TimeSlot(Base):
     id = Column(Integer, primary_key=True)
     slot = Column(String(50), unique=True, nullable=False)
 
-    @classmethod
-    def get_id(cls, db: Session, dt: datetime) -> int:
+    @staticmethod
+    def slot_key(dt: datetime) -> str:
         hour = dt.hour
         minute = (dt.minute // 15) * 15
         slot_key = f"{hour:02d}_{minute:02d}"
@@ -33,7 +33,11 @@ class TimeSlot(Base):
         else:
             period = "night"
 
-        slot_key = f"{slot_key}_{period}"
+        return f"{slot_key}_{period}"
+
+    @classmethod
+    def get_id(cls, db: Session, dt: datetime) -> int:
+        slot_key = cls.slot_key(dt)
         slot = db.query(cls).filter_by(slot=slot_key).first()
 
         if not slot:
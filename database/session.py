@@ -1,36 +1,125 @@
+"""
+Database engines and sessions.
+
+Nothing connects, or even creates an engine, at import time: engines and session factories are built on first
+use, so scripts and web workers that import this module only pay for it when they query. SQL statement logging
+is opt-in through SQL_ECHO.
+
+Each process gets its own connection pools. Engines inherited across a fork (gunicorn --preload, the backfill
+workers) are discarded in the child without closing the parent's connections, and a new pool is built on
+first use. Reads that can tolerate replica lag use `get_db(readonly=True)`, which goes through a separate
+engine (DATABASE_READ_URL when set, otherwise the primary with its own pool), so the scheduler's writes never
+wait behind dashboard queries for a connection.
+"""
+
 import logging
+import os
+import threading
 from contextlib import contextmanager
-from typing import Generator, Optional
+from typing import Any, Dict, Generator, Optional
 
 from sqlalchemy import create_engine
 from sqlalchemy.engine import Engine
 from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import NullPool
 
 from core.config import settings
 
-# Enable SQLAlchemy logging for debugging
-logging.basicConfig()
-logging.getLogger("sqlalchemy.engine").setLevel(logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Built by get_session_factory() on first use; assigning SessionLocal directly (e.g. in tests) takes precedence
+engine: Engine
+SessionLocal: sessionmaker
+
+_factories: Dict[bool, sessionmaker] = {}
+_factories_pid: Optional[int] = None
+_init_lock = threading.Lock()
+
+
+def engine_options(readonly: bool = False) -> Dict[str, Any]:
+    """Pool configuration for the primary (read-write) or read-only engine."""
+    if settings.DB_PGBOUNCER:
+        # PgBouncer in transaction mode pools server connections itself; holding client connections here
+        # would only pin them. psycopg2 uses no server-side prepared statements, so nothing else is needed.
+        return {"poolclass": NullPool}
+    return {
+        "pool_size": settings.DB_READ_POOL_SIZE if readonly else settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_READ_MAX_OVERFLOW if readonly else settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "pool_use_lifo": True,  # Lets idle connections beyond the steady load age out through pool_recycle
+    }
+
 
-# Create database engine
-engine = create_engine(settings.DATABASE_URL)
+def get_engine(database_url: Optional[str] = None, pooled: bool = True, readonly: bool = False) -> Engine:
+    """Returns a new SQLAlchemy engine. Required for Alembic migrations, which use `pooled=False`."""
+    options = engine_options(readonly) if pooled else {"poolclass": NullPool}
+    return create_engine(database_url or settings.DATABASE_URL, echo=settings.SQL_ECHO, **options)
 
-# Configure session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+def _discard_inherited_engines() -> None:
+    # Runs in a forked child: drop the parent's pools without closing connections the parent still uses
+    global _factories_pid
+    for factory in _factories.values():
+        bind = factory.kw.get("bind")
+        if bind is not None:
+            bind.dispose(close=False)
+    _factories.clear()
+    _factories_pid = os.getpid()
 
-def get_engine(database_url: Optional[str] = None) -> Engine:
-    """Returns a new SQLAlchemy engine. Required for Alembic migrations."""
-    return create_engine(database_url or settings.DATABASE_URL)
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_discard_inherited_engines)
+
+
+def get_session_factory(readonly: bool = False) -> sessionmaker:
+    """Return this process's session factory for the primary, or for reads, creating its engine on first use."""
+    global _factories_pid
+    override = globals().get("SessionLocal")
+    if override is not None:
+        return override
+
+    if _factories_pid != os.getpid():
+        with _init_lock:
+            if _factories_pid != os.getpid():
+                _discard_inherited_engines()
+
+    factory = _factories.get(readonly)
+    if factory is None:
+        with _init_lock:
+            factory = _factories.get(readonly)
+            if factory is None:
+                read_url = settings.DATABASE_READ_URL if readonly else None
+                bind = get_engine(read_url, readonly=readonly)
+                factory = _factories[readonly] = sessionmaker(autocommit=False, autoflush=False, bind=bind)
+                logger.debug(f"Created {'read-only' if readonly else 'primary'} engine in process {os.getpid()}")
+    return factory
+
+
+def __getattr__(name: str) -> Any:
+    # `from database.session import SessionLocal` and `database.session.engine` keep working, lazily
+    if name in ("engine", "SessionLocal"):
+        factory = get_session_factory()
+        return factory if name == "SessionLocal" else factory.kw.get("bind")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 @contextmanager
-def get_db() -> Generator[Session, None, None]:
-    """Provide a transactional scope around a series of operations."""
-    db = SessionLocal()
+def get_db(readonly: bool = False) -> Generator[Session, None, None]:
+    """
+    Provide a transactional scope around a series of operations.
+
+    With `readonly=True` the session comes from the read engine and is rolled back rather than committed;
+    use it only for queries that can tolerate replica lag.
+    """
+    db = get_session_factory(readonly)()
     try:
         yield db
-        db.commit()  # 🚀 Ensure commit before closing session
+        if readonly:
+            db.rollback()
+        else:
+            db.commit()  # 🚀 Ensure commit before closing session
     except Exception as e:
         db.rollback()  # Rollback if any error occurs
         logging.error(f"Database transaction rolled back due to error: {str(e)}")
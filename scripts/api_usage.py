@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Report Google Maps API calls and spend at list prices: today's calls per endpoint and mode, the month
+to date and the projected month total, as recorded by the scheduler and journeys setup.
+"""
+
+import argparse
+import json
+import logging
+import sys
+
+from core.config import settings
+from core.journey.api_usage import usage_report
+from database.session import get_db
+
+log_level = getattr(logging, settings.LOG_LEVEL, logging.INFO)
+logging.basicConfig(
+    level=log_level,
+    format=settings.LOG_FORMAT,
+    datefmt=settings.LOG_DATE_FORMAT,
+    handlers=[logging.StreamHandler(sys.stderr)],
+)
+logger = logging.getLogger(__name__)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Report Google Maps API usage and projected spend")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    try:
+        with get_db(readonly=True) as db:
+            report = usage_report(db)
+    except Exception as e:
+        logger.error("Error reading API usage: %s", e)
+        sys.exit(1)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"Google Maps API usage for {report['day']} (UTC)")
+    for row in report["today"]:
+        label = f"{row['endpoint']} ({row['mode']})" if row["mode"] else row["endpoint"]
+        print(f"  {label:<32} {row['calls']:>8} calls  ${row['cost_usd']:>9.2f}")
+    print(f"Today:               ${report['today_cost_usd']:.2f}")
+    if report["daily_budget_usd"]:
+        print(f"Daily budget:        ${report['daily_budget_usd']:.2f} ({settings.API_BUDGET_MODE})")
+    print(f"Month to date:       ${report['month_to_date_usd']:.2f}")
+    print(f"Daily average:       ${report['daily_average_usd']:.2f}")
+    print(f"Projected month:     ${report['projected_month_usd']:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,40 +1,20 @@
 #!/usr/bin/env python3
 import argparse
 import logging
-import os
 import sys
 import time
 from datetime import datetime, timedelta, timezone
-from typing import List, Optional
+from typing import Optional
 
 from core.config import settings
+from core.config.logging_config import configure_logging
 from core.journey.scheduler import JourneyScheduler
+from core.profiling import profile_run
 from database.session import get_db  # Adjust path if needed
 
 # Determine if running on Heroku (using the IS_HEROKU flag from settings)
 is_heroku = settings.IS_HEROKU
 
-# Set up logging handlers based on the environment
-log_handlers: List[logging.Handler] = []
-if is_heroku:
-    # Heroku logs should go to stdout only.
-    log_handlers.append(logging.StreamHandler(sys.stdout))
-else:
-    # Locally, log both to stdout and to a file for persistence.
-    log_dir = os.path.join("/tmp", "logs")
-    os.makedirs(log_dir, exist_ok=True)
-    log_file = os.path.join(log_dir, "journey_measurements.log")
-    log_handlers.append(logging.StreamHandler(sys.stdout))
-    log_handlers.append(logging.FileHandler(log_file))
-
-# Use logging settings from the config (LOG_LEVEL is a string, so convert it to a logging level)
-log_level = getattr(logging, settings.LOG_LEVEL, logging.INFO)
-logging.basicConfig(
-    level=log_level,
-    format=settings.LOG_FORMAT,
-    datefmt=settings.LOG_DATE_FORMAT,
-    handlers=log_handlers,
-)
 logger = logging.getLogger(__name__)
 
 
@@ -88,7 +68,8 @@ def get_last_measurement_timestamp() -> Optional[datetime]:
 def run_scheduler(max_retries: int = 3, retry_delay: int = 5) -> None:
     """
     Run the journey scheduler, skipping if the last measurement is < 15 minutes old.
-    Retries up to max_retries if there's an exception.
+    Retries up to max_retries if there's an exception. A run that measured through a database outage
+    is retried by replaying its spooled results, not by measuring (and paying for) everything again.
     """
     # --- Gating logic based on journey_measurements table ---
     last_run_time = get_last_measurement_timestamp()
@@ -108,6 +89,7 @@ def run_scheduler(max_retries: int = 3, retry_delay: int = 5) -> None:
     debug_mode = settings.DEBUG
     max_workers = settings.MAX_WORKERS
 
+    scheduler: Optional[JourneyScheduler] = None
     attempt = 0
     while attempt < max_retries:
         start_time = time.perf_counter()
@@ -117,8 +99,11 @@ def run_scheduler(max_retries: int = 3, retry_delay: int = 5) -> None:
             logger.info(
                 f"Starting journey metrics calculation job at {start_datetime.isoformat(timespec='milliseconds')}"
             )
-            scheduler = JourneyScheduler(debug=debug_mode, max_workers=max_workers)
-            scheduler.process_all_journeys()
+            if scheduler is not None and scheduler.database_down:
+                scheduler.replay_after_outage()
+            else:
+                scheduler = JourneyScheduler(debug=debug_mode, max_workers=max_workers)
+                scheduler.process_all_journeys()
 
             end_time = time.perf_counter()
             run_time = end_time - start_time
@@ -159,13 +144,22 @@ def main() -> None:
     parser.add_argument("--max-retries", type=int, default=3, help="Maximum retry attempts")
     parser.add_argument("--retry-delay", type=int, default=5, help="Delay between retries in seconds")
     parser.add_argument("--debug", action="store_true", help="Enable debug mode")
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Sample all threads and write collapsed stacks and a flamegraph SVG under data/metrics/profiles",
+    )
     args = parser.parse_args()
 
     # Allow command-line override for debug mode
     if args.debug:
         settings.DEBUG = True
 
-    run_scheduler(max_retries=args.max_retries, retry_delay=args.retry_delay)
+    # Stdout (and a file locally) through a background writer; debug records are rate limited per call site
+    configure_logging("journey_measurements.log", level="DEBUG" if args.debug else None)
+
+    with profile_run("journeys_measure", enabled=args.profile):
+        run_scheduler(max_retries=args.max_retries, retry_delay=args.retry_delay)
 
 
 if __name__ == "__main__":
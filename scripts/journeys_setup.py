@@ -7,50 +7,97 @@ from core/journey/processor.py and is intended to be run as a one-off or in a He
 
 import argparse
 import logging
-import os
 import sys
 from pathlib import Path
-from typing import List
 
 import googlemaps
+from sqlalchemy.orm import Session
 
 from core.config import settings
+from core.config.logging_config import configure_logging
+from core.journey.api_usage import CountingClient
+from core.journey.bootstrap import JourneyBootstrapper
+from core.journey.importer import NDJSON_SUFFIXES, StreamingJourneyImporter
 from core.journey.processor import JourneyProcessor
+from core.profiling import profile_run
 
-# Configure logging similar to journeys_measure.py
-log_handlers: List[logging.Handler] = []
-if settings.IS_HEROKU:
-    # On Heroku, log to stdout only.
-    log_handlers.append(logging.StreamHandler(sys.stdout))
-else:
-    # Locally, log both to stdout and to a file.
-    log_dir = os.path.join("/tmp", "logs")
-    os.makedirs(log_dir, exist_ok=True)
-    log_file = os.path.join(log_dir, "journeys_setup.log")
-    log_handlers.append(logging.StreamHandler(sys.stdout))
-    log_handlers.append(logging.FileHandler(log_file))
-
-log_level = getattr(logging, settings.LOG_LEVEL, logging.INFO)
-logging.basicConfig(
-    level=log_level,
-    format=settings.LOG_FORMAT,
-    datefmt=settings.LOG_DATE_FORMAT,
-    handlers=log_handlers,
-)
+configure_logging("journeys_setup.log")
 logger = logging.getLogger(__name__)
 
 
+def record_api_usage(session: Session, gmaps_client: CountingClient) -> None:
+    """Persist the Google Maps calls this setup made, whether or not it succeeded."""
+    try:
+        session.rollback()  # Anything still pending belongs to a failed import
+        calls, cost = gmaps_client.run_calls(), gmaps_client.run_cost()
+        gmaps_client.flush(session)
+        logger.info("Google Maps API: %d calls ($%.2f at list prices)", calls, cost)
+    except Exception as e:
+        logger.warning("Could not record API usage: %s", e)
+
+
 def main() -> None:
     parser = argparse.ArgumentParser(description="Set up the database with journeys to measure using JourneyProcessor")
     parser.add_argument(
         "--journeys-file",
         type=str,
         default="data/raw/journeys.json",
-        help="Path to the journeys JSON file (default: data/raw/journeys.json)",
+        help="Path to the journeys JSON or NDJSON file (default: data/raw/journeys.json)",
     )
     parser.add_argument("--debug", action="store_true", help="Enable debug mode (overrides settings.DEBUG)")
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Re-process every journey, even those whose route and description are unchanged",
+    )
+    parser.add_argument(
+        "--no-geocode-cache",
+        action="store_true",
+        help="Ignore cached geocoding results and call the Google Maps API for every waypoint",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Read the journeys file incrementally and commit in batches (implied for .ndjson/.jsonl files)",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=200,
+        help="Journeys per commit when streaming (default: 200)",
+    )
+    parser.add_argument(
+        "--from-enriched",
+        nargs="?",
+        const=str(settings.PROCESSED_JOURNEYS_PATH),
+        metavar="PATH",
+        help="Bulk-load already enriched journeys from PATH without any API calls "
+        "(default: data/processed/journeys_enriched.json)",
+    )
+    parser.add_argument(
+        "--default-timezone",
+        type=str,
+        help="Timezone for enriched journeys that don't record one (e.g. America/Los_Angeles)",
+    )
+    parser.add_argument(
+        "--dump-enriched",
+        nargs="?",
+        const=str(settings.PROCESSED_JOURNEYS_PATH),
+        metavar="PATH",
+        help="After setup, write all journeys and waypoints to PATH (default: data/processed/journeys_enriched.json)",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Sample all threads and write collapsed stacks and a flamegraph SVG under data/metrics/profiles",
+    )
     args = parser.parse_args()
 
+    with profile_run("journeys_setup", enabled=args.profile):
+        run_setup(args)
+
+
+def run_setup(args: argparse.Namespace) -> None:
     # Allow command-line override for debug mode.
     if args.debug:
         settings.DEBUG = True
@@ -67,16 +114,40 @@ def main() -> None:
     # Create a database session.
     session = SessionLocal()
 
+    # Offline mode: seed straight from an enriched file, no Google Maps client needed.
+    if args.from_enriched:
+        try:
+            bootstrapper = JourneyBootstrapper(db=session, debug=settings.DEBUG)
+            bootstrapper.load_enriched_file(Path(args.from_enriched), default_timezone=args.default_timezone)
+            if bootstrapper.failed:
+                # e.g. journeys without a timezone when no --default-timezone (TZ=... for make) was given
+                logger.error("%d journeys could not be loaded, see the errors above", bootstrapper.failed)
+                sys.exit(1)
+            if args.dump_enriched:
+                bootstrapper.dump_enriched_file(Path(args.dump_enriched))
+        except Exception as e:
+            logger.error("Error loading enriched journeys file: %s", e)
+            sys.exit(1)
+        finally:
+            session.close()
+        logger.info("Journeys setup completed successfully")
+        return
+
     # Create a Google Maps client using an API key from settings.
     try:
         # Make sure your settings file defines GOOGLE_MAPS_API_KEY.
-        gmaps_client = googlemaps.Client(key=settings.get_google_maps_api_key())
+        gmaps_client = CountingClient(googlemaps.Client(key=settings.get_google_maps_api_key()), source="setup")
     except Exception as e:
         logger.error("Error creating Google Maps client: %s", e)
         sys.exit(1)
 
     # Instantiate the JourneyProcessor.
-    processor = JourneyProcessor(db=session, gmaps_client=gmaps_client, debug=settings.DEBUG)
+    processor = JourneyProcessor(
+        db=session,
+        gmaps_client=gmaps_client,
+        debug=settings.DEBUG,
+        use_geocache=not args.no_geocode_cache,
+    )
 
     # Build the path to the journeys file.
     journeys_file_path = Path(args.journeys_file)
@@ -84,15 +155,42 @@ def main() -> None:
         logger.error("Journeys file does not exist: %s", journeys_file_path)
         sys.exit(1)
 
+    # Stream large or NDJSON files in batches; journeys aren't kept around for summaries.
+    if args.stream or journeys_file_path.suffix in NDJSON_SUFFIXES:
+        try:
+            importer = StreamingJourneyImporter(processor, batch_size=args.batch_size)
+            stats = importer.import_file(journeys_file_path, force=args.force)
+            logger.info(
+                "Imported %d of %d journeys (%d unchanged, %d failed) in %d batches",
+                stats.imported,
+                stats.read,
+                stats.read - stats.changed,
+                stats.failed,
+                stats.batches,
+            )
+            if args.dump_enriched:
+                JourneyBootstrapper(db=session, debug=settings.DEBUG).dump_enriched_file(Path(args.dump_enriched))
+        except Exception as e:
+            logger.error("Error streaming journeys file: %s", e)
+            sys.exit(1)
+        finally:
+            record_api_usage(session, gmaps_client)
+            session.close()
+        logger.info("Journeys setup completed successfully")
+        return
+
     # Process the journeys file.
     try:
-        journeys = processor.process_routes_file(journeys_filename=journeys_file_path)
+        journeys = processor.process_routes_file(journeys_filename=journeys_file_path, force=args.force)
         for journey in journeys:
             processor.print_journey_summary(journey)
+        if args.dump_enriched:
+            JourneyBootstrapper(db=session, debug=settings.DEBUG).dump_enriched_file(Path(args.dump_enriched))
     except Exception as e:
         logger.error("Error processing journeys file: %s", e)
         sys.exit(1)
     finally:
+        record_api_usage(session, gmaps_client)
         session.close()
 
     logger.info("Journeys setup completed successfully")
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Capacity test for the scheduler: synthesize journeys near real Bay Area coordinates, run full scheduler
+cycles against a latency-simulating fake Google Maps client and the configured (local) database, and
+report how many journeys fit in a 15-minute slot at the given MAX_WORKERS, DB write throughput, peak RSS
+and where cycle time goes. Synthetic journeys and their rows are removed afterwards unless --keep is given.
+"""
+
+import argparse
+import json
+import logging
+import sys
+
+from core.config import settings
+from core.journey.loadgen import CapacityReport, LoadGenerator, remove_synthetic_journeys
+from database.session import get_db
+
+logging.basicConfig(
+    level=logging.WARNING,  # The scheduler's per-journey INFO logging would dominate the output
+    format=settings.LOG_FORMAT,
+    datefmt=settings.LOG_DATE_FORMAT,
+    handlers=[logging.StreamHandler(sys.stderr)],
+)
+logger = logging.getLogger(__name__)
+
+LOCAL_HOSTS = {"", "localhost", "127.0.0.1", "::1", "db", "postgres"}
+
+
+def print_report(report: CapacityReport) -> None:
+    print(
+        f"Scheduler capacity with MAX_WORKERS={report.max_workers}, "
+        f"{report.latency_ms:.0f} ms simulated Directions latency"
+    )
+    print(f"{'journeys':>9} {'cycle s':>8} {'api calls':>10} {'db s':>7} {'rows':>7} {'rows/s':>8} {'peak RSS':>9}")
+    for cycle in report.cycles:
+        rss = f"{cycle.peak_rss_mb:.0f} MB" if cycle.peak_rss_mb is not None else "?"
+        print(
+            f"{cycle.journeys:>9} {cycle.wall_seconds:>8.1f} {cycle.api_calls:>10} {cycle.db_seconds:>7.1f} "
+            f"{cycle.rows_written:>7} {cycle.rows_per_second:>8.0f} {rss:>9}"
+        )
+
+    largest = max(report.cycles, key=lambda cycle: (cycle.journeys, cycle.wall_seconds))
+    print(f"\nWhere time goes ({largest.journeys} journeys, {largest.wall_seconds:.1f}s):")
+    for name, seconds in sorted(largest.phases.items(), key=lambda item: -item[1]):
+        print(f"  {name:<26} {seconds:>8.2f}s  {seconds / largest.wall_seconds:>6.1%}")
+    print(
+        f"  {'(of which database)':<26} {largest.db_seconds:>8.2f}s  {largest.db_seconds / largest.wall_seconds:>6.1%}"
+    )
+    print(f"  {'(of which Maps latency)':<26} {largest.api_wait_seconds:>8.2f}s  (summed over workers)")
+
+    print(f"\nFixed cost per cycle:       {report.fixed_seconds:.2f}s")
+    print(f"Cost per journey:           {report.seconds_per_journey:.3f}s")
+    print(
+        f"Max journeys per slot:      {report.max_journeys_per_slot} "
+        f"({report.slot_seconds:.0f}s slot at {report.headroom:.0%} headroom)"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load test the scheduler against a fake Google Maps client")
+    parser.add_argument(
+        "--journeys", default="25,50,100", help="Comma-separated fleet sizes to measure (default: 25,50,100)"
+    )
+    parser.add_argument("--cycles", type=int, default=2, help="Scheduler cycles per fleet size (default: 2)")
+    parser.add_argument(
+        "--max-workers",
+        type=int,
+        default=settings.MAX_WORKERS,
+        help="Calculator thread pool size (default: MAX_WORKERS)",
+    )
+    parser.add_argument(
+        "--latency-ms", type=float, default=250.0, help="Mean simulated Directions latency (default: 250)"
+    )
+    parser.add_argument(
+        "--jitter-ms", type=float, default=100.0, help="Standard deviation of the latency (default: 100)"
+    )
+    parser.add_argument("--slot-seconds", type=float, default=900.0, help="Length of a measurement slot (default: 900)")
+    parser.add_argument("--headroom", type=float, default=0.8, help="Share of the slot a cycle may use (default: 0.8)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for journeys and latencies")
+    parser.add_argument("--keep", action="store_true", help="Keep the synthetic journeys and their measurements")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    parser.add_argument("--allow-remote", action="store_true", help="Allow a database host other than localhost")
+    args = parser.parse_args()
+
+    if settings.DB_HOST not in LOCAL_HOSTS and not args.allow_remote:
+        logger.error(
+            "Database host is %s; the load test writes thousands of rows, use --allow-remote to proceed",
+            settings.DB_HOST,
+        )
+        sys.exit(1)
+
+    sizes = [int(size) for size in args.journeys.split(",") if size.strip()]
+    generator = LoadGenerator(args.max_workers, args.latency_ms, args.jitter_ms, seed=args.seed)
+    try:
+        # A run that failed half way leaves its journeys behind; they are cleared here on the next one
+        with get_db() as db:
+            removed = remove_synthetic_journeys(db)
+            if removed:
+                logger.warning("Removed %d synthetic journeys left by an earlier run", removed)
+        report = generator.run(get_db, sizes, args.cycles, args.slot_seconds, args.headroom)
+        if not args.keep:
+            with get_db() as db:
+                remove_synthetic_journeys(db)
+    except Exception as e:
+        logger.error("Load test failed: %s", e)
+        sys.exit(1)
+
+    if args.json:
+        print(json.dumps(report.to_dict(), indent=2))
+    else:
+        print_report(report)
+
+
+if __name__ == "__main__":
+    main()
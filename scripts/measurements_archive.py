@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Incrementally export journey_measurements and journey_legs into date-partitioned Arrow IPC or
+Parquet files under settings.ARCHIVE_DATA_DIR, starting from the last exported watermark.
+Requires the optional `archive` extra (pyarrow).
+"""
+
+import argparse
+import logging
+import sys
+
+from core.config import settings
+from core.journey.archive import ARCHIVE_FORMATS, MeasurementArchiver
+from database.session import get_db
+
+log_level = getattr(logging, settings.LOG_LEVEL, logging.INFO)
+logging.basicConfig(
+    level=log_level,
+    format=settings.LOG_FORMAT,
+    datefmt=settings.LOG_DATE_FORMAT,
+    handlers=[logging.StreamHandler(sys.stdout)],
+)
+logger = logging.getLogger(__name__)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Archive journey measurements into columnar files")
+    parser.add_argument("--format", choices=ARCHIVE_FORMATS, default="arrow", help="File format (default: arrow)")
+    parser.add_argument("--batch-size", type=int, default=50000, help="Rows fetched and written per batch")
+    args = parser.parse_args()
+
+    try:
+        with get_db() as db:
+            archiver = MeasurementArchiver(db, archive_format=args.format, batch_size=args.batch_size)
+            exported = archiver.export_all()
+    except Exception as e:
+        logger.error("Error archiving measurements: %s", e)
+        sys.exit(1)
+
+    for table_name, count in exported.items():
+        logger.info("Archived %d new %s rows to %s", count, table_name, archiver.archive_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Recompute duration, distance and speed for stored journey_measurements from their raw_response, e.g.
+after a change to calculate_speed, and optionally create the missing journey_legs rows. Progress is
+checkpointed under settings.BACKFILL_DATA_DIR, so re-running the same backfill resumes it. Heatmaps,
+baselines and forecasts of the journeys it changed are rebuilt at the end, and cached API responses and
+the archive are invalidated.
+"""
+
+import argparse
+import logging
+import sys
+
+from core.config import settings
+from core.journey.backfill import MeasurementBackfill
+from database.session import get_db
+
+log_level = getattr(logging, settings.LOG_LEVEL, logging.INFO)
+logging.basicConfig(
+    level=log_level,
+    format=settings.LOG_FORMAT,
+    datefmt=settings.LOG_DATE_FORMAT,
+    handlers=[logging.StreamHandler(sys.stdout)],
+)
+logger = logging.getLogger(__name__)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Re-derive measurement metrics from raw_response")
+    parser.add_argument("--name", default="metrics", help="Checkpoint name, one per backfill (default: metrics)")
+    parser.add_argument("--chunk-size", type=int, default=2000, help="Measurements per chunk (default: 2000)")
+    parser.add_argument("--processes", type=int, help="Worker processes (default: CPU count)")
+    parser.add_argument(
+        "--max-rows-per-second",
+        type=float,
+        help="Throttle the scan to this many rows per second to spare the live scheduler",
+    )
+    parser.add_argument("--end-id", type=int, help="Stop after this measurement id")
+    parser.add_argument("--legs", action="store_true", help="Also insert journey_legs for measurements without them")
+    parser.add_argument("--dry-run", action="store_true", help="Derive and count changes without writing anything")
+    parser.add_argument("--reset", action="store_true", help="Discard the checkpoint and start from the first row")
+    args = parser.parse_args()
+
+    try:
+        with get_db() as db:
+            backfill = MeasurementBackfill(
+                db,
+                name=args.name,
+                chunk_size=args.chunk_size,
+                processes=args.processes,
+                max_rows_per_second=args.max_rows_per_second,
+                with_legs=args.legs,
+                dry_run=args.dry_run,
+            )
+            if args.reset:
+                backfill.reset_checkpoint()
+            stats = backfill.run(end_id=args.end_id)
+    except KeyboardInterrupt:
+        logger.warning("Backfill interrupted; re-run to resume from the last checkpoint")
+        sys.exit(130)
+    except Exception as e:
+        logger.error("Error backfilling measurements: %s", e)
+        sys.exit(1)
+
+    logger.info(
+        "Backfill %s finished through id %d: %d scanned, %d updated, %d legs, %d journeys rebuilt in %.1fs "
+        "(%.0f rows/sec)%s",
+        args.name,
+        stats.last_id,
+        stats.scanned,
+        stats.updated,
+        stats.legs,
+        stats.invalidated,
+        stats.elapsed,
+        stats.rows_per_second,
+        " [dry run]" if args.dry_run else "",
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Stream journey measurements to a CSV or NDJSON file (optionally gzipped) in constant memory.
+Rows are fetched through a server-side cursor and written as they arrive, so full histories
+can be exported on a small dyno.
+"""
+
+import argparse
+import logging
+import sys
+from datetime import datetime
+from typing import BinaryIO
+
+from core.config import settings
+from core.journey.exporter import EXPORT_FORMATS, MeasurementExporter
+from core.journey.queries import JourneyQueries, MeasurementFilter, ensure_utc
+from database.session import get_db
+
+# Log to stderr so the export itself can be written to stdout
+log_level = getattr(logging, settings.LOG_LEVEL, logging.INFO)
+logging.basicConfig(
+    level=log_level,
+    format=settings.LOG_FORMAT,
+    datefmt=settings.LOG_DATE_FORMAT,
+    handlers=[logging.StreamHandler(sys.stderr)],
+)
+logger = logging.getLogger(__name__)
+
+
+def parse_datetime(value: str) -> datetime:
+    return ensure_utc(datetime.fromisoformat(value))
+
+
+def export(args: argparse.Namespace, output: BinaryIO) -> int:
+    total_bytes = 0
+    with get_db(readonly=True) as db:
+        queries = JourneyQueries(db)
+        filters = MeasurementFilter(
+            journey_id=args.journey_id,
+            mode=queries.resolve_mode(args.mode) if args.mode else None,
+            start=args.start,
+            end=args.end,
+        )
+        exporter = MeasurementExporter(db, batch_size=args.batch_size)
+        for chunk in exporter.iter_export(args.format, filters, compress=args.gzip):
+            output.write(chunk)
+            total_bytes += len(chunk)
+    return total_bytes
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Stream journey measurements to CSV or NDJSON")
+    parser.add_argument("--format", choices=EXPORT_FORMATS, default="csv", help="Output format (default: csv)")
+    parser.add_argument("--output", type=str, default="-", help="Output file path, or - for stdout (default: -)")
+    parser.add_argument("--gzip", action="store_true", help="Gzip the output on the fly")
+    parser.add_argument("--journey-id", type=int, help="Only export this journey")
+    parser.add_argument("--mode", type=str, help="Only export this transit mode (e.g. driving)")
+    parser.add_argument("--start", type=parse_datetime, help="Inclusive start timestamp (ISO-8601, UTC if naive)")
+    parser.add_argument("--end", type=parse_datetime, help="Exclusive end timestamp (ISO-8601, UTC if naive)")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Rows fetched per cursor round-trip")
+    args = parser.parse_args()
+
+    try:
+        if args.output == "-":
+            total_bytes = export(args, sys.stdout.buffer)
+        else:
+            with open(args.output, "wb") as output:
+                total_bytes = export(args, output)
+    except Exception as e:
+        logger.error("Error exporting measurements: %s", e)
+        sys.exit(1)
+
+    logger.info("Exported %d bytes of measurements", total_bytes)
+
+
+if __name__ == "__main__":
+    main()
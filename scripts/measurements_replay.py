@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Insert measurements the scheduler spooled under settings.SPOOL_DATA_DIR while the database was unavailable.
+The scheduler replays the spool itself at the start of every run; this is for recovering without waiting
+for the next slot. Segments still being written by a running scheduler are left alone.
+"""
+
+import argparse
+import logging
+import sys
+from pathlib import Path
+
+from core.config import settings
+from core.journey.spool import SpoolReplayer
+from database.session import get_db
+
+log_level = getattr(logging, settings.LOG_LEVEL, logging.INFO)
+logging.basicConfig(
+    level=log_level,
+    format=settings.LOG_FORMAT,
+    datefmt=settings.LOG_DATE_FORMAT,
+    handlers=[logging.StreamHandler(sys.stdout)],
+)
+logger = logging.getLogger(__name__)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Replay spooled measurements into the database")
+    parser.add_argument("--directory", type=Path, help="Spool directory (default: SPOOL_DATA_DIR)")
+    args = parser.parse_args()
+
+    try:
+        with get_db() as db:
+            replayer = SpoolReplayer(db, directory=args.directory)
+            stats = replayer.replay()
+    except Exception as e:
+        logger.error("Error replaying spooled measurements: %s", e)
+        sys.exit(1)
+
+    if not stats.segments and not stats.busy_segments:
+        logger.info("Nothing to replay in %s", replayer.directory)
+    if stats.busy_segments:
+        logger.info("Left %d segments that a running scheduler is still writing", stats.busy_segments)
+
+
+if __name__ == "__main__":
+    main()
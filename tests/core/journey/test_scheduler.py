@@ -0,0 +1,127 @@
+"""
+Scheduler runs through a database outage, against an in-memory SQLite database and the load test's fake
+Google Maps client. The outage starts at the first measurement insert and fails every statement until it ends.
+"""
+
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any
+
+from sqlalchemy import create_engine, event, func
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import database.session
+from core.journey.loadgen import FakeMapsClient, synthesize_journeys
+from core.journey.scheduler import JourneyScheduler
+from core.journey.spool import SEGMENT_SUFFIX, MeasurementSpool, read_segment
+from database.models import (
+    ApiUsage,
+    DayOfWeek,
+    Journey,
+    JourneyBaseline,
+    JourneyMeasurement,
+    JourneyStatus,
+    TimeSlot,
+    TransitMode,
+)
+from database.models.base import Base
+
+JOURNEY_COUNT = 4
+
+
+class DatabaseOutageTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        Base.metadata.create_all(self.engine)
+        self.session_factory = sessionmaker(bind=self.engine, autoflush=False)
+        self.previous_factory = database.session.__dict__.get("SessionLocal")
+        database.session.SessionLocal = self.session_factory
+        self.seed()
+
+        self.down = self.went_down = False
+        event.listen(self.engine, "before_cursor_execute", self.fail_while_down)
+
+        self.spool_dir = tempfile.TemporaryDirectory()
+        self.maps = FakeMapsClient(latency_ms=0, jitter_ms=0)
+        self.scheduler = JourneyScheduler(max_workers=2, gmaps_client=self.maps)
+        self.scheduler.spool = MeasurementSpool(directory=Path(self.spool_dir.name), enabled=True, fsync=False)
+
+    def tearDown(self) -> None:
+        event.remove(self.engine, "before_cursor_execute", self.fail_while_down)
+        if self.previous_factory is None:
+            del database.session.SessionLocal
+        else:
+            database.session.SessionLocal = self.previous_factory
+        self.spool_dir.cleanup()
+        self.engine.dispose()
+
+    def seed(self) -> None:
+        db = self.session_factory()
+        for mode_id, mode in enumerate(["driving", "driving_routed", "bicycling", "walking", "transit"], 1):
+            db.add(TransitMode(id=mode_id, mode=mode))
+        for day_id in range(1, 8):  # ISO weekdays, as measurements use them
+            db.add(DayOfWeek(id=day_id, day=(datetime(2026, 1, 4) + timedelta(days=day_id)).strftime("%A")))
+        for slot_id in range(96):
+            hour, minute = divmod(slot_id * 15, 60)
+            db.add(TimeSlot(id=slot_id + 1, slot=TimeSlot.slot_key(datetime(2026, 1, 1, hour, minute))))
+        for status_id, status in enumerate(["active", "error", "disabled"], 1):
+            db.add(JourneyStatus(id=status_id, status=status))
+        db.commit()
+        journey_ids = synthesize_journeys(db, JOURNEY_COUNT)
+        db.query(Journey).filter(Journey.id.in_(journey_ids)).update({Journey.status_id: 1}, synchronize_session=False)
+        db.commit()
+        db.close()
+
+    def fail_while_down(self, conn: Any, cursor: Any, statement: str, parameters: Any, *args: Any) -> None:
+        if not self.went_down and statement.startswith("INSERT INTO journey_measurements "):
+            self.down = self.went_down = True
+        if self.down:
+            raise OperationalError(statement, parameters, Exception("server closed the connection unexpectedly"))
+
+    def spooled_records(self) -> list:
+        segments = sorted(Path(self.spool_dir.name).glob(f"*{SEGMENT_SUFFIX}"))
+        return [record for path in segments for record in read_segment(path)[0]]
+
+    def row_count(self, model: Any) -> int:
+        db = self.session_factory()
+        try:
+            return db.query(model).count()
+        finally:
+            db.close()
+
+    def recorded_calls(self) -> int:
+        db = self.session_factory()
+        try:
+            return int(db.query(func.sum(ApiUsage.calls)).scalar() or 0)
+        finally:
+            db.close()
+
+    def test_outage_on_first_journey_spools_the_rest(self) -> None:
+        with self.assertRaisesRegex(RuntimeError, "still unavailable"):
+            self.scheduler.process_all_journeys()
+
+        records = self.spooled_records()
+        self.assertEqual(sorted(record["journey_id"] for record in records), list(range(1, JOURNEY_COUNT + 1)))
+        self.assertTrue(all(record["modes"] for record in records))
+        self.assertTrue(self.scheduler.database_down)
+
+        self.down = False
+        self.assertEqual(self.row_count(ApiUsage), 0)
+        self.assertEqual(self.scheduler.gmaps.run_calls(), self.maps.calls)  # Kept through the failed flush
+
+        self.scheduler.replay_after_outage()
+
+        self.assertFalse(self.scheduler.database_down)
+        self.assertEqual(self.row_count(JourneyMeasurement), sum(len(record["modes"]) for record in records))
+        self.assertEqual(self.spooled_records(), [])
+        # Replayed measurements are folded into the anomaly baselines, one per journey and mode
+        self.assertEqual(self.row_count(JourneyBaseline), sum(len(record["modes"]) for record in records))
+        self.assertEqual(self.recorded_calls(), self.maps.calls)
+
+
+if __name__ == "__main__":
+    unittest.main()
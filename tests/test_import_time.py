@@ -0,0 +1,66 @@
+"""
+Import-time benchmarks for the modules every CLI and web worker loads first.
+
+Each import runs in a fresh interpreter so nothing is cached from other tests. Besides a generous time budget,
+the tests check the side effects that used to make these imports slow: loading .env, creating the engine,
+importing the database driver and turning on SQL logging.
+"""
+
+import json
+import subprocess
+import sys
+import unittest
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+PROBE = """
+import json, logging, sys, time
+started = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - started
+print(json.dumps({{
+    "seconds": elapsed,
+    "modules": sorted(sys.modules),
+    "sql_log_level": logging.getLogger("sqlalchemy.engine").level,
+}}))
+"""
+
+
+def probe_import(module: str) -> dict:
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE.format(module=module)],
+        cwd=BASE_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+class ImportTimeTest(unittest.TestCase):
+    def test_settings_import_is_lazy(self) -> None:
+        probe = probe_import("core.config.settings")
+        self.assertNotIn("dotenv", probe["modules"])
+        self.assertLess(probe["seconds"], 1.0)
+
+    def test_session_import_does_not_create_engine(self) -> None:
+        probe = probe_import("database.session")
+        self.assertNotIn("dotenv", probe["modules"])
+        self.assertNotIn("psycopg2", probe["modules"])
+        self.assertEqual(probe["sql_log_level"], 0)  # NOTSET: SQL echo is opt-in
+        self.assertLess(probe["seconds"], 1.0)
+
+    def test_settings_resolve_on_first_access(self) -> None:
+        result = subprocess.run(
+            [sys.executable, "-c", "from core.config import settings; print(settings.DATABASE_URL, settings.DEBUG)"],
+            cwd=BASE_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        self.assertTrue(result.stdout.startswith("postgresql://"))
+
+
+if __name__ == "__main__":
+    unittest.main()